@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import re
+import time
+
+from lesson_index import LessonIndex
+
+SAMPLE_SENTENCES = [
+    "Deep Learning is a subset of machine learning that uses neural networks with multiple layers.",
+    "Backpropagation computes the gradient of the loss function with respect to each weight.",
+    "Activation functions such as ReLU, sigmoid and tanh introduce non-linearity.",
+    "Convolutional Neural Networks use filters to detect features in images.",
+    "Recurrent Neural Networks process sequences by keeping a hidden state.",
+    "Gradient descent updates the weights in the direction that reduces the loss.",
+    "Dropout randomly disables neurons during training to reduce overfitting.",
+    "Batch normalization stabilizes training by normalizing layer inputs.",
+    "Transfer learning reuses a model trained on one task for another task.",
+    "The attention mechanism lets a Transformer weigh the importance of each token.",
+]
+
+QUESTIONS = [
+    "What is backpropagation?",
+    "How does gradient descent reduce the loss?",
+    "Why do we use dropout during training?",
+    "Explain the attention mechanism in transformers",
+    "Give an example of transfer learning",
+]
+
+def load_text(pdf_path=None, sentences=20000):
+    """Load lesson text from a PDF, or generate a large synthetic lesson"""
+    if pdf_path:
+        import fitz  # PyMuPDF
+        with fitz.open(pdf_path) as document:
+            return "".join(page.get_text() for page in document)
+    # Mix lesson sentences with filler drawn from a large vocabulary, like a real slide deck
+    rng = random.Random(42)
+    vocabulary = ["term%d" % i for i in range(20000)]
+    parts = []
+    for _ in range(sentences):
+        if rng.random() < 0.05:
+            parts.append(rng.choice(SAMPLE_SENTENCES))
+        else:
+            parts.append(" ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 16))) + ".")
+    return " ".join(parts)
+
+def legacy_top_sentences(text, user_terms, lesson_topics, k=5):
+    """The sentence scorer chat_with_grok used before the BM25 index"""
+    lesson_sentences = re.split(r'(?<=[.!?])\s+', text)
+    sentence_scores = []
+    for sentence in lesson_sentences:
+        if len(sentence.strip()) < 10:
+            continue
+        sentence_lower = sentence.lower()
+        term_matches = sum(1 for term in user_terms if len(term) > 3 and term in sentence_lower)
+        topic_matches = sum(1 for topic in lesson_topics if topic in sentence_lower)
+        score = term_matches + (topic_matches * 2)
+        if score > 0:
+            sentence_scores.append((sentence.strip(), score))
+    sentence_scores.sort(key=lambda x: x[1], reverse=True)
+    return [s[0] for s in sentence_scores[:k]]
+
+def query_terms(question):
+    return [word.strip("?.,!").lower() for word in question.split() if len(word.strip("?.,!")) > 3]
+
+def benchmark_fallback(pdf_path=None, sentences=20000, repeat=20):
+    """Compare the legacy per-question sentence scan with BM25 index lookups"""
+    text = load_text(pdf_path, sentences)
+    topics = ['deep learning', 'neural networks', 'backpropagation', 'gradient descent',
+              'dropout', 'batch normalization', 'transfer learning', 'attention mechanism']
+    print(f"Lesson text: {len(text)} characters")
+
+    start = time.perf_counter()
+    index = LessonIndex(text, topics)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"BM25 index build (once per lesson): {build_ms:.1f} ms for {index.document_count} sentences")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            legacy_top_sentences(text, query_terms(question), topics)
+    legacy_ms = (time.perf_counter() - start) * 1000 / (repeat * len(QUESTIONS))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            index.top_sentences(query_terms(question))
+    bm25_ms = (time.perf_counter() - start) * 1000 / (repeat * len(QUESTIONS))
+
+    print(f"Legacy scorer: {legacy_ms:.3f} ms per question")
+    print(f"BM25 lookup:   {bm25_ms:.3f} ms per question")
+
+def make_large_pdf(path, pages=300):
+    """Write a synthetic slide export with dense text on every page"""
+    import fitz  # PyMuPDF
+    rng = random.Random(42)
+    document = fitz.open()
+    for number in range(pages):
+        page = document.new_page()
+        body = " ".join(rng.choice(SAMPLE_SENTENCES) for _ in range(40))
+        page.insert_textbox(fitz.Rect(36, 36, 576, 756), f"Slide {number + 1}\n{body}", fontsize=8)
+    document.save(path)
+    document.close()
+
+def benchmark_extraction(pdf_path=None, pages=300, repeat=3):
+    """Compare serial page extraction with page-range extraction across the process pool"""
+    import os
+    import tempfile
+    import pdf_processor
+
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.gettempdir(), f"benchmark_{pages}_pages.pdf")
+        if not os.path.exists(pdf_path):
+            make_large_pdf(pdf_path, pages)
+    print(f"PDF: {pdf_path}, {pdf_processor.PDF_WORKERS} workers")
+
+    # Start the workers before timing; the pool is reused for the life of the server
+    start = time.perf_counter()
+    pdf_processor.get_process_pool().submit(int).result()
+    print(f"Process pool start: {(time.perf_counter() - start) * 1000:.1f} ms (once per process)")
+
+    def timed(parallel):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = pdf_processor.extract_pdf(pdf_path, parallel=parallel)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    serial_ms, serial = timed(False)
+    parallel_ms, parallel = timed(True)
+    assert serial['full_text'] == parallel['full_text'] and serial['pages'] == parallel['pages']
+
+    print(f"Pages: {serial['page_count']}, text: {len(serial['full_text'])} characters")
+    print(f"Serial:        {serial_ms:.1f} ms")
+    print(f"Page-parallel: {parallel_ms:.1f} ms ({serial_ms / parallel_ms:.2f}x)")
+
+async def drain_response(response, headers=(), extensions=None):
+    """Run an ASGI response without a server and return the number of body bytes it sent"""
+    scope = {"type": "http", "method": "GET", "headers": list(headers), "extensions": extensions or {}}
+    sent = 0
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal sent
+        sent += len(message.get("body", b""))
+
+    await response(scope, receive, send)
+    return sent
+
+def benchmark_download(pdf_path=None, size_mb=50, range_kb=64, repeat=20):
+    """Compare FileResponse, which always sends the whole file, with FileRangeResponse"""
+    import os
+    import asyncio
+    import tempfile
+    from starlette.responses import FileResponse
+    from file_serving import FileRangeResponse, parse_byte_range
+
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.gettempdir(), f"benchmark_download_{size_mb}mb.pdf")
+        if not os.path.exists(pdf_path) or os.path.getsize(pdf_path) != size_mb * 1024 * 1024:
+            with open(pdf_path, "wb") as file:
+                file.write(os.urandom(size_mb * 1024 * 1024))
+    stat_result = os.stat(pdf_path)
+    size = stat_result.st_size
+    print(f"File: {pdf_path}, {size / 1024 / 1024:.1f} MB")
+
+    # A PDF viewer rendering progressively fetches ranges spread over the file
+    rng = random.Random(42)
+    range_bytes = range_kb * 1024
+    ranges = [f"bytes={start}-{start + range_bytes - 1}" for start in (rng.randrange(0, max(size - range_bytes, 1)) for _ in range(repeat))]
+
+    async def run():
+        def report(label, elapsed, sent):
+            print(f"{label}: {elapsed * 1000 / repeat:.2f} ms per request, "
+                  f"{sent / repeat / 1024:.0f} KB sent, {sent / elapsed / 1024 / 1024:.0f} MB/s")
+
+        start = time.perf_counter()
+        sent = 0
+        for _ in range(repeat):
+            sent += await drain_response(FileResponse(pdf_path, media_type="application/pdf"))
+        report("Full download, FileResponse     ", time.perf_counter() - start, sent)
+
+        start = time.perf_counter()
+        sent = 0
+        for _ in range(repeat):
+            sent += await drain_response(FileRangeResponse(pdf_path, stat_result, media_type="application/pdf"))
+        report("Full download, FileRangeResponse", time.perf_counter() - start, sent)
+
+        start = time.perf_counter()
+        sent = 0
+        for header in ranges:
+            # FileResponse ignores the Range header and sends the whole file
+            sent += await drain_response(FileResponse(pdf_path, media_type="application/pdf"), [(b"range", header.encode())])
+        report(f"{range_kb} KB range, FileResponse      ", time.perf_counter() - start, sent)
+
+        start = time.perf_counter()
+        sent = 0
+        for header in ranges:
+            byte_range = parse_byte_range(header, size)
+            sent += await drain_response(FileRangeResponse(pdf_path, stat_result, byte_range, media_type="application/pdf"))
+        report(f"{range_kb} KB range, FileRangeResponse ", time.perf_counter() - start, sent)
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the Python backend")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    fallback = subparsers.add_parser("fallback", help="Local fallback responder: legacy scan vs BM25 index")
+    fallback.add_argument("--pdf", help="Lesson PDF to use instead of synthetic text")
+    fallback.add_argument("--sentences", type=int, default=20000, help="Synthetic lesson size in sentences")
+    fallback.add_argument("--repeat", type=int, default=20)
+
+    extraction = subparsers.add_parser("extraction", help="PDF text extraction: serial vs page-parallel")
+    extraction.add_argument("--pdf", help="PDF to extract instead of a synthetic slide export")
+    extraction.add_argument("--pages", type=int, default=300, help="Synthetic PDF size in pages")
+    extraction.add_argument("--repeat", type=int, default=3)
+
+    download = subparsers.add_parser("download", help="Lesson downloads: FileResponse vs byte-range FileRangeResponse")
+    download.add_argument("--pdf", help="File to serve instead of a synthetic one")
+    download.add_argument("--size-mb", type=int, default=50, help="Synthetic file size in MB")
+    download.add_argument("--range-kb", type=int, default=64, help="Size of each range request in KB")
+    download.add_argument("--repeat", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.benchmark == "fallback":
+        benchmark_fallback(args.pdf, args.sentences, args.repeat)
+    elif args.benchmark == "extraction":
+        benchmark_extraction(args.pdf, args.pages, args.repeat)
+    elif args.benchmark == "download":
+        benchmark_download(args.pdf, args.size_mb, args.range_kb, args.repeat)
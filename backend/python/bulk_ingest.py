@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of lesson PDFs.
+
+Extracts a whole directory or manifest of PDFs in parallel on the
+pdf_processor worker pool and inserts the lessons in batches, one
+transaction per batch. Ingested files are recorded in a state file so a
+rerun after a crash skips everything that was already committed. A batch
+that committed just before a crash, but was never recorded, is matched to
+its existing lessons instead of being inserted twice.
+
+Usage:
+    python bulk_ingest.py path/to/pdfs --course-id 1 --week-id 2 --day-id 3
+    python bulk_ingest.py --manifest lessons.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+
+import pdf_processor
+from pdf_integration import pdf_integration
+
+logger = logging.getLogger("bulk_ingest")
+
+DEFAULT_BATCH_SIZE = int(os.getenv('BULK_INGEST_BATCH_SIZE', '20'))
+
+def load_manifest(manifest_path):
+    """
+    Read a JSON manifest of lessons to ingest
+
+    The manifest is a list of objects with "path", "courseId", "weekId",
+    "dayId" and an optional "title". Relative paths are resolved against
+    the manifest's directory.
+
+    Returns:
+        list: (pdf path, lesson info) pairs
+    """
+    base_dir = Path(manifest_path).resolve().parent
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    items = []
+    for entry in entries:
+        pdf_path = Path(entry['path'])
+        if not pdf_path.is_absolute():
+            pdf_path = base_dir / pdf_path
+        lesson_info = {key: entry[key] for key in ('courseId', 'weekId', 'dayId', 'title') if key in entry}
+        items.append((str(pdf_path.resolve()), lesson_info))
+    return items
+
+def scan_directory(directory, lesson_info):
+    """Return (pdf path, lesson info) pairs for every PDF under a directory, in name order"""
+    return [
+        (str(path.resolve()), dict(lesson_info))
+        for path in sorted(Path(directory).rglob('*'))
+        if path.is_file() and path.suffix.lower() == '.pdf'
+    ]
+
+class IngestState:
+    """
+    Record of the PDFs that have been committed to the database.
+
+    Stored as one JSON object per line so each batch is appended and
+    flushed to disk as soon as its transaction commits.
+    """
+
+    def __init__(self, state_path):
+        self.state_path = Path(state_path)
+        self.done = {}
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write
+                        continue
+                    self.done[record['path']] = record
+
+    def is_done(self, pdf_path):
+        return pdf_path in self.done
+
+    def record(self, records):
+        """Append committed records and flush them to disk"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+                self.done[record['path']] = record
+            f.flush()
+            os.fsync(f.fileno())
+
+class Progress:
+    """Log processed/failed counts with throughput and an ETA"""
+
+    def __init__(self, total):
+        self.total = total
+        self.processed = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def update(self, pdf_path, ok):
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+        finished = self.processed + self.failed
+        elapsed = time.monotonic() - self.started
+        rate = finished / elapsed if elapsed else 0.0
+        eta = (self.total - finished) / rate if rate else 0.0
+        logger.info(
+            f"[{finished}/{self.total}] {'ok' if ok else 'FAILED'} {Path(pdf_path).name} "
+            f"({rate:.2f} files/s, ETA {eta:.0f}s)"
+        )
+
+def lesson_info_for(info, result):
+    """Lesson info for an entry, with the extracted title as the default"""
+    lesson_info = dict(info)
+    lesson_info.setdefault('title', result.get('title', ''))
+    return lesson_info
+
+def lesson_key(json_path, lesson_info):
+    """What identifies a bulk-ingested lesson: its artifact and where and as what it was added"""
+    return (json_path, int(lesson_info['courseId']), int(lesson_info['weekId']), int(lesson_info['dayId']), lesson_info['title'])
+
+def existing_lessons(cursor, batch):
+    """
+    Look up lessons of a batch that are already in the database, with one query
+
+    Identical uploads share an artifact, so a lesson is matched on its
+    artifact path together with its course, week, day and name.
+
+    Returns:
+        dict: lesson_key -> lesson ID
+    """
+    json_paths = list({json_path for _, _, json_path, _ in batch})
+    placeholders = ", ".join(["%s"] * len(json_paths))
+    cursor.execute(
+        f"SELECT id, file_path, course_id, week_id, day_id, lesson_name FROM lessons WHERE file_path IN ({placeholders})",
+        json_paths
+    )
+    return {
+        (row['file_path'], row['course_id'], row['week_id'], row['day_id'], row['lesson_name']): row['id']
+        for row in cursor.fetchall()
+    }
+
+def insert_batch(batch, state):
+    """
+    Insert a batch of extracted lessons in one transaction and record them
+
+    Args:
+        batch (list): (pdf path, lesson info, json path, extraction result) tuples
+        state (IngestState): State file to record committed lessons in
+
+    Returns:
+        int: Number of lessons committed
+    """
+    if not batch:
+        return 0
+    connection = pdf_integration.get_connection()
+    start = time.perf_counter()
+    try:
+        records = []
+        with connection.cursor() as cursor:
+            # The state file is written after the commit, so after a crash in between
+            # the batch is found here and recorded instead of inserted again
+            existing = existing_lessons(cursor, batch)
+            for pdf_path, lesson_info, json_path, result in batch:
+                lesson_id = existing.get(lesson_key(json_path, lesson_info))
+                if lesson_id is None:
+                    lesson_id = pdf_integration.insert_lesson(cursor, json_path, result, lesson_info)
+                else:
+                    logger.info(f"{Path(pdf_path).name} is already lesson {lesson_id}")
+                records.append({'path': pdf_path, 'lessonId': lesson_id, 'jsonPath': json_path})
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - start
+    qa_pairs = sum(len(item[3].get('qa_pairs') or []) for item in batch)
+    logger.info(f"Inserted {len(records)} lessons and {qa_pairs} QA pairs in {elapsed * 1000:.1f} ms "
+                f"({len(records) / elapsed if elapsed > 0 else 0:.1f} lessons/s)")
+    state.record(records)
+    return len(records)
+
+def bulk_ingest(items, state_path, batch_size=DEFAULT_BATCH_SIZE, max_in_flight=None):
+    """
+    Extract and insert many lessons, skipping those already recorded in the state file
+
+    Args:
+        items (list): (pdf path, lesson info) pairs
+        state_path (str): Path of the resume state file
+        batch_size (int): Lessons inserted per transaction
+        max_in_flight (int): Extractions queued at once, to bound memory use
+
+    Returns:
+        dict: Counts of ingested, skipped and failed files, and the failures
+    """
+    state = IngestState(state_path)
+    pending = [(pdf_path, info) for pdf_path, info in items if not state.is_done(pdf_path)]
+    skipped = len(items) - len(pending)
+    if skipped:
+        logger.info(f"Skipping {skipped} already ingested files")
+
+    max_in_flight = max_in_flight or pdf_processor.PDF_WORKERS * 2
+    progress = Progress(len(pending))
+    failures = []
+    ingested = 0
+    batch = []
+    reused = []
+    futures = {}
+    duplicates = {}  # content hash being extracted -> identical files waiting for it
+    queue = iter(pending)
+    exhausted = False
+
+    def fill():
+        nonlocal exhausted
+        while len(futures) < max_in_flight and len(batch) < batch_size:
+            entry = next(queue, None)
+            if entry is None:
+                exhausted = True
+                return
+            pdf_path, info = entry
+            digest, json_path = pdf_integration.cached_artifact(pdf_path)
+            if json_path:
+                # Contents already extracted by an earlier run or an identical upload
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                batch.append((pdf_path, lesson_info_for(info, result), json_path, result))
+                reused.append(pdf_path)
+                progress.update(pdf_path, True)
+            elif digest in duplicates:
+                # Identical to a file that is being extracted right now
+                duplicates[digest].append((pdf_path, info))
+            else:
+                duplicates[digest] = []
+                previous_pages = pdf_integration.previous_pages(pdf_path)
+                futures[pdf_processor.submit_extraction(pdf_path, previous_pages)] = (pdf_path, info, digest)
+
+    while True:
+        fill()
+        if not futures and not batch and exhausted:
+            break
+        finished = wait(futures, return_when=FIRST_COMPLETED)[0] if futures else ()
+        for future in finished:
+            pdf_path, info, digest = futures.pop(future)
+            entries = [(pdf_path, info)] + duplicates.pop(digest)
+            try:
+                result = future.result()
+                json_path = pdf_integration.store_result(pdf_path, digest, result)
+                for entry_path, entry_info in entries:
+                    if entry_path != pdf_path:
+                        pdf_integration.manifest.record(entry_path, digest, json_path)
+                        reused.append(entry_path)
+                    batch.append((entry_path, lesson_info_for(entry_info, result), json_path, result))
+                    progress.update(entry_path, True)
+            except Exception as e:
+                logger.error(f"Error extracting {pdf_path}: {str(e)}")
+                for entry_path, _ in entries:
+                    failures.append({'path': entry_path, 'error': str(e)})
+                    progress.update(entry_path, False)
+
+        if len(batch) >= batch_size or (exhausted and not futures and batch):
+            try:
+                ingested += insert_batch(batch, state)
+                pdf_integration.manifest.flush()
+                logger.info(f"Committed batch of {len(batch)} lessons ({ingested} total)")
+            except Exception as e:
+                logger.error(f"Error inserting batch: {str(e)}")
+                failures.extend({'path': item[0], 'error': str(e)} for item in batch)
+            batch.clear()
+
+    pdf_integration.manifest.flush()
+    elapsed = time.monotonic() - progress.started
+    logger.info(f"Ingested {ingested} lessons in {elapsed:.1f}s ({len(reused)} from existing artifacts), skipped {skipped}, failed {len(failures)}")
+    return {
+        'ingested': ingested,
+        'reused': len(reused),
+        'skipped': skipped,
+        'failed': len(failures),
+        'failures': failures,
+        'seconds': round(elapsed, 3)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract and add many lesson PDFs to the database")
+    parser.add_argument("directory", nargs="?", help="Directory of PDFs to ingest (searched recursively)")
+    parser.add_argument("--manifest", help="JSON manifest listing PDFs and their course/week/day")
+    parser.add_argument("--course-id", type=int, help="Course of every PDF in the directory")
+    parser.add_argument("--week-id", type=int, help="Week of every PDF in the directory")
+    parser.add_argument("--day-id", type=int, help="Day of every PDF in the directory")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Lessons inserted per transaction")
+    parser.add_argument("--state", default=str(pdf_integration.json_dir / 'bulk_ingest_state.jsonl'),
+                        help="State file used to resume an interrupted run")
+    args = parser.parse_args()
+
+    if args.manifest:
+        items = load_manifest(args.manifest)
+    elif args.directory:
+        if args.course_id is None or args.week_id is None or args.day_id is None:
+            parser.error("--course-id, --week-id and --day-id are required with a directory")
+        items = scan_directory(args.directory, {
+            'courseId': args.course_id,
+            'weekId': args.week_id,
+            'dayId': args.day_id
+        })
+    else:
+        parser.error("give a directory or --manifest")
+
+    missing = [pdf_path for pdf_path, _ in items if not os.path.exists(pdf_path)]
+    if missing:
+        print(f"Error: {len(missing)} PDF files not found, first: {missing[0]}")
+        sys.exit(1)
+
+    summary = bulk_ingest(items, args.state, args.batch_size)
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if summary['failed'] else 0)
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+class ExtractedTextCache:
+    """
+    In-process LRU cache for text extracted from lesson files.
+
+    Entries are keyed by (file path, mtime, size), so a file that is replaced
+    or edited on disk is treated as a miss and its stale entry is dropped.
+    The total size of the cached strings is capped at max_bytes.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # path -> (key, text, size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_path):
+        """Build the cache key for a file from its current stat information"""
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, file_path):
+        """Return the cached text for a file, or None if missing or stale"""
+        key = self.make_key(file_path)
+        with self._lock:
+            entry = self._entries.get(key[0])
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != key:
+                # The file changed on disk since it was cached
+                self._remove(key[0])
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key[0])
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, text):
+        """Store text under a key produced by make_key"""
+        size = sys.getsizeof(text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key[0] in self._entries:
+                self._remove(key[0])
+            self._entries[key[0]] = (key, text, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_load(self, file_path, loader):
+        """
+        Return the cached text for a file, calling loader(file_path) on a miss.
+
+        Exceptions raised by the loader propagate and nothing is cached.
+        """
+        text = self.get(file_path)
+        if text is not None:
+            return text
+        # Stat before loading so an edit during extraction invalidates the entry
+        key = self.make_key(file_path)
+        text = loader(file_path)
+        self.put(key, text)
+        return text
+
+    def invalidate(self, file_path=None):
+        """Drop one file from the cache, or everything if no path is given"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            else:
+                self._remove(os.path.abspath(file_path))
+
+    def stats(self):
+        """Return hit/miss counters and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _remove(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live.
+
+    Used for LLM answers, so identical questions about the same lesson
+    content are only sent upstream once per TTL window.
+    """
+
+    def __init__(self, max_entries=2048, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries over max_entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class InFlightCall:
+    """A single upstream call shared by every waiter with the same key"""
+
+    def __init__(self):
+        self.deltas = []
+        self.subscribers = []
+        self.future = asyncio.get_running_loop().create_future()
+
+    def publish(self, delta):
+        """Record a streamed fragment and forward it to every subscriber"""
+        self.deltas.append(delta)
+        for queue in self.subscribers:
+            queue.put_nowait(delta)
+
+    def subscribe(self):
+        """Return a queue that replays fragments seen so far, then receives new ones"""
+        queue = asyncio.Queue()
+        for delta in self.deltas:
+            queue.put_nowait(delta)
+        if self.future.done():
+            queue.put_nowait(None)
+        self.subscribers.append(queue)
+        return queue
+
+    def finish(self):
+        """Signal every subscriber that no more fragments will arrive"""
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key into one upstream call.
+
+    The first caller for a key starts the call as its own task, so it keeps
+    running for the remaining waiters even if that caller goes away. Later
+    callers wait for the same result, and streaming callers receive every
+    fragment the call has produced so far followed by the rest as it arrives.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls = {}
+
+    async def do(self, key, fn, on_delta=None):
+        """
+        Return the result of fn(publish) for key, sharing it with concurrent callers.
+
+        fn is a coroutine function that receives a publish callback for
+        streamed fragments. on_delta, if given, is an async callback that is
+        awaited for every fragment. Returns (result, shared) where shared is
+        True if another caller started the upstream call.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            call = InFlightCall()
+            self._calls[key] = call
+            asyncio.ensure_future(self._run(key, call, fn))
+
+        if on_delta is not None:
+            queue = call.subscribe()
+            try:
+                while True:
+                    delta = await queue.get()
+                    if delta is None:
+                        break
+                    await on_delta(delta)
+            finally:
+                call.subscribers.remove(queue)
+
+        result = await asyncio.shield(call.future)
+        return result, shared
+
+    def stats(self):
+        """Return the number of in-flight, started and coalesced calls"""
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
+
+    async def _run(self, key, call, fn):
+        try:
+            result = await fn(call.publish)
+            call.future.set_result(result)
+        except asyncio.CancelledError:
+            call.future.cancel()
+            raise
+        except Exception as e:
+            call.future.set_exception(e)
+            # Mark the exception as retrieved in case every waiter has gone away
+            call.future.exception()
+        finally:
+            del self._calls[key]
+            call.finish()
@@ -3,7 +3,7 @@ import asyncio
 import json
 import logging
 import os
-import sys
+import threading
 from typing import Dict, List, Optional, Any
 
 import websockets
@@ -11,6 +11,11 @@ import pymysql
 import pymysql.cursors
 from dotenv import load_dotenv
 
+from keyword_matcher import KeywordClassifier
+from lesson_content import CONTENT_COLUMNS, make_summary, read_content
+from migrations import migrate
+from sample_pdfs import render_intro_pdf, sample_pdfs
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +27,36 @@ logger = logging.getLogger("chatbot")
 # Load environment variables
 load_dotenv()
 
+# Question types and their keywords, compiled once into a single matcher
+QUESTION_TYPE_CLASSIFIER = KeywordClassifier({
+    'definition': ['what is', 'define', 'meaning of', 'definition of', 'explain what'],
+    'explanation': ['explain', 'how does', 'tell me about', 'describe', 'elaborate on'],
+    'examples': ['example', 'examples of', 'instance of', 'show me', 'give me an example'],
+    'advantages': ['advantage', 'benefit', 'pro', 'good thing', 'positive'],
+    'disadvantages': ['disadvantage', 'challenge', 'con', 'drawback', 'negative', 'problem'],
+    'applications': ['application', 'use case', 'used for', 'applied in', 'where is it used'],
+    'comparison': ['compare', 'difference', 'versus', 'vs', 'similar to', 'different from'],
+    'process': ['process', 'step', 'how to', 'procedure', 'method', 'technique'],
+    'components': ['component', 'part', 'element', 'consist of', 'made up of', 'structure']
+})
+
+# Schema migrations run once per process, before the first query
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def ensure_schema(connection):
+    """Apply pending schema migrations on the first call in this process"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            migrate(connection)
+            _schema_ready = True
+
+# Served in place of lesson PDFs that cannot be found, rendered once in the background
+SAMPLE_PDF_PATH = os.path.join('backend', 'node', 'uploads', 'deep_learning_intro.pdf')
+
 class PDFIntegration:
     """Python implementation of the PDF integration functionality"""
     
@@ -37,22 +72,32 @@ class PDFIntegration:
         logger.info(f"Database configuration: {self.db_config['host']}, {self.db_config['user']}, {self.db_config['database']}")
     
     def get_connection(self):
-        """Create and return a database connection"""
+        """Create and return a database connection, migrating the schema on first use"""
         try:
             connection = pymysql.connect(**self.db_config)
-            return connection
         except Exception as e:
             logger.error(f"Database connection error: {str(e)}")
             raise
+        try:
+            ensure_schema(connection)
+        except Exception:
+            connection.close()
+            raise
+        return connection
     
     def get_lesson_content(self, lesson_id: int) -> Dict[str, Any]:
         """Get lesson content from the database"""
         try:
             connection = self.get_connection()
             with connection.cursor() as cursor:
-                # Get the lesson from the database
+                # Get the lesson and its stored content in one primary-key lookup
                 cursor.execute(
-                    "SELECT * FROM lessons WHERE id = %s",
+                    f"""
+                    SELECT l.*, {CONTENT_COLUMNS}
+                    FROM lessons l
+                    LEFT JOIN lesson_content lc ON lc.lesson_id = l.id
+                    WHERE l.id = %s
+                    """,
                     (lesson_id,)
                 )
                 lesson = cursor.fetchone()
@@ -60,6 +105,19 @@ class PDFIntegration:
                 if not lesson:
                     raise ValueError(f"Lesson with ID {lesson_id} not found")
                 
+                stored = read_content(lesson)
+                if stored is not None:
+                    return {
+                        'id': lesson['id'],
+                        'title': lesson['lesson_name'],
+                        'summary': stored['summary'] or lesson.get('summary', ''),
+                        'content': stored['text'],
+                        'sections': stored['sections'],
+                        'qaPairs': stored['qa_pairs'],
+                        'pdfUrl': self._get_pdf_url(lesson_id)  # Add PDF URL
+                    }
+                
+                # Lessons added before lesson_content existed are read from their file
                 file_path = lesson['file_path']
                 logger.info(f"Retrieved lesson with file path: {file_path}")
                 
@@ -72,16 +130,14 @@ class PDFIntegration:
                     with open(file_path, 'r', encoding='utf-8') as f:
                         json_content = json.load(f)
                     
-                    # Get QA pairs if available
+                    # Get QA pairs if available; get_connection has already created the table
                     qa_pairs = []
                     try:
-                        cursor.execute("SHOW TABLES LIKE 'lesson_qa_pairs'")
-                        if cursor.fetchone():
-                            cursor.execute(
-                                "SELECT question, answer FROM lesson_qa_pairs WHERE lesson_id = %s",
-                                (lesson_id,)
-                            )
-                            qa_pairs = cursor.fetchall()
+                        cursor.execute(
+                            "SELECT question, answer FROM lesson_qa_pairs WHERE lesson_id = %s",
+                            (lesson_id,)
+                        )
+                        qa_pairs = cursor.fetchall()
                     except Exception as e:
                         logger.error(f"Error fetching QA pairs: {str(e)}")
                     
@@ -130,20 +186,12 @@ class PDFIntegration:
                                 raise FileNotFoundError(f"Lesson file not found: {file_path}")
                     
                     try:
-                        # Try to import fitz (PyMuPDF)
-                        import fitz
-                        
-                        # Extract text from PDF
-                        pdf_text = ""
-                        pdf_document = fitz.open(file_path)
-                        
-                        # Extract text from each page
-                        for page_num in range(len(pdf_document)):
-                            page = pdf_document[page_num]
-                            pdf_text += page.get_text()
+                        # Try to import the PyMuPDF-based extractor
+                        from pdf_processor import iter_page_texts
                         
-                        # Generate a simple summary (first 500 characters)
-                        summary = pdf_text[:500] + "..." if len(pdf_text) > 500 else pdf_text
+                        # Stream the pages and join them once; only the text and summary are returned
+                        pdf_text = "".join(iter_page_texts(file_path, parallel=False))
+                        summary = make_summary(pdf_text)
                         
                         return {
                             'id': lesson['id'],
@@ -230,91 +278,25 @@ class PDFIntegration:
         return f"http://localhost:3001/api/lessons/{lesson_id}/download"
     
     def _create_sample_pdf_if_needed(self):
-        """Create a sample PDF file if it doesn't exist"""
+        """Start rendering the sample PDF in the background if it doesn't exist; never blocks the caller"""
+        sample_pdfs.get(SAMPLE_PDF_PATH, render_intro_pdf, on_created=self._use_sample_pdf)
+    
+    def _use_sample_pdf(self, sample_pdf_path):
+        """Point lesson 2 at a newly created sample PDF"""
         try:
-            # Check if reportlab is installed
-            import reportlab
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib.styles import getSampleStyleSheet
-            from reportlab.platypus import SimpleDocTemplate, Paragraph
-            
-            # Create pdfs directory if it doesn't exist
-            pdfs_dir = os.path.join('backend', 'node', 'uploads')
-            os.makedirs(pdfs_dir, exist_ok=True)
-            
-            # Path to the sample PDF
-            sample_pdf_path = os.path.join(pdfs_dir, 'deep_learning_intro.pdf')
-            
-            # Check if the sample PDF already exists
-            if os.path.exists(sample_pdf_path):
-                logger.info(f"Sample PDF already exists at {sample_pdf_path}")
-                return
-            
-            # Create a new PDF
-            doc = SimpleDocTemplate(sample_pdf_path, pagesize=letter)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Add title
-            title_style = styles['Title']
-            story.append(Paragraph("Introduction to Deep Learning", title_style))
-            
-            # Add content from the text file
-            try:
-                with open('backend/python/pdfs/deep_learning_intro.txt', 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                    # Split content by sections
-                    sections = content.split('##')
-                    
-                    # Add introduction
-                    intro = sections[0].strip()
-                    for paragraph in intro.split('\n\n'):
-                        if paragraph.strip():
-                            story.append(Paragraph(paragraph.strip(), styles['Normal']))
-                    
-                    # Add sections
-                    for section in sections[1:]:
-                        if section.strip():
-                            lines = section.strip().split('\n')
-                            section_title = lines[0].strip()
-                            section_content = '\n'.join(lines[1:]).strip()
-                            
-                            story.append(Paragraph(section_title, styles['Heading2']))
-                            
-                            for paragraph in section_content.split('\n\n'):
-                                if paragraph.strip():
-                                    story.append(Paragraph(paragraph.strip(), styles['Normal']))
-            except Exception as e:
-                logger.error(f"Error reading content file: {str(e)}")
-                # Add default content
-                story.append(Paragraph("Deep learning is a subset of machine learning that uses neural networks with multiple layers to analyze various forms of data.", styles['Normal']))
-            
-            # Build the PDF
-            doc.build(story)
-            logger.info(f"Created sample PDF at {sample_pdf_path}")
-            
-            # Update the database to point to this file
-            try:
-                connection = self.get_connection()
-                with connection.cursor() as cursor:
-                    cursor.execute(
-                        "UPDATE lessons SET file_path = %s WHERE id = 2",
-                        (sample_pdf_path,)
-                    )
-                    connection.commit()
-                    logger.info("Updated lesson 2 with sample PDF path")
-            except Exception as e:
-                logger.error(f"Error updating database: {str(e)}")
-            finally:
-                if 'connection' in locals():
-                    connection.close()
-                    
-        except ImportError:
-            logger.error("ReportLab not installed. Cannot create sample PDF.")
+            connection = self.get_connection()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE lessons SET file_path = %s WHERE id = 2",
+                    (sample_pdf_path,)
+                )
+                connection.commit()
+                logger.info("Updated lesson 2 with sample PDF path")
         except Exception as e:
-            logger.error(f"Error creating sample PDF: {str(e)}")
+            logger.error(f"Error updating database: {str(e)}")
+        finally:
+            if 'connection' in locals():
+                connection.close()
 
 class ChatbotServer:
     """WebSocket server for the chatbot"""
@@ -408,26 +390,8 @@ class ChatbotServer:
                     # Parse the content into sections based on markdown headers
                     sections = self._parse_content_into_sections(content)
                     
-                    # Define question types and their keywords
-                    question_types = {
-                        'definition': ['what is', 'define', 'meaning of', 'definition of', 'explain what'],
-                        'explanation': ['explain', 'how does', 'tell me about', 'describe', 'elaborate on'],
-                        'examples': ['example', 'examples of', 'instance of', 'show me', 'give me an example'],
-                        'advantages': ['advantage', 'benefit', 'pro', 'good thing', 'positive'],
-                        'disadvantages': ['disadvantage', 'challenge', 'con', 'drawback', 'negative', 'problem'],
-                        'applications': ['application', 'use case', 'used for', 'applied in', 'where is it used'],
-                        'comparison': ['compare', 'difference', 'versus', 'vs', 'similar to', 'different from'],
-                        'process': ['process', 'step', 'how to', 'procedure', 'method', 'technique'],
-                        'components': ['component', 'part', 'element', 'consist of', 'made up of', 'structure']
-                    }
-                    
-                    # Identify the question type
-                    identified_types = []
-                    for q_type, keywords in question_types.items():
-                        for keyword in keywords:
-                            if keyword in user_text_lower:
-                                identified_types.append(q_type)
-                                break
+                    # Identify the question type in a single pass over the question
+                    identified_types = QUESTION_TYPE_CLASSIFIER.classify(user_text_lower)
                     
                     # If no specific question type is identified, default to explanation
                     if not identified_types:
@@ -662,6 +626,8 @@ class ChatbotServer:
     async def start_server(self):
         """Start the WebSocket server"""
         server = await websockets.serve(self.handle_client, self.host, self.port)
+        # Render the fallback PDF now rather than when the first lesson file turns out to be missing
+        self.pdf_integration._create_sample_pdf_if_needed()
         logger.info(f"WebSocket server started on ws://{self.host}:{self.port}")
         return server
 
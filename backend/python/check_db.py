@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 import os
 import sys
-import json
 import pymysql
 import pymysql.cursors
 from dotenv import load_dotenv
 
+from migrations import MIGRATIONS, current_version, migrate
+
 def check_database():
     """
     Check the database connection and configuration.
@@ -58,63 +59,11 @@ def check_database():
             tables = [list(row.values())[0] for row in tables_result]
             print('Tables in database:', tables)
             
-            # Check if lessons table exists
-            lessons_table_exists = 'lessons' in tables
-            print('Lessons table exists:', lessons_table_exists)
-            
-            if not lessons_table_exists:
-                print('Creating lessons table...')
-                
-                # Create lessons table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS lessons (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        course_id INT NOT NULL,
-                        week_id INT NOT NULL,
-                        day_id INT NOT NULL,
-                        lesson_name VARCHAR(255) NOT NULL,
-                        file_path VARCHAR(255) NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                connection.commit()
-                print('Lessons table created successfully')
-            
-            # Check lessons table structure
-            cursor.execute('DESCRIBE lessons')
-            lessons_structure = cursor.fetchall()
-            print('Lessons table structure:')
-            for col in lessons_structure:
-                print(f"  {col['Field']}: {col['Type']} {col['Null']} {col['Key']} {col['Default']} {col['Extra']}")
-            
-            # Check if required columns exist
-            columns = [col['Field'] for col in lessons_structure]
-            required_columns = ['course_id', 'week_id', 'day_id', 'lesson_name', 'file_path']
-            missing_columns = [col for col in required_columns if col not in columns]
-            
-            if missing_columns:
-                print('Missing columns in lessons table:', missing_columns)
-                
-                # Add missing columns
-                for column in missing_columns:
-                    column_type = ''
-                    if column in ['course_id', 'week_id', 'day_id']:
-                        column_type = 'INT NOT NULL'
-                    else:
-                        column_type = 'VARCHAR(255) NOT NULL'
-                    
-                    cursor.execute(f"ALTER TABLE lessons ADD COLUMN {column} {column_type}")
-                    print(f"Added column {column} to lessons table")
-                
-                connection.commit()
-                
-                # Check the updated structure
-                cursor.execute('DESCRIBE lessons')
-                updated_structure = cursor.fetchall()
-                print('Updated lessons table structure:')
-                for col in updated_structure:
-                    print(f"  {col['Field']}: {col['Type']} {col['Null']} {col['Key']} {col['Default']} {col['Extra']}")
+            # Create or upgrade the tables through the versioned migrations
+            applied = migrate(connection)
+            if applied:
+                print('Applied migrations:', applied)
+            print(f"Schema version: {current_version(connection)} (latest: {MIGRATIONS[-1][0]})")
             
             # Check uploads directory
             upload_dir = './uploads'
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger("db_pool")
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of database connections.
+
+    Connections are created lazily by the connect callable, up to max_size.
+    Each borrowed connection is pinged first and connections older than
+    max_age seconds are replaced, so callers always receive a live one.
+    """
+
+    def __init__(self, connect, max_size=10, max_age=1800, timeout=10):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self._idle = []  # stack of idle connections, most recently used last
+        self._created_at = {}  # id(connection) -> creation time
+        self._size = 0
+        self._cond = threading.Condition()
+        # Statistics
+        self.acquired = 0
+        self.created = 0
+        self.recycled = 0
+        self.broken = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self):
+        """Borrow a healthy connection, waiting up to timeout seconds for one"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                # Reserve a slot before connecting outside the lock
+                self._size += 1
+            waited = time.monotonic() - start
+            self.acquired += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        try:
+            if connection is not None:
+                connection = self._check(connection)
+            if connection is None:
+                connection = self._create()
+            return connection
+        except Exception:
+            self._release_slot()
+            raise
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if discard is set"""
+        if connection is None:
+            return
+        if discard or not getattr(connection, "open", True):
+            self._close(connection)
+            self._release_slot()
+            return
+        with self._cond:
+            self._idle.append(connection)
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self):
+        """Return pool size and wait-time statistics"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "acquired": self.acquired,
+                "created": self.created,
+                "recycled": self.recycled,
+                "broken": self.broken,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 3) if self.acquired else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+    def _check(self, connection):
+        """Return the connection if it is still usable, otherwise close it and return None"""
+        created_at = self._created_at.get(id(connection), 0)
+        if time.monotonic() - created_at > self.max_age:
+            self.recycled += 1
+            self._close(connection)
+            return None
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except Exception as e:
+            logger.warning(f"Discarding broken database connection: {e}")
+            self.broken += 1
+            self._close(connection)
+            return None
+
+    def _create(self):
+        connection = self.connect()
+        self._created_at[id(connection)] = time.monotonic()
+        self.created += 1
+        return connection
+
+    def _close(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
@@ -0,0 +1,160 @@
+"""
+Byte-range file responses for lesson downloads.
+
+FileRangeResponse sends a whole file or one byte range of it. When the
+ASGI server offers the zerocopysend or pathsend extension the kernel copies
+the file to the socket (sendfile); otherwise the file is read in large
+chunks on a worker thread, so the event loop never blocks on disk reads.
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+
+CHUNK_SIZE = 256 * 1024
+
+def file_etag(stat_result):
+    """Strong ETag of a file version, from its mtime and size"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+def last_modified(stat_result):
+    """Last-Modified header value of a file"""
+    return formatdate(stat_result.st_mtime, usegmt=True)
+
+def modified_since(if_modified_since, stat_result):
+    """Return False if the file is no newer than an If-Modified-Since value, True otherwise"""
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return True
+    # HTTP dates have a resolution of one second
+    return int(stat_result.st_mtime) > since
+
+def etag_matches(if_none_match, etag):
+    """Return True if an If-None-Match header value lists the ETag (or is *)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def file_not_modified(if_none_match, if_modified_since, stat_result, etag):
+    """Return True if the conditional headers of a file request match the file"""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    return bool(if_modified_since) and not modified_since(if_modified_since, stat_result)
+
+def if_range_matches(if_range, stat_result, etag):
+    """Return True if a Range should be honoured under an If-Range header (or there is none)"""
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # If-Range requires a strong match
+        return if_range == etag
+    return if_range == last_modified(stat_result)
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header lies entirely outside the file"""
+
+def parse_byte_range(range_header, size):
+    """
+    Parse a Range header for a file of the given size
+
+    Returns:
+        tuple: (start, end) with end inclusive, or None to send the whole file.
+        Multiple ranges and malformed headers are ignored, as RFC 9110 allows.
+
+    Raises:
+        RangeNotSatisfiable: If the single range starts past the end of the file
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                raise RangeNotSatisfiable(range_header)
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    return start, min(end, size - 1)
+
+class FileRangeResponse(Response):
+    """
+    Send bytes start..end (inclusive) of a file, with status 206 for a partial range.
+
+    The caller has already stat'ed the file and resolved any Range and
+    conditional headers; stat_result is used for the validators so the
+    headers describe the same version that was checked.
+    """
+
+    def __init__(self, path, stat_result, byte_range=None, filename=None, media_type=None, headers=None, method="GET"):
+        size = stat_result.st_size
+        self.path = path
+        self.start, self.end = byte_range if byte_range is not None else (0, size - 1)
+        self.send_body = method != "HEAD"
+        partial = byte_range is not None and (self.start, self.end) != (0, size - 1)
+        super().__init__(status_code=206 if partial else 200, media_type=media_type, headers=headers)
+        self.headers["content-length"] = str(self.end - self.start + 1)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers.setdefault("etag", file_etag(stat_result))
+        self.headers.setdefault("last-modified", last_modified(stat_result))
+        if partial:
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+        if filename is not None:
+            quoted = quote(filename)
+            disposition = f'attachment; filename="{filename}"' if quoted == filename else f"attachment; filename*=utf-8''{quoted}"
+            self.headers.setdefault("content-disposition", disposition)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        length = self.end - self.start + 1
+        if not self.send_body or length <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            extensions = scope.get("extensions") or {}
+            if "http.response.zerocopysend" in extensions:
+                with open(self.path, "rb") as file:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": file,
+                        "offset": self.start,
+                        "count": length,
+                        "more_body": False
+                    })
+            elif "http.response.pathsend" in extensions and self.status_code == 200:
+                await send({"type": "http.response.pathsend", "path": os.fspath(self.path)})
+            else:
+                await self._send_chunks(send, length)
+        if self.background is not None:
+            await self.background()
+
+    async def _send_chunks(self, send, length):
+        async with await anyio.open_file(self.path, "rb") as file:
+            if self.start:
+                await file.seek(self.start)
+            while length > 0:
+                chunk = await file.read(min(CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": length > 0})
+        if length > 0:
+            # The file shrank while it was being sent; end the response rather than hang
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest of processed lesson PDFs.
+
+Maps every PDF the ingestion pipeline has seen to the SHA-256 of its
+contents, and every content hash to the JSON artifact extracted from it.
+A PDF whose hash already has an artifact is never extracted again, so
+re-runs only process new or modified files and identical uploads share a
+single artifact.
+
+Usage:
+    python ingest_manifest.py uploads/pdfs            # process new or changed PDFs once
+    python ingest_manifest.py uploads/pdfs --watch    # keep polling for changes
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+
+logger = logging.getLogger("ingest_manifest")
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+# Records written to disk at once; flush() writes the rest
+SAVE_BATCH_SIZE = 100
+
+def hash_file(file_path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def artifact_hash(json_path):
+    """Return the content hash stored in a JSON artifact, or None if it is missing or unreadable"""
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('content_hash')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class IngestManifest:
+    """
+    Persistent record of which PDFs have been processed into which artifacts.
+
+    "files" maps a PDF path to its hash, size and mtime, so unchanged files
+    are recognised from a stat call without re-reading them. "artifacts" maps
+    a content hash to the processed JSON file for that content.
+
+    record() only updates memory and saves every save_batch_size records;
+    call flush() after a batch of files so the rest reaches the disk.
+    """
+
+    def __init__(self, manifest_path, save_batch_size=SAVE_BATCH_SIZE):
+        self.manifest_path = Path(manifest_path)
+        self.save_batch_size = save_batch_size
+        self.files = {}
+        self.artifacts = {}
+        self._digests_by_path = {}  # JSON path -> content hashes whose artifact it is
+        self._file_counts = Counter()  # content hash -> number of PDFs with that content
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read the manifest from disk, starting empty if it is missing or from another version"""
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError as e:
+            logger.error(f"Ignoring unreadable manifest {self.manifest_path}: {str(e)}")
+            return
+        if data.get('version') != MANIFEST_VERSION:
+            return
+        self.files = data.get('files', {})
+        self.artifacts = data.get('artifacts', {})
+        self._file_counts = Counter(entry['hash'] for entry in self.files.values())
+        self._digests_by_path = {}
+        for digest, artifact in self.artifacts.items():
+            self._digests_by_path.setdefault(artifact['json_path'], set()).add(digest)
+
+    def save(self):
+        """Write the manifest atomically so a crash never leaves it half written"""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files, 'artifacts': self.artifacts}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        self._unsaved = 0
+
+    def flush(self):
+        """Save the manifest if anything was recorded since the last save"""
+        with self._lock:
+            if self._unsaved:
+                self.save()
+
+    def content_hash(self, pdf_path):
+        """Return the hash of a PDF, reusing the recorded hash if its size and mtime are unchanged"""
+        pdf_path = os.path.abspath(pdf_path)
+        stat = os.stat(pdf_path)
+        entry = self.files.get(pdf_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['hash']
+        return hash_file(pdf_path)
+
+    def is_unchanged(self, pdf_path):
+        """Return True if a PDF matches its recorded stat and its artifact still exists"""
+        pdf_path = os.path.abspath(pdf_path)
+        entry = self.files.get(pdf_path)
+        if not entry:
+            return False
+        stat = os.stat(pdf_path)
+        if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            return False
+        artifact = self.artifacts.get(entry['hash'])
+        return bool(artifact) and os.path.exists(artifact['json_path'])
+
+    def artifact_for(self, pdf_path):
+        """
+        Look up the processed artifact for a PDF's current contents
+
+        Returns:
+            tuple: (content hash, JSON path or None if the content has not been processed)
+        """
+        digest = self.content_hash(pdf_path)
+        artifact = self.artifacts.get(digest)
+        if artifact and artifact_hash(artifact['json_path']) == digest:
+            return digest, artifact['json_path']
+        return digest, None
+
+    def is_shared(self, json_path, pdf_path):
+        """Return True if a JSON artifact belongs to content that another PDF still references"""
+        entry = self.files.get(os.path.abspath(pdf_path))
+        own_hash = entry['hash'] if entry else None
+        for digest in self._digests_by_path.get(json_path, ()):
+            # Files with this content, not counting the PDF itself
+            if self._file_counts[digest] - (digest == own_hash) > 0:
+                return True
+        return False
+
+    def record(self, pdf_path, digest, json_path):
+        """Record that a PDF with the given hash is processed into json_path"""
+        pdf_path = os.path.abspath(pdf_path)
+        stat = os.stat(pdf_path)
+        with self._lock:
+            previous = self.files.get(pdf_path)
+            if previous:
+                self._file_counts[previous['hash']] -= 1
+            self.files[pdf_path] = {'hash': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            self._file_counts[digest] += 1
+
+            artifact = self.artifacts.get(digest)
+            if artifact and artifact['json_path'] != json_path:
+                self._digests_by_path[artifact['json_path']].discard(digest)
+            # The file now holds this content only; other content it used to hold must be extracted again
+            for other in self._digests_by_path.get(json_path, set()) - {digest}:
+                del self.artifacts[other]
+            self._digests_by_path[json_path] = {digest}
+            self.artifacts[digest] = {'json_path': json_path}
+
+            self._unsaved += 1
+            if self._unsaved >= self.save_batch_size:
+                self.save()
+
+    def changed_files(self, directory):
+        """Return the PDFs under a directory that are new or modified since they were processed"""
+        changed = []
+        for path in sorted(Path(directory).rglob('*')):
+            if path.is_file() and path.suffix.lower() == '.pdf' and not self.is_unchanged(path):
+                changed.append(str(path.resolve()))
+        return changed
+
+def sync_directory(integration, directory):
+    """
+    Process every new or modified PDF in a directory
+
+    Args:
+        integration (PDFIntegration): Integration used to extract and store artifacts
+        directory (str): Directory to scan
+
+    Returns:
+        list: JSON paths of the artifacts for the changed files
+    """
+    processed = []
+    try:
+        for pdf_path in integration.manifest.changed_files(directory):
+            try:
+                json_path = integration.process_pdf(pdf_path)
+                integration.refresh_lessons(json_path)
+                processed.append(json_path)
+            except Exception as e:
+                logger.error(f"Error processing {pdf_path}: {str(e)}")
+    finally:
+        integration.manifest.flush()
+    return processed
+
+def watch(integration, directory, interval=5.0):
+    """Poll a directory and process PDFs as they are added or modified"""
+    logger.info(f"Watching {directory} every {interval}s")
+    while True:
+        processed = sync_directory(integration, directory)
+        if processed:
+            logger.info(f"Processed {len(processed)} new or modified PDFs")
+        time.sleep(interval)
+
+if __name__ == "__main__":
+    from pdf_integration import pdf_integration
+
+    parser = argparse.ArgumentParser(description="Process new or modified lesson PDFs")
+    parser.add_argument("directory", nargs="?", default=str(pdf_integration.pdf_dir), help="Directory of PDFs")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the directory for changes")
+    parser.add_argument("--interval", type=float, default=float(os.getenv('INGEST_POLL_INTERVAL', '5')),
+                        help="Seconds between polls in watch mode")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: directory not found: {args.directory}")
+        sys.exit(1)
+
+    if args.watch:
+        try:
+            watch(pdf_integration, args.directory, args.interval)
+        except KeyboardInterrupt:
+            pass
+    else:
+        processed = sync_directory(pdf_integration, args.directory)
+        print(f"Processed {len(processed)} new or modified PDFs")
@@ -4,6 +4,8 @@ import sys
 import pymysql
 from dotenv import load_dotenv
 
+from migrations import current_version, migrate
+
 def init_database():
     """
     Initialize the database by creating it if it doesn't exist
@@ -45,47 +47,10 @@ def init_database():
             cursor.execute(f"USE {db_name}")
             print(f"Using database '{db_name}'")
             
-            # Create users table if it doesn't exist
-            create_table_query = """
-                CREATE TABLE IF NOT EXISTS users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(255) NOT NULL,
-                    surname VARCHAR(255),
-                    email VARCHAR(255) NOT NULL UNIQUE,
-                    password VARCHAR(255) NOT NULL
-                )
-            """
-            cursor.execute(create_table_query)
-            print("Users table created or already exists")
-            
-            # Check if the table has the required columns
-            cursor.execute("DESCRIBE users")
-            columns = [row[0] for row in cursor.fetchall()]
-            
-            # Add role column if it doesn't exist
-            if 'role' not in columns:
-                cursor.execute("ALTER TABLE users ADD COLUMN role VARCHAR(50) DEFAULT 'user'")
-                print("Added 'role' column to users table")
-            
-            # Add active column if it doesn't exist
-            if 'active' not in columns:
-                cursor.execute("ALTER TABLE users ADD COLUMN active BOOLEAN DEFAULT FALSE")
-                print("Added 'active' column to users table")
-            
-            # Add created_at column if it doesn't exist
-            if 'created_at' not in columns:
-                cursor.execute("ALTER TABLE users ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-                print("Added 'created_at' column to users table")
-            
-            # Add last_activity column if it doesn't exist
-            if 'last_activity' not in columns:
-                cursor.execute("""
-                    ALTER TABLE users 
-                    ADD COLUMN last_activity TIMESTAMP 
-                    DEFAULT CURRENT_TIMESTAMP 
-                    ON UPDATE CURRENT_TIMESTAMP
-                """)
-                print("Added 'last_activity' column to users table")
+            # Create or upgrade the tables
+            applied = migrate(connection)
+            print(f"Applied migrations: {applied}" if applied else "No pending migrations")
+            print(f"Schema version: {current_version(connection)}")
             
             # Commit the changes
             connection.commit()
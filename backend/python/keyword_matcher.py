@@ -0,0 +1,101 @@
+import threading
+from collections import deque
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton that finds every keyword occurring in a text.
+
+    Matching is plain substring matching, the same as running `keyword in text`
+    for each keyword, but done in a single pass over the text regardless of
+    how many keywords there are.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (keyword,)
+
+        # Breadth-first pass to link each state to its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Return the set of keywords that occur anywhere in text"""
+        found = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+                if len(found) == len(self.keywords):
+                    break
+        return found
+
+    def find_in_order(self, text):
+        """Return the keywords that occur in text, in the order they were given"""
+        found = self.find(text)
+        return [keyword for keyword in self.keywords if keyword in found]
+
+class KeywordClassifier:
+    """
+    Map text to labels, where each label has a list of trigger keywords.
+
+    All labels share one KeywordMatcher, so classifying text is a single pass
+    no matter how many labels and keywords there are.
+    """
+
+    def __init__(self, labelled_keywords):
+        """labelled_keywords maps each label to its keywords, in priority order"""
+        self.labels = list(labelled_keywords)
+        self._labels_for = {}
+        for label, keywords in labelled_keywords.items():
+            for keyword in keywords:
+                self._labels_for.setdefault(keyword, []).append(label)
+        self.matcher = KeywordMatcher(self._labels_for)
+
+    def classify(self, text):
+        """Return every label with a keyword in text, in priority order"""
+        matched = set()
+        for keyword in self.matcher.find(text):
+            matched.update(self._labels_for[keyword])
+        return [label for label in self.labels if label in matched]
+
+_matcher_cache = {}
+_matcher_lock = threading.Lock()
+
+def get_keyword_matcher(keywords):
+    """Return a KeywordMatcher for a fixed vocabulary, compiling it once"""
+    key = tuple(keywords)
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        matcher = KeywordMatcher(key)
+        with _matcher_lock:
+            _matcher_cache[key] = matcher
+    return matcher
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Course -> week -> day -> lesson navigation tree.
+
+The tree is built from the courses, weeks, days and lessons tables and
+kept in memory as serialized JSON. A cheap catalog version query (row
+counts and checksums of the four tables) decides whether it has to be
+rebuilt, so an unchanged catalog is never re-joined or re-serialized and
+the tree keeps the same ETag. ETags of the /api/lessons listing are
+derived from the same version.
+
+Usage:
+    python lesson_catalog.py            # print the tree
+    python lesson_catalog.py --version  # print the catalog version
+"""
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger("lesson_catalog")
+
+# One row of per-table counts and order-independent checksums; changes whenever
+# a course, week, day or lesson is added, removed, renamed or moved
+CATALOG_VERSION_QUERY = """
+    SELECT
+        (SELECT CONCAT_WS(':', COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', id, name))), 0)) FROM courses) AS courses,
+        (SELECT CONCAT_WS(':', COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', id, name))), 0)) FROM weeks) AS weeks,
+        (SELECT CONCAT_WS(':', COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', id, day_name))), 0)) FROM days) AS days,
+        (SELECT CONCAT_WS(':', COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', id, course_id, week_id, day_id, lesson_name, file_path))), 0))
+         FROM lessons) AS lessons
+"""
+
+TREE_LESSONS_QUERY = """
+    SELECT
+        l.id, l.lesson_name, l.course_id,
+        l.week_id, w.name AS week_name,
+        l.day_id, d.day_name AS day_name
+    FROM lessons l
+    JOIN weeks w ON l.week_id = w.id
+    JOIN days d ON l.day_id = d.id
+    ORDER BY l.course_id, l.week_id, l.day_id, l.id
+"""
+
+def catalog_version(cursor):
+    """Return a short hash that changes whenever the lesson catalog changes"""
+    cursor.execute(CATALOG_VERSION_QUERY)
+    row = cursor.fetchone()
+    values = row.values() if isinstance(row, dict) else row
+    return hashlib.sha256("|".join(str(value) for value in values).encode()).hexdigest()[:32]
+
+def build_lesson_tree(cursor):
+    """
+    Build the nested navigation tree
+
+    Returns:
+        list: Courses in id order, each with its weeks, days and lessons in id order
+    """
+    cursor.execute("SELECT id, name FROM courses ORDER BY id")
+    courses = {row["id"]: {"id": row["id"], "name": row["name"], "weeks": []} for row in cursor.fetchall()}
+
+    cursor.execute(TREE_LESSONS_QUERY)
+    week = day = None
+    for row in cursor.fetchall():
+        course = courses.get(row["course_id"])
+        if course is None:
+            continue
+        # Rows arrive grouped by course, week and day, so a new group only has to be compared with the last one
+        if not course["weeks"] or course["weeks"][-1]["id"] != row["week_id"]:
+            week = {"id": row["week_id"], "name": row["week_name"], "days": []}
+            course["weeks"].append(week)
+            day = None
+        if day is None or day["id"] != row["day_id"]:
+            day = {"id": row["day_id"], "name": row["day_name"], "lessons": []}
+            week["days"].append(day)
+        day["lessons"].append({"id": row["id"], "lesson_name": row["lesson_name"]})
+    return list(courses.values())
+
+class CatalogVersion:
+    """
+    The current catalog version, re-read at most once per check_interval seconds.
+
+    In between, fresh() answers from memory so conditional requests can be
+    validated without touching the database.
+    """
+
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self.version = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def fresh(self):
+        """Return the version if it was read within check_interval, else None"""
+        if self.version is not None and time.monotonic() - self.checked_at < self.check_interval:
+            return self.version
+        return None
+
+    def get(self, cursor):
+        """Return the version, reading it with the cursor if it is stale"""
+        with self._lock:
+            version = self.fresh()
+            if version is None:
+                version = self.version = catalog_version(cursor)
+                self.checked_at = time.monotonic()
+            return version
+
+    def invalidate(self):
+        """Read the version again on the next request"""
+        self.checked_at = 0.0
+
+class LessonTreeCache:
+    """
+    The serialized navigation tree with its ETag, rebuilt when the catalog version changes.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.version = None
+        self.etag = None
+        self.body = None
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+
+    def fresh(self):
+        """Return (etag, body) if the catalog is known to be unchanged, else None"""
+        if self.body is not None and self.catalog.fresh() == self.version:
+            return self.etag, self.body
+        return None
+
+    def get(self, cursor):
+        """
+        Return (etag, body), rebuilding the tree only if the catalog version changed
+
+        Args:
+            cursor: A DictCursor on the application database
+        """
+        with self._lock:
+            version = self.catalog.get(cursor)
+            if version != self.version:
+                start = time.perf_counter()
+                tree = build_lesson_tree(cursor)
+                self.body = json.dumps({"status": "success", "data": tree}, separators=(",", ":")).encode("utf-8")
+                # Derived from the body, so every server process gives the same tree the same ETag
+                self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+                self.version = version
+                self.rebuilds += 1
+                logger.info(f"Built lesson tree ({len(self.body)} bytes) in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return self.etag, self.body
+
+    def stats(self):
+        return {
+            "etag": self.etag,
+            "bytes": len(self.body) if self.body is not None else 0,
+            "rebuilds": self.rebuilds,
+            "check_interval": self.catalog.check_interval
+        }
+
+if __name__ == "__main__":
+    from pdf_integration import pdf_integration
+
+    parser = argparse.ArgumentParser(description="Show the lesson navigation tree")
+    parser.add_argument("--version", action="store_true", help="Print the catalog version instead of the tree")
+    args = parser.parse_args()
+
+    connection = pdf_integration.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            if args.version:
+                print(catalog_version(cursor))
+            else:
+                print(json.dumps(build_lesson_tree(cursor), indent=2))
+    finally:
+        connection.close()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Lesson text and structure stored in the database.
+
+The lesson_content table holds the extracted text, sections, QA pairs and
+summary of every lesson, so reading a lesson is one primary-key lookup that
+does not depend on the lesson file being present on the local disk.
+
+Usage:
+    python lesson_content.py --backfill   # store content for lessons ingested before the table existed
+"""
+import sys
+import json
+import zlib
+import hashlib
+import logging
+import argparse
+
+logger = logging.getLogger("lesson_content")
+
+COMPRESSION_LEVEL = 6
+
+# Columns to add to a lessons query joined as: LEFT JOIN lesson_content lc ON lc.lesson_id = l.id
+CONTENT_COLUMNS = "lc.summary AS content_summary, lc.body AS content_body"
+
+def make_summary(text):
+    """Create a simple summary (first 500 characters)"""
+    return text[:500] + "..." if len(text) > 500 else text
+
+def pack_content(text, sections=(), qa_pairs=()):
+    """Compress lesson text and structure into a blob for lesson_content.body"""
+    data = json.dumps({'text': text, 'sections': list(sections), 'qa_pairs': list(qa_pairs)}, ensure_ascii=False)
+    return zlib.compress(data.encode('utf-8'), COMPRESSION_LEVEL)
+
+def unpack_content(body):
+    """Return the dict stored by pack_content"""
+    return json.loads(zlib.decompress(body).decode('utf-8'))
+
+def save_lesson_content(cursor, lesson_id, text, summary=None, sections=(), qa_pairs=()):
+    """Insert or replace the stored content of a lesson without committing"""
+    if summary is None:
+        summary = make_summary(text)
+    cursor.execute(
+        """
+        INSERT INTO lesson_content (lesson_id, content_hash, summary, body, text_length)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash), summary = VALUES(summary),
+            body = VALUES(body), text_length = VALUES(text_length)
+        """,
+        (lesson_id, hashlib.sha256(text.encode('utf-8')).hexdigest(), summary,
+         pack_content(text, sections, qa_pairs), len(text))
+    )
+
+def save_processed_content(cursor, lesson_id, json_content):
+    """Store the content of a processed PDF artifact for a lesson"""
+    save_lesson_content(
+        cursor, lesson_id,
+        json_content.get('full_text', ''),
+        json_content.get('summary', ''),
+        json_content.get('sections', []),
+        json_content.get('qa_pairs', [])
+    )
+
+def read_content(row):
+    """
+    Decode the stored content from a row selected with CONTENT_COLUMNS
+
+    Returns:
+        dict: text, summary, sections and qa_pairs, or None if the lesson has no stored content
+    """
+    if not row or row.get('content_body') is None:
+        return None
+    content = unpack_content(row['content_body'])
+    content['summary'] = row.get('content_summary') or ''
+    return content
+
+def load_file_content(file_path):
+    """Read lesson content from a processed JSON artifact, a PDF or a text file"""
+    if file_path.endswith('.json'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            json_content = json.load(f)
+        return {
+            'text': json_content.get('full_text', ''),
+            'summary': json_content.get('summary', ''),
+            'sections': json_content.get('sections', []),
+            'qa_pairs': json_content.get('qa_pairs', [])
+        }
+    if file_path.lower().endswith('.pdf'):
+        from pdf_processor import LessonTextBuilder, iter_page_texts
+        builder = LessonTextBuilder().feed_all(iter_page_texts(file_path))
+        return {'text': builder.text, 'summary': builder.summary, 'sections': builder.sections, 'qa_pairs': builder.qa_pairs}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return {'text': text, 'summary': make_summary(text), 'sections': [], 'qa_pairs': []}
+
+def backfill(connection):
+    """
+    Store content for every lesson that has none yet, reading it from the lesson file
+
+    Returns:
+        tuple: (lessons stored, lessons skipped because their file is missing or unreadable)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT l.id, l.file_path FROM lessons l
+            LEFT JOIN lesson_content lc ON lc.lesson_id = l.id
+            WHERE lc.lesson_id IS NULL
+            """
+        )
+        lessons = cursor.fetchall()
+
+    stored = skipped = 0
+    for lesson in lessons:
+        try:
+            content = load_file_content(lesson['file_path'])
+        except Exception as e:
+            logger.error(f"Skipping lesson {lesson['id']}: {str(e)}")
+            skipped += 1
+            continue
+        with connection.cursor() as cursor:
+            save_lesson_content(cursor, lesson['id'], content['text'], content['summary'],
+                                content['sections'], content['qa_pairs'])
+        connection.commit()
+        stored += 1
+    return stored, skipped
+
+if __name__ == "__main__":
+    from pdf_integration import pdf_integration
+
+    parser = argparse.ArgumentParser(description="Manage lesson content stored in the database")
+    parser.add_argument("--backfill", action="store_true", help="Store content for lessons that have none")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        sys.exit(0)
+
+    connection = pdf_integration.get_connection()
+    try:
+        stored, skipped = backfill(connection)
+        print(f"Stored content for {stored} lessons, skipped {skipped}")
+    finally:
+        connection.close()
@@ -0,0 +1,201 @@
+import hashlib
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from keyword_matcher import KeywordMatcher
+
+# Same sentence boundaries the chat fallback has always used
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Sentences shorter than this are too short to be useful answers
+MIN_SENTENCE_LENGTH = 10
+
+def normalize_token(token):
+    """Lowercase a token and strip a plural 's' so 'networks' matches 'network'"""
+    token = token.lower()
+    if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """Split text into normalized word tokens"""
+    return [normalize_token(token) for token in TOKEN_PATTERN.findall(text.lower())]
+
+def term_frequencies(text):
+    """Return token -> number of occurrences in text"""
+    frequencies = {}
+    for token in tokenize(text):
+        frequencies[token] = frequencies.get(token, 0) + 1
+    return frequencies
+
+def estimate_tokens(text):
+    """Rough token count for prompt budgeting (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+class BM25Index:
+    """BM25 inverted index over a list of documents identified by position"""
+
+    def __init__(self, documents=(), k1=1.5, b=0.75, frequencies=None):
+        """
+        documents is an iterable of (doc_id, text) pairs. Documents that were
+        already tokenized can be passed instead as frequencies, an iterable of
+        (doc_id, {term: count}) pairs from term_frequencies.
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> list of (doc id, BM25 weight)
+        self.lengths = {}  # doc id -> number of tokens
+
+        if frequencies is None:
+            frequencies = ((doc_id, term_frequencies(text)) for doc_id, text in documents)
+        for doc_id, counts in frequencies:
+            self.lengths[doc_id] = sum(counts.values())
+            for token, frequency in counts.items():
+                self.postings.setdefault(token, []).append((doc_id, frequency))
+
+        self.document_count = len(self.lengths)
+        self.average_length = (sum(self.lengths.values()) / self.document_count) if self.document_count else 0.0
+
+        # Precompute each posting's full BM25 weight so a query is only additions
+        for term, postings in self.postings.items():
+            idf = math.log(1 + (self.document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            weighted = []
+            for doc_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.average_length or 1))
+                weighted.append((doc_id, idf * frequency * (self.k1 + 1) / (frequency + norm)))
+            self.postings[term] = weighted
+
+    def score(self, terms):
+        """Return a dict of doc id -> BM25 score for the query terms"""
+        scores = {}
+        for term in set(normalize_token(term) for term in terms):
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return scores
+
+    def top(self, terms, k):
+        """Return up to k (doc id, score) pairs, best first, ties in document order"""
+        return heapq.nlargest(k, self.score(terms).items(), key=lambda item: (item[1], -item[0]))
+
+class LessonIndex:
+    """
+    BM25 index over the sentences of one lesson.
+
+    Built once per lesson text, then queried for the top-k sentences for a
+    question. Sentences that mention lesson topics are kept in a separate
+    ranking, used when a question shares no terms with the lesson.
+    """
+
+    def __init__(self, text=None, topics=(), sentences=None, frequencies=None):
+        """
+        Index text, or an existing sentence split passed as sentences.
+        frequencies, the term_frequencies of each sentence, saves tokenizing them again.
+        """
+        if sentences is None:
+            sentences = [sentence.strip() for sentence in SENTENCE_SPLIT.split(text)]
+        self.sentences = sentences
+        documents = [
+            (i, sentence) for i, sentence in enumerate(self.sentences)
+            if len(sentence) >= MIN_SENTENCE_LENGTH
+        ]
+        if frequencies is None:
+            self.bm25 = BM25Index(documents)
+        else:
+            self.bm25 = BM25Index(frequencies=((i, frequencies[i]) for i, _ in documents))
+        self.document_count = self.bm25.document_count
+
+        topic_counts = {}
+        if topics:
+            # A topic listed several times counts that many times
+            weights = Counter(topics)
+            matcher = KeywordMatcher(weights)
+            for i, sentence in documents:
+                found = matcher.find(sentence.lower())
+                if found:
+                    topic_counts[i] = sum(weights[topic] for topic in found)
+        self.topic_ranking = sorted(topic_counts, key=lambda i: (-topic_counts[i], i))
+
+    def top_sentences(self, terms, k=5):
+        """
+        Return the k most relevant sentences for the query terms.
+
+        Falls back to the sentences mentioning the most lesson topics when
+        no query term occurs in the lesson.
+        """
+        best = self.bm25.top(terms, k)
+        if not best:
+            return [self.sentences[i] for i in self.topic_ranking[:k]]
+        return [self.sentences[i] for i, _ in best]
+
+class LessonChunks:
+    """
+    Overlapping word-window chunks of a lesson with a BM25 index over them.
+
+    Used to send Grok only the parts of a lesson relevant to a question
+    instead of the whole text.
+    """
+
+    def __init__(self, text, chunk_words=200, overlap_words=50):
+        words = text.split()
+        step = max(1, chunk_words - overlap_words)
+        self.chunks = []
+        for start in range(0, max(len(words), 1), step):
+            chunk = " ".join(words[start:start + chunk_words])
+            if chunk:
+                self.chunks.append(chunk)
+            if start + chunk_words >= len(words):
+                break
+        self.bm25 = BM25Index(enumerate(self.chunks))
+
+    def select(self, terms, token_budget):
+        """
+        Return the chunks most relevant to the terms that fit in token_budget.
+
+        Chunks are returned in lesson order. When nothing matches, the opening
+        chunks of the lesson are used. At least one chunk is always returned
+        for a non-empty lesson.
+        """
+        ranked = [i for i, _ in self.bm25.top(terms, len(self.chunks))]
+        if not ranked:
+            ranked = list(range(len(self.chunks)))
+        selected = []
+        used = 0
+        for i in ranked:
+            tokens = estimate_tokens(self.chunks[i])
+            if selected and used + tokens > token_budget:
+                continue
+            selected.append(i)
+            used += tokens
+            if used >= token_budget:
+                break
+        return [self.chunks[i] for i in sorted(selected)]
+
+# Chunk indexes and lesson profiles (which own the sentence index) are keyed by a hash
+# of the lesson text, so each lesson is processed once
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+INDEX_CACHE_SIZE = 64
+
+def cached_for_text(kind, text, build):
+    """Return build() for a lesson text, reusing the result for identical text"""
+    key = (kind, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = build()
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+def get_lesson_chunks(text, chunk_words=200, overlap_words=50):
+    """Return the LessonChunks for a lesson text, building them on first use"""
+    return cached_for_text(('chunks', chunk_words, overlap_words), text,
+                   lambda: LessonChunks(text, chunk_words, overlap_words))
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import logging
+import re
+
+from keyword_matcher import KeywordMatcher, get_keyword_matcher
+from lesson_index import MIN_SENTENCE_LENGTH, SENTENCE_SPLIT, LessonIndex, cached_for_text, term_frequencies
+
+logger = logging.getLogger("lesson_profile")
+
+# Bump when the profile format or extraction rules change so stored profiles are rebuilt
+PROFILE_VERSION = 3
+
+# Common educational terms that might not be capitalized in a lesson
+COMMON_TERMS = ['deep learning', 'machine learning', 'neural networks', 'ai', 'artificial intelligence',
+                'data science', 'algorithm', 'model', 'training', 'dataset', 'classification',
+                'regression', 'supervised', 'unsupervised', 'reinforcement', 'computer vision',
+                'natural language processing', 'nlp', 'cnn', 'rnn', 'lstm', 'gan', 'transformer',
+                'attention mechanism', 'backpropagation', 'gradient descent', 'activation function',
+                'loss function', 'overfitting', 'underfitting', 'bias', 'variance', 'regularization',
+                'dropout', 'batch normalization', 'transfer learning', 'fine-tuning']
+
+# Capitalized words or phrases that might be topics
+CAPITALIZED_PHRASE = re.compile(r'[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*')
+
+def content_hash(text):
+    """Return the SHA-256 hex digest of a lesson text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def extract_lesson_topics(text):
+    """Return the known terms a lesson mentions followed by its capitalized phrases"""
+    # This is a simple approach - we're looking for capitalized words or phrases that might be topics
+    potential_topics = [topic.lower() for topic in CAPITALIZED_PHRASE.findall(text)]
+
+    # Check which common terms are in the lesson, in a single pass over the text
+    lesson_topics = get_keyword_matcher(COMMON_TERMS).find_in_order(text.lower())
+
+    # Add the potential topics we extracted
+    lesson_topics.extend([topic for topic in potential_topics if len(topic) > 3])  # Filter out short words
+    return lesson_topics
+
+class LessonProfile:
+    """
+    Everything the chat path derives from a lesson's text, computed once.
+
+    Holds the topic list, the sentence split and the term statistics of
+    every sentence (its term frequencies, empty for sentences too short to
+    be answers). Profiles are stored in the lesson_profiles table so they
+    survive restarts and are shared between servers; the topic matcher and
+    the sentence index are built from them lazily in each process, without
+    tokenizing the lesson again.
+    """
+
+    def __init__(self, content_hash, topics, sentences, term_stats):
+        self.content_hash = content_hash
+        self.topics = topics
+        self.sentences = sentences
+        self.term_stats = term_stats
+        self._topic_matcher = None
+        self._index = None
+
+    @classmethod
+    def build(cls, text, previous=None):
+        """
+        Compute the profile of a lesson text.
+        With the previous profile of the lesson, only sentences it did not contain are tokenized.
+        """
+        sentences = [sentence.strip() for sentence in SENTENCE_SPLIT.split(text)]
+        known = dict(zip(previous.sentences, previous.term_stats)) if previous is not None else {}
+        term_stats = [
+            (known.get(sentence) or term_frequencies(sentence)) if len(sentence) >= MIN_SENTENCE_LENGTH else {}
+            for sentence in sentences
+        ]
+        return cls(content_hash(text), extract_lesson_topics(text), sentences, term_stats)
+
+    @property
+    def topic_matcher(self):
+        """Matcher that finds every lesson topic in a question in one pass"""
+        if self._topic_matcher is None:
+            self._topic_matcher = KeywordMatcher(self.topics)
+        return self._topic_matcher
+
+    @property
+    def index(self):
+        """BM25 sentence index built from the stored sentence split and term statistics"""
+        if self._index is None:
+            self._index = LessonIndex(topics=self.topics, sentences=self.sentences, frequencies=self.term_stats)
+        return self._index
+
+    def to_json(self):
+        return json.dumps({
+            "version": PROFILE_VERSION,
+            "content_hash": self.content_hash,
+            "topics": self.topics,
+            "sentences": self.sentences,
+            "term_stats": self.term_stats
+        })
+
+    @classmethod
+    def from_json(cls, data):
+        """Load a stored profile, or return None if it was written by another profile version"""
+        profile = json.loads(data)
+        if profile.get("version") != PROFILE_VERSION:
+            return None
+        return cls(profile["content_hash"], profile["topics"], profile["sentences"], profile["term_stats"])
+
+def load_stored_profile(cursor, lesson_id):
+    """Return the stored profile for a lesson, whatever content it was built from, or None"""
+    cursor.execute(
+        "SELECT profile FROM lesson_profiles WHERE lesson_id = %s",
+        (lesson_id,)
+    )
+    row = cursor.fetchone()
+    return LessonProfile.from_json(row["profile"]) if row else None
+
+def refresh_profile(cursor, lesson_id, text):
+    """Bring the stored profile of a lesson up to date with its text"""
+    stored = load_stored_profile(cursor, lesson_id)
+    if stored is not None and stored.content_hash == content_hash(text):
+        return stored
+    profile = LessonProfile.build(text, previous=stored)
+    save_profile(cursor, lesson_id, profile)
+    return profile
+
+def save_profile(cursor, lesson_id, profile):
+    """Insert or replace the stored profile for a lesson"""
+    cursor.execute(
+        """
+        INSERT INTO lesson_profiles (lesson_id, content_hash, profile)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash), profile = VALUES(profile)
+        """,
+        (lesson_id, profile.content_hash, profile.to_json())
+    )
+
+def store_profile(get_connection, release_connection, lesson_id, profile):
+    """Save a profile with its own connection and commit; used off the request path"""
+    connection = None
+    try:
+        connection = get_connection()
+        if connection:
+            with connection.cursor() as cursor:
+                save_profile(cursor, lesson_id, profile)
+            connection.commit()
+    except Exception as e:
+        logger.error(f"Error storing profile for lesson {lesson_id}: {str(e)}")
+    finally:
+        if connection:
+            (release_connection or (lambda c: c.close()))(connection)
+
+def get_lesson_profile(text, lesson_id=None, get_connection=None, release_connection=None, executor=None):
+    """
+    Return the profile for a lesson text, computing it at most once.
+
+    Profiles are cached in-process by lesson and content hash. On the first
+    load of a lesson in this process the stored profile is read from
+    lesson_profiles when get_connection is given. If it is missing or stale
+    it is built here, reusing the term statistics of unchanged sentences,
+    and written back on executor so the caller never waits for the write.
+    Without an executor nothing is written; ingestion stores the profiles of new lessons.
+    """
+    def build():
+        if lesson_id is None or get_connection is None:
+            return LessonProfile.build(text)
+        stored = None
+        connection = None
+        try:
+            connection = get_connection()
+            if connection:
+                with connection.cursor() as cursor:
+                    stored = load_stored_profile(cursor, lesson_id)
+        except Exception as e:
+            logger.error(f"Error loading stored profile for lesson {lesson_id}: {str(e)}")
+        finally:
+            if connection:
+                (release_connection or (lambda c: c.close()))(connection)
+        if stored is not None and stored.content_hash == content_hash(text):
+            return stored
+        profile = LessonProfile.build(text, previous=stored)
+        if executor is not None:
+            executor.submit(store_profile, get_connection, release_connection, lesson_id, profile)
+        return profile
+
+    return cached_for_text(('profile', lesson_id), text, build)
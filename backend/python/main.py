@@ -1,18 +1,34 @@
 import os
 import json
-import fitz  # PyMuPDF
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Response
+import base64
+import asyncio
+import functools
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response, Query
 import requests
 import pymysql
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from openai import OpenAI
 import string
 import re
-from fastapi.responses import FileResponse
+import time
+import hashlib
 from pathlib import Path
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from cache import ExtractedTextCache, ResponseCache, SingleFlight
+from db_pool import ConnectionPool
+from migrations import current_version, migrate
+from lesson_index import get_lesson_chunks, estimate_tokens
+from lesson_catalog import CatalogVersion, LessonTreeCache
+from lesson_content import CONTENT_COLUMNS, read_content
+from lesson_profile import get_lesson_profile
+from keyword_matcher import KeywordClassifier
+from pdf_processor import iter_page_texts
+from sample_pdfs import SamplePDFPending, render_lesson_sample, sample_pdfs
+from file_serving import FileRangeResponse, RangeNotSatisfiable, etag_matches, file_etag, file_not_modified, if_range_matches, last_modified, parse_byte_range
 
 # Load environment variables from .env file
 load_dotenv()
@@ -28,6 +44,42 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME", "aischool")
 
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_MAX_AGE = int(os.getenv("DB_POOL_MAX_AGE", "1800"))  # seconds before a connection is recycled
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+
+# Extracted PDF text cache configuration
+PDF_TEXT_CACHE_MAX_BYTES = int(os.getenv("PDF_TEXT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# LLM answer cache configuration
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+
+# Lesson text keyed by (lesson id, content hash), shared by the content and batch lesson endpoints
+LESSON_TEXT_CACHE_TTL = int(os.getenv("LESSON_TEXT_CACHE_TTL", "3600"))  # seconds
+LESSON_TEXT_CACHE_MAX_ENTRIES = int(os.getenv("LESSON_TEXT_CACHE_MAX_ENTRIES", "512"))
+LESSONS_BATCH_MAX_IDS = int(os.getenv("LESSONS_BATCH_MAX_IDS", "100"))
+# Seconds between checks for catalog and lesson content changes; conditional GETs are answered from memory in between
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "5"))
+# Lets a reverse proxy reuse lesson responses for one check interval, then revalidate them with the ETag
+LESSONS_CACHE_CONTROL = os.getenv("LESSONS_CACHE_CONTROL", f"public, max-age={int(CATALOG_CHECK_INTERVAL)}, must-revalidate")
+# Seconds a lesson's resolved download path is reused before the database is asked again
+LESSON_PATH_CACHE_TTL = int(os.getenv("LESSON_PATH_CACHE_TTL", "300"))
+
+# Sample PDFs served for lessons whose file is missing; the shared fallback is rendered at startup
+SAMPLE_PDF_DIR = Path("backend/python/pdfs")
+FALLBACK_PDF_PATH = str(SAMPLE_PDF_DIR / "sample_lesson.pdf")
+
+# Retrieval configuration: only the most relevant lesson chunks are sent to Grok
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+CHUNK_WORDS = int(os.getenv("CHUNK_WORDS", "200"))
+CHUNK_OVERLAP_WORDS = int(os.getenv("CHUNK_OVERLAP_WORDS", "50"))
+
+# Worker threads for blocking database/PDF work and for Grok API calls
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "16"))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "32"))
+
 # Check if database credentials are provided
 if not DB_USER or not DB_PASSWORD:
     print("Warning: DB_USER or DB_PASSWORD environment variables not set. Database functionality will be limited.")
@@ -75,6 +127,53 @@ app.add_middleware(
 # Keep track of connected WebSockets
 active_connections = {}
 
+# Cache of extracted lesson text, invalidated when the file's mtime or size changes
+pdf_text_cache = ExtractedTextCache(max_bytes=PDF_TEXT_CACHE_MAX_BYTES)
+
+# Cache of Grok answers keyed by lesson, lesson content, model and normalized question
+answer_cache = ResponseCache(max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL)
+
+# Decoded lesson text; the content hash in the key means an updated lesson is a miss
+lesson_text_cache = ResponseCache(max_entries=LESSON_TEXT_CACHE_MAX_ENTRIES, ttl=LESSON_TEXT_CACHE_TTL)
+
+# Catalog version behind the /api/lessons and /api/lessons/tree ETags
+catalog_version_cache = CatalogVersion(check_interval=CATALOG_CHECK_INTERVAL)
+
+# Serialized course/week/day/lesson tree, rebuilt when the catalog version changes
+lesson_tree_cache = LessonTreeCache(catalog_version_cache)
+
+# Last ETag sent for each lesson's content, trusted for one check interval
+lesson_etag_cache = ResponseCache(max_entries=4096, ttl=CATALOG_CHECK_INTERVAL)
+
+# Resolved PDF path of each lesson download; the file's own mtime and size give the download ETag
+lesson_path_cache = ResponseCache(max_entries=4096, ttl=LESSON_PATH_CACHE_TTL)
+
+# Identical questions that arrive while an answer is being generated share one Grok call
+grok_single_flight = SingleFlight()
+
+# Bounded executors so blocking work never runs on the event loop.
+# Grok calls get their own pool so slow completions cannot starve DB and PDF work.
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+llm_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking database or PDF function on the blocking executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
+
+async def run_llm(func, *args, **kwargs):
+    """Run a blocking Grok API call on the LLM executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(llm_executor, functools.partial(func, *args, **kwargs))
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    """Stop the worker threads and close pooled connections on shutdown"""
+    blocking_executor.shutdown(wait=False)
+    llm_executor.shutdown(wait=False)
+    sample_pdfs.shutdown()
+    db_pool.close_all()
+
 # List of stop words to remove
 STOP_WORDS = {'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", "you've", "you'll", 
               "you'd", 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 
@@ -106,26 +205,148 @@ def clean_text(text):
     # Join words back together
     return ' '.join(words)
 
+def answer_cache_key(lesson_id, lesson_content, model, question):
+    """Build the answer cache key for a question about a lesson"""
+    content_hash = hashlib.sha256((lesson_content or "").encode("utf-8")).hexdigest()
+    # Fall back to the lowercased question if it is made up entirely of stop words
+    normalized = clean_text(question) or question.strip().lower()
+    return (str(lesson_id) if lesson_id is not None else None, content_hash, model, normalized)
+
+def create_db_connection():
+    """Open a new connection to the database"""
+    connection = pymysql.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True
+    )
+    print(f"Successfully connected to database {DB_NAME}")
+    return connection
+
+# Shared pool of database connections
+db_pool = ConnectionPool(
+    create_db_connection,
+    max_size=DB_POOL_SIZE,
+    max_age=DB_POOL_MAX_AGE,
+    timeout=DB_POOL_TIMEOUT
+)
+
+def run_migrations():
+    """Apply pending schema migrations with a pooled connection"""
+    connection = get_db_connection()
+    if not connection:
+        print("Skipping schema migrations: database unavailable")
+        return
+    try:
+        applied = migrate(connection)
+        print(f"Schema version {current_version(connection)}" + (f", applied migrations {applied}" if applied else ""))
+    except Exception as e:
+        print(f"Schema migration error: {e}")
+    finally:
+        release_db_connection(connection)
+
+@app.on_event("startup")
+async def apply_migrations():
+    """Bring the database schema up to date before serving requests"""
+    await run_blocking(run_migrations)
+
+@app.on_event("startup")
+async def prepare_sample_pdfs():
+    """Render the fallback lesson PDF in the background so downloads never have to"""
+    sample_pdfs.get(FALLBACK_PDF_PATH, render_lesson_sample)
+
+def build_lesson_context(lesson_content, question):
+    """
+    Select the lesson chunks most relevant to a question within PROMPT_TOKEN_BUDGET.
+    Returns the context text and retrieval statistics for logging.
+    """
+    start = time.monotonic()
+    chunks = get_lesson_chunks(lesson_content, CHUNK_WORDS, CHUNK_OVERLAP_WORDS)
+    selected = chunks.select(clean_text(question).split(), PROMPT_TOKEN_BUDGET)
+    context = "\n...\n".join(selected)
+    return context, {
+        "chunks": len(selected),
+        "total_chunks": len(chunks.chunks),
+        "context_tokens": estimate_tokens(context),
+        "lesson_tokens": estimate_tokens(lesson_content),
+        "retrieval_ms": round((time.monotonic() - start) * 1000, 2)
+    }
+
+def log_grok_request(label, prompt, retrieval, latency_ms, cached=False, coalesced=False):
+    """Log prompt size and latency for a Grok request"""
+    print(
+        f"Grok request for {label}: prompt ~{estimate_tokens(prompt)} tokens "
+        f"({retrieval['chunks']}/{retrieval['total_chunks']} chunks, lesson ~{retrieval['lesson_tokens']} tokens, "
+        f"retrieval {retrieval['retrieval_ms']} ms), latency {latency_ms} ms, "
+        f"cached={cached}, coalesced={coalesced}"
+    )
+
 def get_db_connection():
-    """Get a connection to the database"""
+    """Borrow a connection from the pool; return it with release_db_connection"""
     try:
-        # Create a connection to the database
-        connection = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        
-        print(f"Successfully connected to database {DB_NAME}")
-        return connection
+        return db_pool.acquire()
     except Exception as e:
         print(f"Error connecting to database: {e}")
         print(f"Database connection parameters: host={DB_HOST}, user={DB_USER}, database={DB_NAME}")
         return None
 
+def release_db_connection(connection):
+    """Return a borrowed connection to the pool"""
+    db_pool.release(connection)
+
+# Lesson catalog row with its course, week and day names; lesson_content is joined for content columns
+LESSON_CATALOG_QUERY = """
+        SELECT 
+            l.id, l.lesson_name, l.file_path, 
+            l.course_id, c.name as course_name,
+            l.week_id, w.name as week_name,
+            l.day_id, d.day_name as day_name,
+            {columns}
+        FROM lessons l
+        JOIN courses c ON l.course_id = c.id
+        JOIN weeks w ON l.week_id = w.id
+        JOIN days d ON l.day_id = d.id
+        LEFT JOIN lesson_content lc ON lc.lesson_id = l.id
+        WHERE {where}
+        """
+
+def lesson_catalog_query(columns, where):
+    """Build the lesson catalog query with extra lesson_content columns and a WHERE clause"""
+    return LESSON_CATALOG_QUERY.format(columns=columns, where=where)
+
+def read_lesson_text(lesson):
+    """Return the text of a catalog row from its CONTENT_COLUMNS, reading its file if nothing is stored"""
+    stored = read_content(lesson)
+    if stored is not None:
+        content = stored["text"]
+        lesson_text_cache.put((lesson["id"], lesson["content_hash"]), content)
+    # Lessons without stored content are read through pdf_text_cache, keyed by mtime and size,
+    # so an edited file is picked up; ingestion and lesson_content.py --backfill store content
+    elif lesson["file_path"] and os.path.exists(lesson["file_path"]):
+        try:
+            content = pdf_text_cache.get_or_load(lesson["file_path"], read_pdf_text)
+        except Exception as e:
+            print(f"PDF extraction error: {e}")
+            content = f"Error extracting text from PDF: {str(e)}"
+    else:
+        content = f"No content available for lesson {lesson['id']}"
+    return content
+
+def build_lesson_info(lesson, content):
+    """Lesson info returned to the chatbot and the content endpoints"""
+    return {
+        "id": lesson["id"],
+        "title": lesson["lesson_name"],
+        "course_name": lesson["course_name"],
+        "week_name": lesson["week_name"],
+        "day_name": lesson["day_name"],
+        "file_path": lesson["file_path"],
+        "content": content
+    }
+
 def get_lesson_info(lesson_id):
     """Get lesson information from the database"""
     try:
@@ -137,52 +358,32 @@ def get_lesson_info(lesson_id):
             
         cursor = conn.cursor()  # Use DictCursor to get results as dictionaries
         
-        # Query to get lesson information based on the actual schema
-        query = """
-        SELECT 
-            l.id, l.lesson_name, l.file_path, 
-            l.course_id, c.name as course_name,
-            l.week_id, w.name as week_name,
-            l.day_id, d.name as day_name
-        FROM lessons l
-        JOIN courses c ON l.course_id = c.id
-        JOIN weeks w ON l.week_id = w.id
-        JOIN days d ON l.day_id = d.id
-        WHERE l.id = %s
-        """
+        # Query to get lesson information and its content hash based on the actual schema
+        query = lesson_catalog_query("lc.content_hash AS content_hash", "l.id = %s")
         
         try:
             cursor.execute(query, (lesson_id,))
             lesson = cursor.fetchone()
+            lesson_info = None
+            if lesson:
+                # Stored text is cached by content hash, so the compressed body is only fetched on a miss
+                lesson_info = cached_lesson_info(lesson)
+                if lesson_info is None and lesson["content_hash"]:
+                    lesson = read_stored_content(cursor, lesson)
             
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             
             if lesson:
-                # Try to extract text from PDF if file_path exists
-                content = ""
-                if lesson["file_path"] and os.path.exists(lesson["file_path"]):
-                    content = extract_text_from_pdf(lesson["file_path"])
-                else:
-                    content = f"No content available for lesson {lesson_id}"
-                
                 # Return lesson info
-                return {
-                    "id": lesson["id"],
-                    "title": lesson["lesson_name"],
-                    "course_name": lesson["course_name"],
-                    "week_name": lesson["week_name"],
-                    "day_name": lesson["day_name"],
-                    "file_path": lesson["file_path"],
-                    "content": content
-                }
+                return lesson_info or build_lesson_info(lesson, read_lesson_text(lesson))
             else:
                 # If lesson not found in database, return mock data
                 print(f"Lesson {lesson_id} not found in database")
                 return get_mock_lesson_content(lesson_id)
         except Exception as e:
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             print(f"Database query error: {e}")
             return get_mock_lesson_content(lesson_id)
             
@@ -269,223 +470,243 @@ def get_mock_lesson_content(lesson_id):
         "content": f"This is sample content for lesson {lesson_id}."
     })
 
-def extract_text_from_pdf(file_path):
-    """Extract text from a PDF file"""
+def read_pdf_text(file_path):
+    """Read the text of every page of a PDF file with PyMuPDF"""
+    # Pages are streamed and joined once instead of growing a string page by page.
+    # Serial on the request path: the extraction process pool is for the ingestion tools.
+    return "".join(iter_page_texts(file_path, parallel=False))
+
+def usage_to_dict(usage):
+    """Convert an API usage object into a plain dictionary"""
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "total_tokens": getattr(usage, "total_tokens", None)
+    }
+
+def complete_chat(messages, model, max_tokens, temperature=0.7, on_delta=None):
+    """
+    Call the Grok chat completions API.
+
+    When on_delta is given the completion is requested with stream=True and
+    on_delta is called with each text fragment as it arrives. Returns a dict
+    with the full text, token usage and timing in milliseconds.
+    """
+    start = time.monotonic()
+    if on_delta is None:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        elapsed_ms = round((time.monotonic() - start) * 1000, 1)
+        return {
+            "text": response.choices[0].message.content,
+            "usage": usage_to_dict(getattr(response, "usage", None)),
+            "timing": {"first_token_ms": elapsed_ms, "total_ms": elapsed_ms}
+        }
+    
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    parts = []
+    usage = None
+    first_token_ms = None
+    chunks = 0
     try:
-        # Check if file exists
-        if not os.path.exists(file_path):
-            return f"Error: PDF file not found at {file_path}"
-        
-        # Open the PDF file
-        document = fitz.open(file_path)
-        text = ""
-        
-        # Extract text from each page
-        for page in document:
-            text += page.get_text()
-        
-        return text
-    except Exception as e:
-        print(f"PDF extraction error: {e}")
-        return f"Error extracting text from PDF: {str(e)}"
+        for chunk in stream:
+            chunks += 1
+            # Some providers attach usage to the final chunk
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token_ms is None:
+                    first_token_ms = round((time.monotonic() - start) * 1000, 1)
+                parts.append(delta)
+                on_delta(delta)
+    finally:
+        if hasattr(stream, "close"):
+            stream.close()
+    
+    usage_dict = usage_to_dict(usage) or {}
+    usage_dict["chunks"] = chunks
+    return {
+        "text": "".join(parts),
+        "usage": usage_dict,
+        "timing": {
+            "first_token_ms": first_token_ms,
+            "total_ms": round((time.monotonic() - start) * 1000, 1)
+        }
+    }
+
+async def stream_chat(messages, model, max_tokens, publish):
+    """Run a streaming completion on the LLM executor, passing each delta to publish on the event loop"""
+    loop = asyncio.get_running_loop()
+    
+    def on_delta(delta):
+        # Called on the LLM worker thread
+        loop.call_soon_threadsafe(publish, delta)
+    
+    return await run_llm(complete_chat, messages, model, max_tokens, on_delta=on_delta)
+
+async def get_grok_answer(cache_key, messages, model, max_tokens, websocket=None):
+    """
+    Answer from the cache or by calling Grok, storing new answers in the cache.
+
+    Concurrent requests with the same cache key share a single Grok call.
+    When a websocket is given the answer is streamed to it as delta frames;
+    cached answers are sent as a single delta. The returned dict has the text,
+    usage, timing, whether it came from the cache and whether the Grok call
+    was shared with another request.
+    """
+    cached = answer_cache.get(cache_key)
+    if cached is not None:
+        if websocket is not None:
+            await websocket.send_text(json.dumps({"type": "delta", "delta": cached}))
+        return {"text": cached, "usage": None, "timing": None, "cached": True, "coalesced": False}
+    
+    async def fetch(publish):
+        if websocket is not None:
+            result = await stream_chat(messages, model, max_tokens, publish)
+        else:
+            result = await run_llm(complete_chat, messages, model, max_tokens)
+        if result["text"]:
+            answer_cache.put(cache_key, result["text"])
+        return result
+    
+    sent = []
+    
+    async def send_delta(delta):
+        sent.append(delta)
+        await websocket.send_text(json.dumps({"type": "delta", "delta": delta}))
+    
+    result, shared = await grok_single_flight.do(
+        cache_key, fetch,
+        on_delta=send_delta if websocket is not None else None
+    )
+    # A streaming request that joined a non-streaming call receives the answer in one delta
+    if websocket is not None and not sent and result["text"]:
+        await send_delta(result["text"])
+    return dict(result, cached=False, coalesced=shared)
+
+def parse_ws_message(data):
+    """
+    Parse a /ws message into (lesson_id, question, stream).
+
+    Accepts the legacy 'lessonId|question' text format, which is always
+    answered with a single frame, or a JSON object with lessonId, question
+    and an optional stream flag.
+    """
+    if data.lstrip().startswith("{"):
+        try:
+            message = json.loads(data)
+        except json.JSONDecodeError:
+            raise ValueError("Invalid JSON message")
+        lesson_id = message.get("lessonId")
+        question = message.get("question")
+        if lesson_id is None or not question:
+            raise ValueError("JSON messages must include 'lessonId' and 'question'")
+        return str(lesson_id), question, bool(message.get("stream", False))
+    
+    if '|' not in data:
+        raise ValueError("Invalid message format. Expected 'lessonId|question'")
+    lesson_id, question = data.split('|', 1)  # Split only on first '|'
+    return lesson_id, question, False
+
+# Question types for the local responder, in priority order
+QUESTION_TYPE_CLASSIFIER = KeywordClassifier({
+    "definition": ["what is", "what are", "define", "meaning of"],
+    "process": ["how to", "how do", "steps", "process"],
+    "explanation": ["why", "reason", "explain why"],
+    "example": ["example", "instance", "case study"],
+    "comparison": ["compare", "difference", "versus", "vs"]
+})
+
+# Opening and closing lines of a local answer for each question type
+ANSWER_TEMPLATES = {
+    "definition": ("Based on the lesson content, I can provide this definition:", None),
+    "process": ("The lesson describes this process as follows:",
+                "These steps should help you understand the process described in the lesson."),
+    "explanation": ("According to the lesson material, here's why:",
+                    "This explanation is based directly on the lesson material."),
+    "example": ("Here are some examples from the lesson:",
+                "These examples illustrate the concepts discussed in the lesson."),
+    "comparison": ("The lesson makes these distinctions:",
+                   "Understanding these distinctions is important for mastering this topic."),
+    "informational": ("Based on the lesson content, here's what I can tell you:",
+                      "Is there a specific aspect of this information you'd like me to elaborate on?")
+}
+
+OFF_TOPIC_RESPONSE = "I'm sorry, I can only respond to questions about the lesson content. Please ask a question related to the material we're covering."
+
+def load_lesson_profile(content, lesson_id=None):
+    """Return the stored topic profile for a lesson, building it on first load and storing it in the background"""
+    lesson_id = int(lesson_id) if lesson_id is not None and str(lesson_id).isdigit() else None
+    return get_lesson_profile(content, lesson_id, get_db_connection, release_db_connection, executor=blocking_executor)
 
-def chat_with_grok(user_input, lesson_info):
-    """Chat with Grok API or provide a smart response if API is not available"""
+def fallback_answer(question, lesson_content, lesson_id=None):
+    """
+    Answer a question from the lesson itself when the Grok API is unavailable or fails.
+    The most relevant sentences come from the lesson's stored BM25 index.
+    """
     try:
-        # Check if lesson info indicates file not found
-        if "Lesson file not found" in lesson_info:
+        if lesson_content.startswith("No content available for lesson"):
             return "I'm sorry, I can only respond to questions about the lesson content, but the lesson file could not be found."
-            
-        # Check if the question is about the lesson content
-        # Convert lesson_info and user_input to lowercase for case-insensitive matching
-        lesson_info_lower = lesson_info.lower()
-        user_input_lower = user_input.lower()
-        
-        # Extract key topics from the lesson
-        # This is a simple approach - we're looking for capitalized words or phrases that might be topics
-        potential_topics = re.findall(r'[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*', lesson_info)
-        potential_topics = [topic.lower() for topic in potential_topics]
-        
-        # Add common educational terms that might not be capitalized
-        common_terms = ['deep learning', 'machine learning', 'neural networks', 'ai', 'artificial intelligence', 
-                        'data science', 'algorithm', 'model', 'training', 'dataset', 'classification', 
-                        'regression', 'supervised', 'unsupervised', 'reinforcement', 'computer vision',
-                        'natural language processing', 'nlp', 'cnn', 'rnn', 'lstm', 'gan', 'transformer',
-                        'attention mechanism', 'backpropagation', 'gradient descent', 'activation function',
-                        'loss function', 'overfitting', 'underfitting', 'bias', 'variance', 'regularization',
-                        'dropout', 'batch normalization', 'transfer learning', 'fine-tuning']
-        
-        # Check if any of these terms are in the lesson
-        lesson_topics = []
-        for term in common_terms:
-            if term in lesson_info_lower:
-                lesson_topics.append(term)
-                
-        # Add the potential topics we extracted
-        lesson_topics.extend([topic for topic in potential_topics if len(topic) > 3])  # Filter out short words
-        
-        # Check if the user's question is about any of these topics
-        is_relevant_question = False
-        for topic in lesson_topics:
-            if topic in user_input_lower:
-                is_relevant_question = True
-                break
-                
-        # If Grok API client is available, use it
-        if client:
-            # Create a prompt with the lesson information and user question
-            prompt = f"""
-            You are an AI teaching assistant helping a student understand a lesson.
-            
-            Here is the lesson content:
-            {lesson_info}
-            
-            The student asks: {user_input}
-            
-            IMPORTANT INSTRUCTIONS:
-            1. ONLY answer questions that are directly related to the lesson content provided above.
-            2. If the question is about topics that are covered in the lesson, provide a helpful, detailed, and accurate response based on the lesson material.
-            3. If the question is not related to the lesson content, respond with: "I'm sorry, I can only respond to questions about the lesson content. Please ask a question related to the material we're covering."
-            4. Do not make up information or answer questions outside the scope of the lesson.
-            5. Be helpful, accurate, and thorough for questions that are about the lesson.
-            6. Use examples and analogies when appropriate to make complex concepts easier to understand.
-            7. If the question is vague but potentially related to the lesson, try to interpret it in the context of the lesson and provide a relevant response.
-            """
-            
-            # Call the Grok API
-            response = client.chat.completions.create(
-                model="grok-1",
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI teaching assistant that ONLY answers questions related to the lesson content."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=800
-            )
-            
-            # Extract and return the response
-            return response.choices[0].message.content
-        else:
-            # If API is not available, provide a smart response based on the lesson content
-            print("Grok API not available, using enhanced response system")
-            
-            # If we've determined the question is not relevant to the lesson topics
-            if not is_relevant_question and len(user_input_lower.split()) > 2:  # Ignore very short queries
-                return "I'm sorry, I can only respond to questions about the lesson content. Please ask a question related to the material we're covering."
-            
-            # Extract key terms from the user input
-            user_terms = set(clean_text(user_input).split())
-            
-            # Extract sentences from the lesson that might be relevant
-            lesson_sentences = re.split(r'(?<=[.!?])\s+', lesson_info)
-            relevant_sentences = []
-            
-            # Score each sentence based on term overlap with user query
-            sentence_scores = []
-            for sentence in lesson_sentences:
-                if len(sentence.strip()) < 10:  # Skip very short sentences
-                    continue
-                    
-                sentence_lower = sentence.lower()
-                # Count how many user terms appear in this sentence
-                term_matches = sum(1 for term in user_terms if len(term) > 3 and term in sentence_lower)
-                # Also check for topic matches
-                topic_matches = sum(1 for topic in lesson_topics if topic in sentence_lower)
-                
-                # Calculate a relevance score
-                score = term_matches + (topic_matches * 2)  # Weight topic matches more heavily
-                
-                if score > 0:
-                    sentence_scores.append((sentence.strip(), score))
-            
-            # Sort sentences by relevance score (highest first)
-            sentence_scores.sort(key=lambda x: x[1], reverse=True)
-            relevant_sentences = [s[0] for s in sentence_scores[:5]]  # Take top 5 most relevant sentences
-            
-            # If we found relevant sentences, use them in the response
-            if relevant_sentences:
-                # Determine the question type to provide a more tailored response
-                question_type = "informational"  # Default
-                
-                if any(w in user_input_lower for w in ["what is", "what are", "define", "meaning of"]):
-                    question_type = "definition"
-                elif any(w in user_input_lower for w in ["how to", "how do", "steps", "process"]):
-                    question_type = "process"
-                elif any(w in user_input_lower for w in ["why", "reason", "explain why"]):
-                    question_type = "explanation"
-                elif any(w in user_input_lower for w in ["example", "instance", "case study"]):
-                    question_type = "example"
-                elif any(w in user_input_lower for w in ["compare", "difference", "versus", "vs"]):
-                    question_type = "comparison"
-                
-                # Craft a response based on question type
-                if question_type == "definition":
-                    response = f"Based on the lesson content, I can provide this definition:\n\n"
-                elif question_type == "process":
-                    response = f"The lesson describes this process as follows:\n\n"
-                elif question_type == "explanation":
-                    response = f"According to the lesson material, here's why:\n\n"
-                elif question_type == "example":
-                    response = f"Here are some examples from the lesson:\n\n"
-                elif question_type == "comparison":
-                    response = f"The lesson makes these distinctions:\n\n"
-                else:
-                    response = f"Based on the lesson content, here's what I can tell you:\n\n"
-                
-                # Add the relevant sentences
-                for i, sentence in enumerate(relevant_sentences):
-                    response += f"{i+1}. {sentence}\n\n"
-                
-                # Add a contextual closing based on question type
-                if question_type == "definition":
-                    response += f"I hope this clarifies what {' '.join(user_input_lower.split()[-3:])} means in this context."
-                elif question_type == "process":
-                    response += "These steps should help you understand the process described in the lesson."
-                elif question_type == "explanation":
-                    response += "This explanation is based directly on the lesson material."
-                elif question_type == "example":
-                    response += "These examples illustrate the concepts discussed in the lesson."
-                elif question_type == "comparison":
-                    response += "Understanding these distinctions is important for mastering this topic."
-                else:
-                    response += "Is there a specific aspect of this information you'd like me to elaborate on?"
-                
-                return response
-            else:
-                # If no relevant sentences found but the question seems related to lesson topics
-                if is_relevant_question:
-                    # Try to provide a more helpful response based on the topic
-                    matching_topics = [topic for topic in lesson_topics if topic in user_input_lower]
-                    
-                    if matching_topics:
-                        topic_sentences = []
-                        for topic in matching_topics:
-                            # Find sentences that mention this topic
-                            for sentence in lesson_sentences:
-                                if topic in sentence.lower() and sentence.strip() not in topic_sentences:
-                                    topic_sentences.append(sentence.strip())
-                                    if len(topic_sentences) >= 3:  # Limit to 3 sentences per topic
-                                        break
-                        
-                        if topic_sentences:
-                            response = f"Your question is about {', '.join(matching_topics)}, which is covered in the lesson. Here's what the lesson says:\n\n"
-                            for sentence in topic_sentences[:5]:  # Limit to 5 sentences total
-                                response += f"- {sentence}\n\n"
-                            return response
-                    
-                    return f"""
-                    Your question about {user_input} relates to topics covered in the lesson.
-                    
-                    Could you please be more specific about what aspect of this topic you'd like to understand better?
-                    
-                    I'm here to help you understand the lesson material.
-                    """
-                else:
-                    # If we get here, the question is probably not related to the lesson
-                    return "I'm sorry, I can only respond to questions about the lesson content. Please ask a question related to the material we're covering."
+
+        question_lower = question.lower()
+        profile = load_lesson_profile(lesson_content, lesson_id)
+        mentioned_topics = profile.topic_matcher.find(question_lower)
+
+        # Very short queries are answered even when they mention no lesson topic
+        if not mentioned_topics and len(question_lower.split()) > 2:
+            return OFF_TOPIC_RESPONSE
+
+        user_terms = [term for term in set(clean_text(question).split()) if len(term) > 3]
+        relevant_sentences = profile.index.top_sentences(user_terms, k=5)
+
+        if relevant_sentences:
+            question_types = QUESTION_TYPE_CLASSIFIER.classify(question_lower)
+            question_type = question_types[0] if question_types else "informational"
+            opening, closing = ANSWER_TEMPLATES[question_type]
+            if closing is None:
+                closing = f"I hope this clarifies what {' '.join(question_lower.split()[-3:])} means in this context."
+            numbered = "".join(f"{i + 1}. {sentence}\n\n" for i, sentence in enumerate(relevant_sentences))
+            return f"{opening}\n\n{numbered}{closing}"
+
+        if not mentioned_topics:
+            return OFF_TOPIC_RESPONSE
+
+        # Quote up to 3 sentences per mentioned topic, 5 in total
+        matching_topics = [topic for topic in dict.fromkeys(profile.topics) if topic in mentioned_topics]
+        topic_sentences = []
+        for topic in matching_topics:
+            found = 0
+            for sentence in profile.sentences:
+                if topic in sentence.lower() and sentence not in topic_sentences:
+                    topic_sentences.append(sentence)
+                    found += 1
+                    if found >= 3:
+                        break
+        if topic_sentences:
+            quoted = "".join(f"- {sentence}\n\n" for sentence in topic_sentences[:5])
+            return f"Your question is about {', '.join(matching_topics)}, which is covered in the lesson. Here's what the lesson says:\n\n{quoted}"
+
+        return (f"Your question about {question} relates to topics covered in the lesson.\n\n"
+                "Could you please be more specific about what aspect of this topic you'd like to understand better?\n\n"
+                "I'm here to help you understand the lesson material.")
     except Exception as e:
-        print(f"Error in chat processing: {e}")
-        return "I'm sorry, I can only respond to questions about the lesson content. Please ask a question related to the material we're covering."
+        print(f"Error in fallback answer: {e}")
+        return OFF_TOPIC_RESPONSE
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -505,16 +726,17 @@ async def websocket_endpoint(websocket: WebSocket):
             
             try:
                 # Parse message
-                if '|' not in data:
-                    error_msg = {"error": "Invalid message format. Expected 'lessonId|question'"}
+                try:
+                    lesson_id, question, stream = parse_ws_message(data)
+                except ValueError as e:
+                    error_msg = {"error": str(e)}
                     await websocket.send_text(json.dumps(error_msg))
                     continue
                 
-                lesson_id, question = data.split('|', 1)  # Split only on first '|'
                 print(f"Processing question for lesson {lesson_id}: {question}")
                 
                 # Get lesson info
-                lesson_info = get_lesson_info(lesson_id)
+                lesson_info = await run_blocking(get_lesson_info, lesson_id)
                 
                 # Check if there was an error getting lesson info
                 if isinstance(lesson_info, str) and lesson_info.startswith("Error:"):
@@ -529,12 +751,15 @@ async def websocket_endpoint(websocket: WebSocket):
                 # Try to use Grok API if available
                 if client:
                     try:
+                        # Only include the parts of the lesson relevant to the question
+                        lesson_context, retrieval = await run_blocking(build_lesson_context, lesson_content, question)
+                        
                         # Create a prompt with the lesson content and question
                         prompt = f"""
                         You are an AI teaching assistant for the lesson: "{lesson_title}".
                         
-                        Here is the lesson content:
-                        {lesson_content}
+                        Here are the parts of the lesson content relevant to the question:
+                        {lesson_context}
                         
                         Please answer the following question based on the lesson content.
                         If the question is not related to the lesson content, politely explain that you can only answer questions about this specific lesson.
@@ -542,40 +767,50 @@ async def websocket_endpoint(websocket: WebSocket):
                         Question: {question}
                         """
                         
-                        # Call the Grok API
-                        response = client.chat.completions.create(
-                            model="grok-1",
-                            messages=[
-                                {"role": "system", "content": "You are a helpful AI teaching assistant."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            temperature=0.7,
-                            max_tokens=500
-                        )
-                        
-                        # Extract the response
-                        ai_response = response.choices[0].message.content
+                        messages = [
+                            {"role": "system", "content": "You are a helpful AI teaching assistant."},
+                            {"role": "user", "content": prompt}
+                        ]
                         
-                        # Send response back to client
-                        await websocket.send_text(json.dumps({"response": ai_response}))
+                        # Answer from the cache or call the Grok API
+                        cache_key = answer_cache_key(lesson_id, lesson_content, "grok-1", question)
+                        request_start = time.monotonic()
+                        result = await get_grok_answer(
+                            cache_key, messages, "grok-1", 500,
+                            websocket=websocket if stream else None
+                        )
+                        log_grok_request(
+                            f"lesson {lesson_id}", prompt, retrieval,
+                            round((time.monotonic() - request_start) * 1000, 1),
+                            cached=result["cached"], coalesced=result["coalesced"]
+                        )
+                        if stream:
+                            await websocket.send_text(json.dumps({
+                                "type": "done",
+                                "response": result["text"],
+                                "usage": result["usage"],
+                                "timing": result["timing"],
+                                "cached": result["cached"],
+                                "coalesced": result["coalesced"]
+                            }))
+                        else:
+                            # Send response back to client
+                            await websocket.send_text(json.dumps({"response": result["text"]}))
                         continue
+                    except WebSocketDisconnect:
+                        raise
                     except Exception as e:
                         print(f"Error using Grok API: {e}")
                         # Fall back to simple response if API fails
                 
-                # If Grok API is not available or fails, use a simple response
-                simple_response = f"""Based on the lesson '{lesson_title}', I can provide the following information:
-
-This lesson covers topics related to {lesson_title}.
-
-Regarding your question: "{question}"
-
-The lesson content includes information about {lesson_content[:150]}...
-
-I hope this helps! Feel free to ask more specific questions about the lesson content."""
+                # If Grok API is not available or fails, answer from the lesson's stored profile
+                answer = await run_blocking(fallback_answer, question, lesson_content, lesson_id)
                 
                 # Send response back to client
-                await websocket.send_text(json.dumps({"response": simple_response}))
+                if stream:
+                    await websocket.send_text(json.dumps({"type": "done", "response": answer}))
+                else:
+                    await websocket.send_text(json.dumps({"response": answer}))
                 
             except Exception as e:
                 print(f"Error processing message: {e}")
@@ -589,10 +824,10 @@ I hope this helps! Feel free to ask more specific questions about the lesson con
 async def health_check():
     """Health check endpoint"""
     # Check database connection
-    connection = get_db_connection()
+    connection = await run_blocking(get_db_connection)
     db_status = "connected" if connection else "disconnected"
     if connection:
-        connection.close()
+        release_db_connection(connection)
     
     # Check Grok API status
     api_status = "available" if client else "unavailable"
@@ -600,16 +835,64 @@ async def health_check():
     return {
         "status": "ok",
         "database": db_status,
-        "grok_api": api_status
+        "grok_api": api_status,
+        "db_pool": db_pool.stats(),
+        "answer_cache": answer_cache.stats(),
+        "grok_single_flight": grok_single_flight.stats(),
+        "pdf_text_cache": pdf_text_cache.stats(),
+        "lesson_text_cache": lesson_text_cache.stats(),
+        "lesson_tree_cache": lesson_tree_cache.stats(),
+        "lesson_etag_cache": lesson_etag_cache.stats(),
+        "lesson_path_cache": lesson_path_cache.stats(),
+        "sample_pdfs": sample_pdfs.stats()
     }
 
 # Add endpoints for lesson content and PDF download
+def not_modified(etag):
+    """Empty 304 response for a conditional GET that matched"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": LESSONS_CACHE_CONTROL})
+
+def lesson_content_etag(lesson):
+    """Strong ETag of a catalog row's content response, or None if the lesson has no stored content"""
+    if not lesson["content_hash"]:
+        return None
+    parts = [lesson[key] for key in ("id", "lesson_name", "course_name", "week_name", "day_name", "file_path", "content_hash")]
+    return '"' + hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32] + '"'
+
 @app.get("/api/lessons/{lesson_id}/content")
-async def get_lesson_content(lesson_id: str):
-    """Get lesson content by ID"""
+async def get_lesson_content(lesson_id: str, request: Request, response: Response):
+    """
+    Get lesson content by ID.
+    Stored lessons have an ETag from their content hash; send it as If-None-Match to get a 304.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    # An ETag sent within the last check interval is answered without MySQL or PDF work
+    etag = lesson_etag_cache.get(lesson_id)
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag)
     try:
-        # Get lesson info
-        lesson_info = get_lesson_info(lesson_id)
+        lesson = None
+        if lesson_id.isdigit():
+            try:
+                lesson = (await run_blocking(fetch_lesson_catalog, [int(lesson_id)]) or {}).get(int(lesson_id))
+            except Exception as e:
+                print(f"Database query error: {e}")
+        
+        if lesson is None:
+            # Not in the database (or no database): get_lesson_info returns mock data, which is never cached
+            response.headers["Cache-Control"] = "no-store"
+            lesson_info = await run_blocking(get_lesson_info, lesson_id)
+        else:
+            etag = lesson_content_etag(lesson)
+            if etag:
+                lesson_etag_cache.put(lesson_id, etag)
+                if etag_matches(if_none_match, etag):
+                    return not_modified(etag)
+                response.headers["ETag"] = etag
+                response.headers["Cache-Control"] = LESSONS_CACHE_CONTROL
+            else:
+                response.headers["Cache-Control"] = "no-store"
+            lesson_info = cached_lesson_info(lesson) or await run_blocking(load_lesson_info, lesson)
         
         # Check if there was an error getting lesson info
         if isinstance(lesson_info, str) and lesson_info.startswith("Error:"):
@@ -623,120 +906,303 @@ async def get_lesson_content(lesson_id: str):
         }
     except Exception as e:
         print(f"Error getting lesson content: {e}")
+        response.headers["Cache-Control"] = "no-store"
         return {"error": f"Failed to get lesson content: {str(e)}"}
 
-@app.get("/api/lessons/{lesson_id}/download")
-async def download_lesson_file(lesson_id: str):
-    """Download lesson file"""
+class LessonBatchRequest(BaseModel):
+    ids: List[int]
+
+@app.post("/api/lessons/batch")
+async def get_lessons_batch(request: LessonBatchRequest):
+    """
+    Get the content of many lessons at once, in request order.
+    Each item has either "content" or an "error", so one bad ID does not fail the batch.
+    """
+    if len(request.ids) > LESSONS_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {LESSONS_BATCH_MAX_IDS} lesson IDs per request")
+    lesson_ids = list(dict.fromkeys(request.ids))
+    if not lesson_ids:
+        return {"status": "success", "data": []}
+
+    message = "Database connection failed"
     try:
-        # First try to get the lesson from the database
+        catalog = await run_blocking(fetch_lesson_catalog, lesson_ids)
+    except Exception as e:
+        # For example a schema that has not been migrated yet
+        print(f"Database query error: {e}")
+        catalog = None
+        message = f"Database query failed: {str(e)}"
+    if catalog is None:
+        # Same fallback as the single lesson endpoint when the database is unavailable
+        return {
+            "status": "error",
+            "message": message,
+            "data": [{"id": lesson_id, "content": get_mock_lesson_content(str(lesson_id))} for lesson_id in request.ids]
+        }
+
+    results = {}
+    misses = []
+    for lesson_id in lesson_ids:
+        lesson = catalog.get(lesson_id)
+        if lesson is None:
+            results[lesson_id] = {"id": lesson_id, "error": "Lesson not found"}
+            continue
+        lesson_info = cached_lesson_info(lesson)
+        if lesson_info is not None:
+            results[lesson_id] = {"id": lesson_id, "content": lesson_info}
+        else:
+            misses.append(lesson)
+
+    # Everything not cached is loaded concurrently on the blocking executor
+    loaded = await asyncio.gather(*(run_blocking(load_lesson_info, lesson) for lesson in misses), return_exceptions=True)
+    for lesson, lesson_info in zip(misses, loaded):
+        if isinstance(lesson_info, Exception):
+            print(f"Error getting content for lesson {lesson['id']}: {lesson_info}")
+            results[lesson["id"]] = {"id": lesson["id"], "error": f"Failed to get lesson content: {str(lesson_info)}"}
+        else:
+            results[lesson["id"]] = {"id": lesson["id"], "content": lesson_info}
+
+    return {"status": "success", "data": [results[lesson_id] for lesson_id in request.ids]}
+
+def fetch_lesson_catalog(lesson_ids):
+    """
+    Look up the catalog rows of many lessons with a single IN query
+
+    Returns:
+        dict: Lesson ID -> row with its content hash but not its content, or None without a database
+    """
+    conn = get_db_connection()
+    if not conn:
+        print("Failed to connect to database")
+        return None
+    try:
+        with conn.cursor() as cursor:
+            placeholders = ", ".join(["%s"] * len(lesson_ids))
+            cursor.execute(lesson_catalog_query("lc.content_hash AS content_hash", f"l.id IN ({placeholders})"), lesson_ids)
+            return {lesson["id"]: lesson for lesson in cursor.fetchall()}
+    finally:
+        release_db_connection(conn)
+
+def cached_lesson_info(lesson):
+    """Lesson info for a catalog row from fetch_lesson_catalog if its text is cached, else None"""
+    if not lesson["content_hash"]:
+        return None
+    content = lesson_text_cache.get((lesson["id"], lesson["content_hash"]))
+    return build_lesson_info(lesson, content) if content is not None else None
+
+def read_stored_content(cursor, lesson):
+    """Return a catalog row from fetch_lesson_catalog with the CONTENT_COLUMNS of its stored content added"""
+    cursor.execute(f"SELECT {CONTENT_COLUMNS} FROM lesson_content lc WHERE lc.lesson_id = %s", (lesson["id"],))
+    return dict(lesson, **(cursor.fetchone() or {}))
+
+def load_lesson_info(lesson):
+    """Read the stored content (or the file) of a catalog row from fetch_lesson_catalog"""
+    if lesson["content_hash"]:
+        conn = get_db_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
         try:
-            conn = get_db_connection()
-            if not conn:
-                print("Failed to connect to database")
-                raise Exception("Database connection failed")
-                
-            cursor = conn.cursor()
-            
-            # Query to get the file path
-            query = "SELECT file_path FROM lessons WHERE id = %s"
-            cursor.execute(query, (lesson_id,))
-            result = cursor.fetchone()
-            
-            cursor.close()
-            conn.close()
-            
-            if result and result["file_path"]:
-                file_path = result["file_path"]
-                # Check if the file exists
-                if os.path.exists(file_path):
-                    print(f"Serving PDF from database path: {file_path}")
-                    return FileResponse(
-                        path=file_path,
-                        media_type="application/pdf",
-                        filename=f"lesson_{lesson_id}.pdf"
-                    )
-                else:
-                    print(f"File not found at path: {file_path}")
-        except Exception as e:
-            print(f"Database error when fetching file path: {e}")
-        
-        # If we get here, either the lesson wasn't found or the file doesn't exist
-        # Check if we have a PDF for this lesson in our pdfs directory
-        pdf_path = Path(f"backend/python/pdfs/lesson_{lesson_id}.pdf")
-        
-        # If the PDF doesn't exist, create a sample PDF
-        if not pdf_path.exists():
-            print(f"Creating sample PDF for lesson {lesson_id}")
-            # Create a simple PDF with PyMuPDF
-            doc = fitz.open()
-            
-            # Add a title page
-            page = doc.new_page()
-            title_text = f"Lesson {lesson_id}: Deep Learning Fundamentals"
-            page.insert_text((50, 50), title_text, fontsize=24, color=(0, 0, 0))
-            page.insert_text((50, 100), "AI School", fontsize=18, color=(0, 0, 0))
-            
-            # Add content pages
-            page = doc.new_page()
-            content_text = """
-            Introduction to Deep Learning
-            
-            Deep Learning is a subset of machine learning that uses neural networks with multiple layers.
-            
-            Key concepts include:
-            1. Neural Networks
-            2. Backpropagation
-            3. Activation Functions
-            4. Training and Testing
-            
-            Neural networks are inspired by the human brain and consist of interconnected nodes (neurons).
-            Each connection has a weight that determines its importance.
-            """
-            page.insert_text((50, 50), content_text, fontsize=12, color=(0, 0, 0))
-            
-            # Add another page with more content
-            page = doc.new_page()
-            more_content = """
-            Types of Neural Networks:
-            
-            1. Feedforward Neural Networks
-            2. Convolutional Neural Networks (CNNs)
-            3. Recurrent Neural Networks (RNNs)
-            4. Transformers
-            
-            Applications of Deep Learning:
-            
-            - Computer Vision
-            - Natural Language Processing
-            - Speech Recognition
-            - Recommendation Systems
-            """
-            page.insert_text((50, 50), more_content, fontsize=12, color=(0, 0, 0))
-            
-            # Save the PDF
-            os.makedirs(pdf_path.parent, exist_ok=True)
-            doc.save(str(pdf_path))
-            doc.close()
+            with conn.cursor() as cursor:
+                lesson = read_stored_content(cursor, lesson)
+        finally:
+            release_db_connection(conn)
+    return build_lesson_info(lesson, read_lesson_text(lesson))
+
+def get_lesson_pdf_path(lesson_id):
+    """Resolve the PDF to serve for a lesson, falling back to a pre-rendered sample PDF"""
+    # First try to get the lesson from the database
+    try:
+        conn = get_db_connection()
+        if not conn:
+            print("Failed to connect to database")
+            raise Exception("Database connection failed")
             
-            print(f"Created sample PDF at {pdf_path}")
-        else:
-            print(f"Serving existing sample PDF from {pdf_path}")
+        try:
+            with conn.cursor() as cursor:
+                # Query to get the file path
+                query = "SELECT file_path FROM lessons WHERE id = %s"
+                cursor.execute(query, (lesson_id,))
+                result = cursor.fetchone()
+        finally:
+            release_db_connection(conn)
         
-        # Return the PDF file
-        return FileResponse(
-            path=pdf_path,
+        if result and result["file_path"]:
+            file_path = result["file_path"]
+            # Check if the file exists
+            if os.path.exists(file_path):
+                print(f"Serving PDF from database path: {file_path}")
+                return file_path
+            else:
+                print(f"File not found at path: {file_path}")
+    except Exception as e:
+        print(f"Database error when fetching file path: {e}")
+    
+    # If we get here, either the lesson wasn't found or the file doesn't exist.
+    # Serve this lesson's sample PDF if it was already rendered, else start rendering it in the background
+    # and serve the shared fallback. Nothing is rendered on the request path.
+    if lesson_id.isdigit():
+        pdf_path = sample_pdfs.get(str(SAMPLE_PDF_DIR / f"lesson_{lesson_id}.pdf"), functools.partial(render_lesson_sample, lesson_id=lesson_id))
+        if pdf_path:
+            return pdf_path
+    pdf_path = sample_pdfs.get(FALLBACK_PDF_PATH, render_lesson_sample)
+    if pdf_path:
+        return pdf_path
+    raise SamplePDFPending(f"No PDF available for lesson {lesson_id} yet")
+
+def resolve_lesson_file(lesson_id):
+    """Return (path, stat) of a lesson's PDF, looking the path up only when it is not cached"""
+    file_path = lesson_path_cache.get(lesson_id)
+    if file_path is not None:
+        try:
+            return file_path, os.stat(file_path)
+        except OSError:
+            # Moved or deleted since it was cached
+            pass
+    file_path = get_lesson_pdf_path(lesson_id)
+    stat_result = os.stat(file_path)
+    # The shared fallback stands in only until the lesson's own sample is rendered
+    if file_path != FALLBACK_PDF_PATH:
+        lesson_path_cache.put(lesson_id, file_path)
+    return file_path, stat_result
+
+@app.api_route("/api/lessons/{lesson_id}/download", methods=["GET", "HEAD"])
+async def download_lesson_file(lesson_id: str, request: Request):
+    """
+    Download lesson file.
+    Supports single byte ranges (206) for progressive PDF viewers, and ETag / Last-Modified validation (304).
+    """
+    try:
+        # The path is cached, so a repeat download is only a stat(); a miss may query MySQL
+        try:
+            file_path, stat_result = await run_blocking(resolve_lesson_file, lesson_id)
+        except SamplePDFPending as e:
+            # Only until the startup render of the fallback PDF finishes
+            return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "1", "Cache-Control": "no-store"})
+        etag = file_etag(stat_result)
+        if file_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"), stat_result, etag):
+            response = not_modified(etag)
+            response.headers["Last-Modified"] = last_modified(stat_result)
+            return response
+
+        byte_range = None
+        if if_range_matches(request.headers.get("if-range"), stat_result, etag):
+            try:
+                byte_range = parse_byte_range(request.headers.get("range"), stat_result.st_size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{stat_result.st_size}", "ETag": etag})
+
+        return FileRangeResponse(
+            file_path,
+            stat_result,
+            byte_range=byte_range,
+            filename=f"lesson_{lesson_id}.pdf",
             media_type="application/pdf",
-            filename=f"lesson_{lesson_id}.pdf"
+            headers={"Cache-Control": LESSONS_CACHE_CONTROL},
+            method=request.method
         )
     except Exception as e:
         print(f"Error downloading lesson file: {e}")
         return {"error": f"Failed to download lesson file: {str(e)}"}
 
+# Columns /api/lessons can return, selectable with ?fields=
+LESSON_FIELDS = {
+    "id": "l.id",
+    "lesson_name": "l.lesson_name",
+    "file_path": "l.file_path",
+    "course_id": "l.course_id",
+    "course_name": "c.name",
+    "week_id": "l.week_id",
+    "week_name": "w.name"
+}
+# Keyset order, served by the (course_id, week_id, id) index on lessons, or (week_id, course_id, id) for a week filter
+LESSON_ORDER_KEYS = ("course_id", "week_id", "id")
+LESSONS_MAX_PAGE_SIZE = int(os.getenv("LESSONS_MAX_PAGE_SIZE", "500"))
+
+def parse_lesson_fields(fields):
+    """Parse a comma-separated ?fields= value, or return None for every field"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in LESSON_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+def encode_lesson_cursor(row):
+    """Opaque cursor pointing just after a lesson in keyset order"""
+    position = json.dumps([row[key] for key in LESSON_ORDER_KEYS])
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+def decode_lesson_cursor(cursor):
+    """Return the (course_id, week_id, id) position encoded in a cursor"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(position) != len(LESSON_ORDER_KEYS) or not all(isinstance(value, int) for value in position):
+            raise ValueError(cursor)
+        return tuple(position)
+    except (ValueError, TypeError):
+        # TypeError: valid JSON that is not a list, such as 5 or null
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def project_lessons(lessons, fields):
+    """Keep only the requested fields of each lesson"""
+    if fields is None:
+        return lessons
+    return [{name: lesson.get(name) for name in fields} for lesson in lessons]
+
 # Add endpoint to fetch all lessons
 @app.get("/api/lessons")
-async def get_all_lessons():
-    """Get all lessons with their course and week information"""
+async def get_all_lessons(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=LESSONS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    course_id: Optional[int] = None,
+    week_id: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """
+    Get lessons with their course and week information, ordered by course, week and lesson.
+    Pass limit (and then the returned next_cursor) to page through them.
+    The ETag follows the catalog version; send it as If-None-Match to get a 304.
+    """
+    field_names = parse_lesson_fields(fields)
+    after = decode_lesson_cursor(cursor) if cursor else None
+    
+    # Read the version before the lessons, so a change in between can only cost a later 200
+    version = catalog_version_cache.fresh() or await run_blocking(load_catalog_version)
+    etag = None
+    if version:
+        parts = [version, limit, after, course_id, week_id, field_names]
+        etag = '"' + hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:32] + '"'
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+    
+    result = await run_blocking(fetch_all_lessons, limit, after, course_id, week_id, field_names)
+    if etag and result["status"] == "success":
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = LESSONS_CACHE_CONTROL
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    return result
+
+def load_catalog_version():
+    """Return the current catalog version, or None if the database is unavailable"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            return catalog_version_cache.get(cursor)
+    except Exception as e:
+        print(f"Error reading catalog version: {e}")
+        return None
+    finally:
+        release_db_connection(conn)
+
+def fetch_all_lessons(limit=None, after=None, course_id=None, week_id=None, fields=None):
+    """Query one page of lessons (or all of them without a limit) in (course, week, lesson) order"""
+    filtered = any(value is not None for value in (limit, after, course_id, week_id))
     try:
         # Connect to the database
         conn = get_db_connection()
@@ -746,53 +1212,77 @@ async def get_all_lessons():
             return {
                 "status": "error",
                 "message": "Database connection failed",
-                "data": get_sample_lessons()
+                "data": project_lessons(get_sample_lessons(), fields)
             }
             
         cursor = conn.cursor(pymysql.cursors.DictCursor)  # Use DictCursor to get results as dictionaries
         
-        # Query to get all lessons with their course and week information
-        query = """
-        SELECT 
-            l.id, l.lesson_name, l.file_path, 
-            l.course_id, c.name as course_name,
-            l.week_id, w.name as week_name
-        FROM lessons l
-        LEFT JOIN courses c ON l.course_id = c.id
-        LEFT JOIN weeks w ON l.week_id = w.id
-        ORDER BY c.id, w.id, l.id
-        """
+        # Select the requested columns plus the keyset columns, joining names only when asked for
+        selected = list(dict.fromkeys(list(fields or LESSON_FIELDS) + list(LESSON_ORDER_KEYS)))
+        query = "SELECT " + ", ".join(f"{LESSON_FIELDS[name]} AS {name}" for name in selected) + " FROM lessons l"
+        if "course_name" in selected:
+            query += " LEFT JOIN courses c ON l.course_id = c.id"
+        if "week_name" in selected:
+            query += " LEFT JOIN weeks w ON l.week_id = w.id"
+        
+        conditions = []
+        params = []
+        if course_id is not None:
+            conditions.append("l.course_id = %s")
+            params.append(course_id)
+        if week_id is not None:
+            conditions.append("l.week_id = %s")
+            params.append(week_id)
+        if after is not None:
+            # Expanded row comparison so MySQL can range-scan the index
+            conditions.append(
+                "(l.course_id > %s OR (l.course_id = %s AND (l.week_id > %s OR (l.week_id = %s AND l.id > %s))))"
+            )
+            params.extend([after[0], after[0], after[1], after[1], after[2]])
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY l.course_id, l.week_id, l.id"
+        if limit is not None:
+            # One extra row tells us whether there is another page
+            query += " LIMIT %s"
+            params.append(limit + 1)
         
         try:
-            cursor.execute(query)
+            cursor.execute(query, params)
             lessons = cursor.fetchall()
             
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             
-            if not lessons:
+            if not lessons and not filtered:
                 print("No lessons found in database")
                 # If no lessons found, return sample data
                 return {
                     "status": "success",
                     "message": "Sample data returned",
-                    "data": get_sample_lessons()
+                    "data": project_lessons(get_sample_lessons(), fields)
                 }
             
-            # Return the lessons
-            return {
+            response = {
                 "status": "success",
-                "message": "Lessons retrieved successfully",
-                "data": lessons
+                "message": "Lessons retrieved successfully"
             }
+            if limit is not None:
+                has_more = len(lessons) > limit
+                lessons = lessons[:limit]
+                response["next_cursor"] = encode_lesson_cursor(lessons[-1]) if has_more else None
+            
+            # Return the lessons
+            response["data"] = project_lessons(lessons, fields)
+            return response
         except Exception as e:
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             print(f"Database query error: {e}")
             return {
                 "status": "error",
                 "message": f"Database query error: {str(e)}",
-                "data": get_sample_lessons()
+                "data": project_lessons(get_sample_lessons(), fields)
             }
     except Exception as e:
         print(f"Error getting all lessons: {e}")
@@ -800,9 +1290,42 @@ async def get_all_lessons():
         return {
             "status": "error",
             "message": f"Failed to get lessons: {str(e)}",
-            "data": get_sample_lessons()
+            "data": project_lessons(get_sample_lessons(), fields)
         }
 
+@app.get("/api/lessons/tree")
+async def get_lesson_tree(request: Request):
+    """
+    Get every course with its weeks, days and lessons nested in id order.
+    Send the returned ETag as If-None-Match to get a 304 while the catalog is unchanged.
+    """
+    cached = lesson_tree_cache.fresh()
+    if cached is None:
+        message = "Database connection failed"
+        try:
+            cached = await run_blocking(load_lesson_tree)
+        except Exception as e:
+            print(f"Database query error: {e}")
+            message = f"Database query failed: {str(e)}"
+        if cached is None:
+            return JSONResponse({"status": "error", "message": message}, status_code=503, headers={"Cache-Control": "no-store"})
+    etag, body = cached
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": LESSONS_CACHE_CONTROL})
+
+def load_lesson_tree():
+    """Return the cached (etag, body) of the lesson tree, rebuilding it if the catalog changed"""
+    conn = get_db_connection()
+    if not conn:
+        print("Failed to connect to database")
+        return None
+    try:
+        with conn.cursor() as cursor:
+            return lesson_tree_cache.get(cursor)
+    finally:
+        release_db_connection(conn)
+
 def get_sample_lessons():
     """Return sample lesson data for testing"""
     return [
@@ -937,20 +1460,21 @@ This process is repeated many times with different training examples, gradually
                     print(f"Using Grok API with model: {request.model}")
                     context = request.context if request.context else ""
                     
-                    # Call the Grok API
-                    grok_response = client.chat.completions.create(
-                        model=request.model,
-                        messages=[
+                    # Answer from the cache or call the Grok API
+                    cache_key = answer_cache_key(None, context, request.model, request.message)
+                    result = await get_grok_answer(
+                        cache_key,
+                        [
                             {"role": "system", "content": f"You are a helpful AI assistant for a deep learning course. {context}"},
                             {"role": "user", "content": request.message}
                         ],
-                        temperature=0.7,
-                        max_tokens=1000
+                        request.model,
+                        1000
                     )
                     
                     # Extract the response
-                    if grok_response and grok_response.choices and len(grok_response.choices) > 0:
-                        response = grok_response.choices[0].message.content
+                    if result["text"]:
+                        response = result["text"]
                     else:
                         response = "I received your question but couldn't generate a response. Please try again."
                 else:
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the Python backend.
+
+Each migration runs once and is recorded in the schema_migrations table.
+Migrations only add what is missing, so they are also safe on databases
+that were set up by the older init/check scripts.
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # show the current schema version
+"""
+import os
+import sys
+import logging
+import argparse
+
+import pymysql
+import pymysql.cursors
+from dotenv import load_dotenv
+
+logger = logging.getLogger("migrations")
+
+# Held while migrating so concurrent servers do not apply the same migration twice
+MIGRATION_LOCK = 'aischool_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+def table_exists(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return cursor.fetchone() is not None
+
+def column_exists(cursor, table, column):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return cursor.fetchone() is not None
+
+def add_column(cursor, table, column, definition):
+    """Add a column unless the table already has it"""
+    if not column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added column {table}.{column}")
+
+def has_index(cursor, table, columns):
+    """Return True if some index on the table starts with exactly these columns, in order"""
+    cursor.execute(
+        """
+        SELECT index_name, column_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+        """,
+        (table,)
+    )
+    indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name.lower())
+    wanted = [column.lower() for column in columns]
+    return any(index[:len(wanted)] == wanted for index in indexes.values())
+
+def add_index(cursor, table, name, columns):
+    """Create an index unless an existing index already covers the same leading columns"""
+    if not has_index(cursor, table, columns):
+        cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+        logger.info(f"Created index {name} on {table} ({', '.join(columns)})")
+
+def create_users(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) NOT NULL,
+            surname VARCHAR(255),
+            email VARCHAR(255) NOT NULL UNIQUE,
+            password VARCHAR(255) NOT NULL
+        )
+    """)
+    add_column(cursor, 'users', 'role', "VARCHAR(50) DEFAULT 'user'")
+    add_column(cursor, 'users', 'active', "BOOLEAN DEFAULT FALSE")
+    add_column(cursor, 'users', 'created_at', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+    add_column(cursor, 'users', 'last_activity', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+
+def create_lessons(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lessons (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            course_id INT NOT NULL,
+            week_id INT NOT NULL,
+            day_id INT NOT NULL,
+            lesson_name VARCHAR(255) NOT NULL,
+            file_path VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for column in ['course_id', 'week_id', 'day_id']:
+        add_column(cursor, 'lessons', column, 'INT NOT NULL')
+    for column in ['lesson_name', 'file_path']:
+        add_column(cursor, 'lessons', column, 'VARCHAR(255) NOT NULL')
+    # Written by PDF ingestion
+    add_column(cursor, 'lessons', 'summary', 'TEXT')
+    add_column(cursor, 'lessons', 'ai_enhanced', 'BOOLEAN DEFAULT FALSE')
+
+def create_lesson_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lesson_qa_pairs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            lesson_id INT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            FOREIGN KEY (lesson_id) REFERENCES lessons(id) ON DELETE CASCADE
+        )
+    """)
+    # Precomputed topics, sentences and term statistics for each lesson
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lesson_profiles (
+            lesson_id INT PRIMARY KEY,
+            content_hash CHAR(64) NOT NULL,
+            profile MEDIUMTEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (lesson_id) REFERENCES lessons(id) ON DELETE CASCADE
+        )
+    """)
+
+def add_lesson_indexes(cursor):
+    # Catalog listing: ORDER BY course, week, lesson, alone or filtered by course
+    add_index(cursor, 'lessons', 'idx_lessons_course_week', ['course_id', 'week_id', 'id'])
+    # Lessons are looked up by artifact path when an artifact is re-processed
+    add_index(cursor, 'lessons', 'idx_lessons_file_path', ['file_path'])
+    # QA pairs are always read by lesson
+    add_index(cursor, 'lesson_qa_pairs', 'idx_qa_pairs_lesson', ['lesson_id'])
+
+def create_lesson_content(cursor):
+    # Extracted text, sections and QA pairs as zlib-compressed JSON, one row per lesson
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lesson_content (
+            lesson_id INT PRIMARY KEY,
+            content_hash CHAR(64) NOT NULL,
+            summary TEXT,
+            body LONGBLOB NOT NULL,
+            text_length INT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (lesson_id) REFERENCES lessons(id) ON DELETE CASCADE
+        )
+    """)
+
+def add_lesson_week_index(cursor):
+    # Catalog listing filtered by week only; with the week fixed, (course_id, id) is the listing order
+    add_index(cursor, 'lessons', 'idx_lessons_week_course', ['week_id', 'course_id', 'id'])
+
+# (version, name, function); append new migrations with the next version number
+MIGRATIONS = [
+    (1, 'create users', create_users),
+    (2, 'create lessons', create_lessons),
+    (3, 'create lesson QA pairs and profiles', create_lesson_tables),
+    (4, 'add lesson catalog indexes', add_lesson_indexes),
+    (5, 'create lesson content', create_lesson_content),
+    (6, 'add lesson week index', add_lesson_week_index),
+]
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def current_version(connection):
+    """Return the highest applied migration version, or 0 for an unmigrated database"""
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        if not table_exists(cursor, 'schema_migrations'):
+            return 0
+        return max(applied_versions(cursor), default=0)
+
+def migrate(connection):
+    """
+    Apply every pending migration in version order
+
+    Args:
+        connection: An open connection to the application database
+
+    Returns:
+        list: Versions that were applied by this call
+    """
+    applied = []
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Timed out waiting for another process to finish migrating")
+        try:
+            ensure_migrations_table(cursor)
+            done = applied_versions(cursor)
+            for version, name, apply in MIGRATIONS:
+                if version in done:
+                    continue
+                logger.info(f"Applying migration {version}: {name}")
+                apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name)
+                )
+                connection.commit()
+                applied.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+    if applied:
+        logger.info(f"Schema migrated to version {applied[-1]}")
+    return applied
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--status", action="store_true", help="Show the schema version without migrating")
+    args = parser.parse_args()
+
+    try:
+        connection = pymysql.connect(
+            host=os.getenv('DB_HOST', 'localhost'),
+            user=os.getenv('DB_USER', 'Sara'),
+            password=os.getenv('DB_PASSWORD', 'Sara0330!!'),
+            database=os.getenv('DB_NAME', 'aischool')
+        )
+    except Exception as e:
+        print(f"Database connection error: {str(e)}")
+        sys.exit(1)
+
+    try:
+        if not args.status:
+            migrate(connection)
+        print(f"Schema version: {current_version(connection)} (latest: {MIGRATIONS[-1][0]})")
+    except Exception as e:
+        print(f"Migration error: {str(e)}")
+        sys.exit(1)
+    finally:
+        connection.close()
@@ -2,13 +2,20 @@
 import os
 import sys
 import json
-import subprocess
+import time
 import logging
+import threading
 from pathlib import Path
 import pymysql
 import pymysql.cursors
 from dotenv import load_dotenv
 
+import pdf_processor
+from ingest_manifest import IngestManifest
+from migrations import current_version, migrate
+from lesson_content import CONTENT_COLUMNS, read_content, save_processed_content
+from lesson_profile import LessonProfile, refresh_profile, save_profile
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,21 +51,126 @@ class PDFIntegration:
         self.pdf_dir.mkdir(parents=True, exist_ok=True)
         self.json_dir.mkdir(parents=True, exist_ok=True)
         
+        # Content hashes of processed PDFs, so unchanged and duplicate files are not extracted again
+        self.manifest = IngestManifest(self.json_dir / 'manifest.json')
+        
+        # Schema migrations run once, on the first connection
+        self.schema_ready = False
+        self.schema_lock = threading.Lock()
+        
+        # Rows per multi-row INSERT when adding QA pairs
+        self.qa_batch_size = int(os.getenv('QA_INSERT_BATCH_SIZE', '500'))
+        
+        # Seconds to wait for a single PDF extraction
+        self.extraction_timeout = float(os.getenv('PDF_EXTRACTION_TIMEOUT', '300'))
+        
         logger.info(f"PDF directory: {self.pdf_dir}")
         logger.info(f"JSON directory: {self.json_dir}")
     
     def get_connection(self):
-        """Create and return a database connection"""
+        """Create and return a database connection, migrating the schema on first use"""
         try:
             connection = pymysql.connect(**self.db_config)
-            return connection
         except Exception as e:
             logger.error(f"Database connection error: {str(e)}")
             raise
+        if not self.schema_ready:
+            self.ensure_schema(connection)
+        return connection
+    
+    def ensure_schema(self, connection):
+        """
+        Apply pending schema migrations, once per process
+        
+        Runs before any transaction is opened, since DDL commits implicitly in MySQL.
+        
+        Args:
+            connection: An open database connection
+        """
+        with self.schema_lock:
+            if self.schema_ready:
+                return
+            migrate(connection)
+            self.schema_ready = True
+            logger.info(f"Schema ready at version {current_version(connection)}")
+    
+    def extract(self, pdf_path):
+        """
+        Extract a PDF in-process on the shared worker pool
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            
+        Returns:
+            dict: Title, full text, sections, summary and QA pairs
+        """
+        logger.info(f"Extracting PDF: {pdf_path}")
+        return pdf_processor.ingest_pdf(pdf_path, timeout=self.extraction_timeout,
+                                        previous_pages=self.previous_pages(pdf_path))
+    
+    def previous_pages(self, pdf_path):
+        """
+        Page hashes and text from the last extraction of this PDF path
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            
+        Returns:
+            dict: Page hash -> text, empty if the file was never processed
+        """
+        entry = self.manifest.files.get(os.path.abspath(pdf_path))
+        artifact = self.manifest.artifacts.get(entry['hash']) if entry else None
+        if not artifact:
+            return {}
+        return pdf_processor.load_previous_pages(artifact['json_path'])
+    
+    def json_path_for(self, pdf_path, digest=None):
+        """
+        Return the path of the processed JSON file for a PDF
+        
+        If the default path holds the artifact of different content that
+        another PDF still uses, a path qualified by the content hash is used
+        so the shared artifact is not overwritten.
+        """
+        json_path = str(self.json_dir / f"{Path(pdf_path).stem}.json")
+        if digest and self.manifest.is_shared(json_path, pdf_path) and self.manifest.artifacts.get(digest, {}).get('json_path') != json_path:
+            json_path = str(self.json_dir / f"{Path(pdf_path).stem}-{digest[:12]}.json")
+        return json_path
+    
+    def cached_artifact(self, pdf_path):
+        """
+        Find an existing artifact for a PDF's contents
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            
+        Returns:
+            tuple: (content hash, JSON path or None if the contents were never processed)
+        """
+        digest, json_path = self.manifest.artifact_for(pdf_path)
+        if json_path:
+            # Same contents as an earlier upload; point this file at its artifact
+            self.manifest.record(pdf_path, digest, json_path)
+        return digest, json_path
+    
+    def store_result(self, pdf_path, digest, result):
+        """
+        Write an extraction result and record it in the manifest
+        
+        Returns:
+            str: Path to the processed JSON file
+        """
+        json_path = self.json_path_for(pdf_path, digest)
+        result['content_hash'] = digest
+        pdf_processor.write_result(result, json_path)
+        self.manifest.record(pdf_path, digest, json_path)
+        return json_path
     
     def process_pdf(self, pdf_path):
         """
-        Process a PDF file using the Python script
+        Process a PDF file and save the result as JSON
+        
+        PDFs whose contents were already processed reuse the existing artifact.
         
         Args:
             pdf_path (str): Path to the PDF file
@@ -67,46 +179,54 @@ class PDFIntegration:
             str: Path to the processed JSON file
         """
         try:
-            # Generate output path
-            file_name = Path(pdf_path).stem
-            json_path = str(self.json_dir / f"{file_name}.json")
-            
             logger.info(f"Processing PDF: {pdf_path}")
-            logger.info(f"Output will be saved to: {json_path}")
-            
-            # Run the Python script
-            process = subprocess.Popen(
-                ['python', 'pdf_processor.py', pdf_path, '--output', json_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # Capture output
-            stdout, stderr = process.communicate()
-            
-            # Log output
-            if stdout:
-                logger.info(f"Python output: {stdout}")
-            if stderr:
-                logger.error(f"Python error: {stderr}")
             
-            # Check return code
-            if process.returncode != 0:
-                logger.error(f"Python process exited with code {process.returncode}")
-                logger.error(f"Error: {stderr}")
-                raise Exception(f"PDF processing failed with code {process.returncode}: {stderr}")
+            digest, json_path = self.cached_artifact(pdf_path)
+            if json_path:
+                logger.info(f"PDF contents already processed, reusing: {json_path}")
+                return json_path
             
-            # Check if the output file exists
-            if not os.path.exists(json_path):
-                raise FileNotFoundError("PDF processing completed but output file was not created")
+            # Extract on the worker pool instead of starting a new interpreter per file
+            result = self.extract(pdf_path)
+            json_path = self.store_result(pdf_path, digest, result)
             
-            logger.info(f"PDF processing completed successfully: {json_path}")
+            logger.info(f"PDF processing completed successfully: {json_path} ({result['page_count']} pages, {result['reused_pages']} unchanged, {len(result['sections'])} sections, {len(result['qa_pairs'])} QA pairs)")
             return json_path
         except Exception as e:
             logger.error(f"Error processing PDF: {str(e)}")
             raise
     
+    def refresh_lessons(self, json_path):
+        """
+        Update the stored summary, content and topic profile of lessons built from a re-processed artifact
+        
+        Args:
+            json_path (str): Path to the processed JSON file
+            
+        Returns:
+            int: Number of lessons updated
+        """
+        with open(json_path, 'r', encoding='utf-8') as f:
+            json_content = json.load(f)
+        connection = self.get_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT id FROM lessons WHERE file_path = %s", (json_path,))
+                lesson_ids = [row['id'] for row in cursor.fetchall()]
+                if lesson_ids:
+                    cursor.execute(
+                        "UPDATE lessons SET summary = %s WHERE file_path = %s",
+                        (json_content.get('summary', ''), json_path)
+                    )
+                for lesson_id in lesson_ids:
+                    save_processed_content(cursor, lesson_id, json_content)
+                    if json_content.get('full_text'):
+                        refresh_profile(cursor, lesson_id, json_content['full_text'])
+            connection.commit()
+            return len(lesson_ids)
+        finally:
+            connection.close()
+    
     def add_to_database(self, json_path, lesson_info):
         """
         Add a processed PDF to the database
@@ -128,57 +248,7 @@ class PDFIntegration:
             
             try:
                 with connection.cursor() as cursor:
-                    # Insert into the database
-                    cursor.execute(
-                        """
-                        INSERT INTO lessons 
-                        (course_id, week_id, day_id, lesson_name, file_path, summary, ai_enhanced) 
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            lesson_info['courseId'],
-                            lesson_info['weekId'],
-                            lesson_info['dayId'],
-                            lesson_info.get('title', json_content.get('title', '')),
-                            json_path,
-                            json_content.get('summary', ''),
-                            1  # Flag to indicate this is an AI-enhanced lesson
-                        )
-                    )
-                    
-                    # Get the inserted ID
-                    lesson_id = cursor.lastrowid
-                    logger.info(f"Lesson added to database with ID: {lesson_id}")
-                    
-                    # Add QA pairs to a separate table if it exists
-                    if json_content.get('qa_pairs') and len(json_content['qa_pairs']) > 0:
-                        try:
-                            # Check if the qa_pairs table exists
-                            cursor.execute("SHOW TABLES LIKE 'lesson_qa_pairs'")
-                            if not cursor.fetchone():
-                                # Create the table if it doesn't exist
-                                cursor.execute("""
-                                    CREATE TABLE lesson_qa_pairs (
-                                        id INT AUTO_INCREMENT PRIMARY KEY,
-                                        lesson_id INT NOT NULL,
-                                        question TEXT NOT NULL,
-                                        answer TEXT NOT NULL,
-                                        FOREIGN KEY (lesson_id) REFERENCES lessons(id) ON DELETE CASCADE
-                                    )
-                                """)
-                                logger.info("Created lesson_qa_pairs table")
-                            
-                            # Insert QA pairs
-                            for pair in json_content['qa_pairs']:
-                                cursor.execute(
-                                    "INSERT INTO lesson_qa_pairs (lesson_id, question, answer) VALUES (%s, %s, %s)",
-                                    (lesson_id, pair['question'], pair['answer'])
-                                )
-                            
-                            logger.info(f"Added {len(json_content['qa_pairs'])} QA pairs for lesson {lesson_id}")
-                        except Exception as e:
-                            logger.error(f"Error adding QA pairs: {str(e)}")
-                            # Continue even if QA pairs couldn't be added
+                    lesson_id = self.insert_lesson(cursor, json_path, json_content, lesson_info)
                     
                     # Commit the transaction
                     connection.commit()
@@ -190,6 +260,89 @@ class PDFIntegration:
             logger.error(f"Error adding to database: {str(e)}")
             raise
     
+    def insert_lesson(self, cursor, json_path, json_content, lesson_info):
+        """
+        Insert a processed lesson, its QA pairs, content and topic profile without committing
+        
+        Args:
+            cursor: Cursor of an open database connection
+            json_path (str): Path to the processed JSON file
+            json_content (dict): Contents of the processed JSON file
+            lesson_info (dict): Information about the lesson
+            
+        Returns:
+            int: ID of the inserted lesson
+        """
+        # Insert into the database
+        cursor.execute(
+            """
+            INSERT INTO lessons 
+            (course_id, week_id, day_id, lesson_name, file_path, summary, ai_enhanced) 
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                lesson_info['courseId'],
+                lesson_info['weekId'],
+                lesson_info['dayId'],
+                lesson_info.get('title', json_content.get('title', '')),
+                json_path,
+                json_content.get('summary', ''),
+                1  # Flag to indicate this is an AI-enhanced lesson
+            )
+        )
+        
+        # Get the inserted ID
+        lesson_id = cursor.lastrowid
+        logger.info(f"Lesson added to database with ID: {lesson_id}")
+        
+        # Add QA pairs to their own table, in the same transaction
+        if json_content.get('qa_pairs'):
+            try:
+                self.insert_qa_pairs(cursor, lesson_id, json_content['qa_pairs'])
+            except Exception as e:
+                logger.error(f"Error adding QA pairs: {str(e)}")
+                # Continue even if QA pairs couldn't be added
+        
+        # Store the text and structure so reads never go back to the file
+        save_processed_content(cursor, lesson_id, json_content)
+        
+        # Store the lesson's topic profile so the chat path never recomputes it
+        if json_content.get('full_text'):
+            try:
+                profile = LessonProfile.build(json_content['full_text'])
+                save_profile(cursor, lesson_id, profile)
+                logger.info(f"Stored topic profile for lesson {lesson_id}: {len(profile.topics)} topics, {len(profile.sentences)} sentences")
+            except Exception as e:
+                logger.error(f"Error storing lesson profile: {str(e)}")
+                # Continue; the profile is built on first load instead
+        
+        return lesson_id
+    
+    def insert_qa_pairs(self, cursor, lesson_id, qa_pairs):
+        """
+        Insert the QA pairs of a lesson with multi-row INSERT statements
+        
+        Args:
+            cursor: Cursor of an open database connection
+            lesson_id (int): ID of the lesson
+            qa_pairs (list): Dicts with 'question' and 'answer'
+            
+        Returns:
+            int: Number of QA pairs inserted
+        """
+        rows = [(lesson_id, pair['question'], pair['answer']) for pair in qa_pairs]
+        start = time.perf_counter()
+        for offset in range(0, len(rows), self.qa_batch_size):
+            # executemany sends each slice as a single INSERT ... VALUES (...), (...)
+            cursor.executemany(
+                "INSERT INTO lesson_qa_pairs (lesson_id, question, answer) VALUES (%s, %s, %s)",
+                rows[offset:offset + self.qa_batch_size]
+            )
+        elapsed = time.perf_counter() - start
+        rate = len(rows) / elapsed if elapsed > 0 else float('inf')
+        logger.info(f"Added {len(rows)} QA pairs for lesson {lesson_id} in {elapsed * 1000:.1f} ms ({rate:.0f} rows/s)")
+        return len(rows)
+    
     def process_and_add_lesson(self, pdf_path, lesson_info):
         """
         Process a PDF file and add it to the database
@@ -204,6 +357,7 @@ class PDFIntegration:
         try:
             # Process the PDF
             json_path = self.process_pdf(pdf_path)
+            self.manifest.flush()
             
             # Add to database
             lesson_id = self.add_to_database(json_path, lesson_info)
@@ -236,9 +390,14 @@ class PDFIntegration:
             
             try:
                 with connection.cursor() as cursor:
-                    # Get the lesson from the database
+                    # Get the lesson and its stored content in one primary-key lookup
                     cursor.execute(
-                        "SELECT * FROM lessons WHERE id = %s",
+                        f"""
+                        SELECT l.*, {CONTENT_COLUMNS}
+                        FROM lessons l
+                        LEFT JOIN lesson_content lc ON lc.lesson_id = l.id
+                        WHERE l.id = %s
+                        """,
                         (lesson_id,)
                     )
                     lesson = cursor.fetchone()
@@ -246,6 +405,18 @@ class PDFIntegration:
                     if not lesson:
                         raise ValueError("Lesson not found")
                     
+                    stored = read_content(lesson)
+                    if stored is not None:
+                        return {
+                            'id': lesson['id'],
+                            'title': lesson['lesson_name'],
+                            'summary': stored['summary'] or lesson.get('summary', ''),
+                            'content': stored['text'],
+                            'sections': stored['sections'],
+                            'qaPairs': stored['qa_pairs']
+                        }
+                    
+                    # Lessons added before lesson_content existed are read from their file
                     file_path = lesson['file_path']
                     
                     # Check if this is an AI-enhanced lesson (JSON file)
@@ -260,13 +431,11 @@ class PDFIntegration:
                         # Get QA pairs if available
                         qa_pairs = []
                         try:
-                            cursor.execute("SHOW TABLES LIKE 'lesson_qa_pairs'")
-                            if cursor.fetchone():
-                                cursor.execute(
-                                    "SELECT question, answer FROM lesson_qa_pairs WHERE lesson_id = %s",
-                                    (lesson_id,)
-                                )
-                                qa_pairs = cursor.fetchall()
+                            cursor.execute(
+                                "SELECT question, answer FROM lesson_qa_pairs WHERE lesson_id = %s",
+                                (lesson_id,)
+                            )
+                            qa_pairs = cursor.fetchall()
                         except Exception as e:
                             logger.error(f"Error fetching QA pairs: {str(e)}")
                         
@@ -302,7 +471,10 @@ pdf_integration = PDFIntegration()
 
 # Export functions for direct use
 def process_pdf(pdf_path):
-    return pdf_integration.process_pdf(pdf_path)
+    try:
+        return pdf_integration.process_pdf(pdf_path)
+    finally:
+        pdf_integration.manifest.flush()
 
 def add_to_database(json_path, lesson_info):
     return pdf_integration.add_to_database(json_path, lesson_info)
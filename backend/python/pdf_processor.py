@@ -1,9 +1,16 @@
 import os
+import sys
+import atexit
+import argparse
 import fitz  # PyMuPDF
 import re
 import json
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional
 
 # Define paths relative to the project root
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -85,18 +92,11 @@ def process_pdf(lesson_id: str) -> Dict[str, Any]:
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
-    Extract text from a PDF file
-    To be implemented with your PDF processing logic
+    Extract the text of a PDF file, reading it a page at a time
+    Returns an empty string if the file cannot be read
     """
     try:
-        text = ""
-        # Open the PDF file
-        with fitz.open(pdf_path) as doc:
-            # Iterate through each page
-            for page in doc:
-                # Extract text from the page
-                text += page.get_text()
-        return text
+        return "".join(iter_page_texts(pdf_path))
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return ""
@@ -173,4 +173,374 @@ def extract_qa_pairs(text):
                     "answer": answer
                 })
     
-    return qa_pairs[:10]  # Limit to 10 pairs 
\ No newline at end of file
+    return qa_pairs[:10]  # Limit to 10 pairs
+
+# Lines that look like slide or section headings
+HEADING_PATTERN = re.compile(r'^(#{1,3}\s+.+|(\d+(\.\d+)*\.?\s+)?[A-Z][A-Za-z0-9 ,:&()/-]{2,78})$')
+
+def is_heading(stripped: str) -> bool:
+    """
+    Whether a stripped line looks like a slide or section heading.
+    Markdown headers and short capitalized lines without a final full stop count as headings.
+    """
+    return bool(
+        stripped
+        and HEADING_PATTERN.match(stripped)
+        and not stripped.endswith(('.', ',', ';'))
+        and (stripped.startswith('#') or stripped.istitle() or stripped.isupper())
+    )
+
+SUMMARY_LENGTH = 500
+MAX_QA_PAIRS = 10
+
+def iter_page_texts(pdf_path: str, parallel: Optional[bool] = None) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF in order.
+    Only one page's text is held at a time; the document is closed when the generator finishes or is closed.
+    Large PDFs are extracted by page range on the process pool unless parallel is False,
+    which request handlers pass so a web server never starts worker processes.
+    """
+    with fitz.open(pdf_path) as doc:
+        if parallel is None:
+            parallel = use_page_parallel(len(doc))
+        if parallel:
+            for page in iter_pages_parallel(pdf_path, len(doc), with_hash=False):
+                yield page['text']
+        else:
+            for page in doc:
+                yield page.get_text()
+
+class LessonTextBuilder:
+    """
+    Build the summary, sections and QA pairs of a lesson from streamed text.
+
+    Text is fed a page at a time and split into lines as it arrives, so
+    nothing is derived from a second full copy of the document. Sections
+    start at lines that is_heading accepts, and QA pairs are found as in
+    extract_qa_pairs.
+    """
+
+    def __init__(self):
+        self.length = 0
+        self.first_line = ""
+        self.sections: List[Dict[str, str]] = []
+        self.qa_pairs: List[Dict[str, str]] = []
+        self._chunks: List[str] = []
+        self._head = ""
+        self._partial_line = ""
+        self._previous_line: Optional[str] = None
+        self._section = {'title': 'Introduction', 'content': []}
+
+    def feed(self, chunk: str):
+        """Add the next piece of text, usually one page"""
+        self._chunks.append(chunk)
+        self.length += len(chunk)
+        if len(self._head) <= SUMMARY_LENGTH:
+            self._head += chunk[:SUMMARY_LENGTH + 1 - len(self._head)]
+        lines = (self._partial_line + chunk).split("\n")
+        self._partial_line = lines.pop()
+        for line in lines:
+            self._add_line(line)
+
+    def feed_all(self, chunks) -> "LessonTextBuilder":
+        """Feed every chunk from an iterable and finish"""
+        for chunk in chunks:
+            self.feed(chunk)
+        return self.finish()
+
+    def finish(self) -> "LessonTextBuilder":
+        """Process the final line; call once after the last chunk"""
+        self._add_line(self._partial_line)
+        self._partial_line = ""
+        self._close_section()
+        return self
+
+    @property
+    def text(self) -> str:
+        """The full text, joined once"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    @property
+    def summary(self) -> str:
+        return self._head[:SUMMARY_LENGTH] + "..." if self.length > SUMMARY_LENGTH else self._head
+
+    def _add_line(self, line: str):
+        previous = self._previous_line
+        if previous is not None and "?" in previous and len(self.qa_pairs) < MAX_QA_PAIRS:
+            question = previous.strip()
+            answer = line.strip()
+            if question and answer and len(answer) > 10:
+                self.qa_pairs.append({"question": question, "answer": answer})
+        self._previous_line = line
+
+        stripped = line.strip()
+        if stripped and not self.first_line:
+            self.first_line = stripped
+        if is_heading(stripped):
+            self._close_section()
+            self._section = {'title': stripped.lstrip('#').strip(), 'content': []}
+        else:
+            self._section['content'].append(line + "\n")
+
+    def _close_section(self):
+        content = "".join(self._section['content'])
+        if content.strip():
+            self.sections.append({'title': self._section['title'], 'content': content})
+        self._section['content'] = []
+
+OBJECT_REFERENCE = re.compile(r'(\d+)\s+(\d+)\s+R\b')
+PARENT_REFERENCE = re.compile(r'/Parent\s+\d+\s+\d+\s+R\b')
+
+def object_hash(doc, xref: int, object_hashes: Dict[int, str], visiting=frozenset()) -> str:
+    """
+    Hash a PDF object together with every object it references, following fonts, images and
+    form XObjects down to their streams. /Parent links are skipped so a page never pulls in
+    the whole page tree. Hashes are memoized per xref in object_hashes.
+    """
+    if xref in object_hashes:
+        return object_hashes[xref]
+    if xref in visiting:
+        return 'cycle'
+    visiting = visiting | {xref}
+    source = PARENT_REFERENCE.sub('', doc.xref_object(xref, compressed=True))
+    source = OBJECT_REFERENCE.sub(lambda match: object_hash(doc, int(match.group(1)), object_hashes, visiting), source)
+    digest = hashlib.sha256(source.encode('utf-8'))
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream_raw(xref) or b'')
+    object_hashes[xref] = digest.hexdigest()
+    return object_hashes[xref]
+
+def page_resources(doc, xref: int):
+    """Return the (type, value) of a page's /Resources, inherited from the page tree if needed."""
+    for _ in range(64):
+        kind, value = doc.xref_get_key(xref, 'Resources')
+        if kind != 'null':
+            return kind, value
+        kind, parent = doc.xref_get_key(xref, 'Parent')
+        if kind != 'xref':
+            break
+        xref = int(parent.split()[0])
+    return 'null', ''
+
+def page_hash(page, object_hashes: Optional[Dict[int, str]] = None) -> str:
+    """
+    Hash what determines a page's text: its content streams, the resources they draw
+    (fonts and form XObjects, followed recursively), size and rotation.
+    Pass the same object_hashes dict for every page of a document to hash shared resources once.
+    """
+    doc = page.parent
+    object_hashes = {} if object_hashes is None else object_hashes
+    digest = hashlib.sha256(f"{page.rotation}:{tuple(page.mediabox)}".encode('utf-8'))
+    for xref in page.get_contents():
+        digest.update(object_hash(doc, xref, object_hashes).encode('utf-8'))
+    kind, resources = page_resources(doc, page.xref)
+    if kind == 'xref':
+        resources = object_hash(doc, int(resources.split()[0]), object_hashes)
+    elif kind == 'dict':
+        resources = OBJECT_REFERENCE.sub(lambda match: object_hash(doc, int(match.group(1)), object_hashes), resources)
+    digest.update(resources.encode('utf-8'))
+    return digest.hexdigest()
+
+def iter_pages(doc, previous_pages: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, str]]:
+    """
+    Yield the hash and text of every page.
+    Pages whose hash is in previous_pages (hash -> text) reuse that text instead of being extracted.
+    """
+    previous_pages = previous_pages or {}
+    object_hashes = {}
+    for page in doc:
+        digest = page_hash(page, object_hashes)
+        text = previous_pages.get(digest)
+        if text is None:
+            text = page.get_text()
+        yield {'hash': digest, 'text': text}
+
+def extract_page_range(pdf_path: str, start: int, stop: int, known_hashes=frozenset(), with_hash: bool = True) -> List[Dict[str, Any]]:
+    """
+    Extract pages start to stop - 1 of a PDF, opening it separately from any other worker.
+    Pages whose hash is in known_hashes are returned with text None for the caller to fill in.
+    """
+    pages = []
+    object_hashes = {}
+    with fitz.open(pdf_path) as doc:
+        for number in range(start, stop):
+            page = doc[number]
+            digest = page_hash(page, object_hashes) if with_hash else None
+            text = None if digest in known_hashes else page.get_text()
+            pages.append({'hash': digest, 'text': text})
+    return pages
+
+def extract_pdf(pdf_path: str, previous_pages: Optional[Dict[str, str]] = None, parallel: Optional[bool] = None,
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Extract everything the lesson pipeline needs from a PDF.
+    Returns the title, full text, per-page hashes and lengths, sections, summary, QA pairs and page count.
+    previous_pages maps page hashes from an earlier extraction to their text, so only changed pages are re-extracted.
+    parallel splits the pages across the process pool, waiting up to timeout seconds per page range;
+    by default it is used for PDFs above the page threshold.
+    """
+    previous_pages = previous_pages or {}
+    # The builder keeps the only copy of the text; pages record where each page's text
+    # ends in it, so page_texts can split it up again for the next extraction
+    builder = LessonTextBuilder()
+    pages = []
+    reused_pages = 0
+    with fitz.open(pdf_path) as doc:
+        title = (doc.metadata or {}).get('title') or ''
+        if parallel is None:
+            parallel = use_page_parallel(len(doc))
+        if parallel:
+            source = iter_pages_parallel(pdf_path, len(doc), previous_pages, timeout=timeout)
+        else:
+            source = iter_pages(doc, previous_pages)
+        # Summary, sections and QA pairs are built as each page arrives
+        for page in source:
+            builder.feed(page['text'])
+            pages.append({'hash': page['hash'], 'length': len(page['text'])})
+            reused_pages += page['hash'] in previous_pages
+    builder.finish()
+    if not title:
+        title = builder.first_line[:255] or Path(pdf_path).stem
+    return {
+        'title': title,
+        'source_file': str(pdf_path),
+        'page_count': len(pages),
+        'reused_pages': reused_pages,
+        'full_text': builder.text,
+        'pages': pages,
+        'sections': builder.sections,
+        'summary': builder.summary,
+        'qa_pairs': builder.qa_pairs
+    }
+
+def page_texts(result: Dict[str, Any]) -> List[str]:
+    """Split the full text of an extraction result into the text of each page"""
+    texts = []
+    offset = 0
+    for page in result.get('pages', []):
+        if 'text' in page:
+            # Written before pages were stored as lengths
+            texts.append(page['text'])
+            continue
+        texts.append(result['full_text'][offset:offset + page['length']])
+        offset += page['length']
+    return texts
+
+# Worker processes are started once and reused, so PyMuPDF is imported once per worker.
+# They are spawned, not forked, so they never inherit the locks and threads of a multithreaded parent.
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 2)))
+# PDFs with at least this many pages are extracted by page range across the workers
+PARALLEL_PAGE_THRESHOLD = int(os.getenv('PDF_PARALLEL_PAGE_THRESHOLD', '100'))
+PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '25'))
+_process_pool: Optional[ProcessPoolExecutor] = None
+_in_worker = False
+
+def _mark_worker():
+    global _in_worker
+    _in_worker = True
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared extraction process pool, starting it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, initializer=_mark_worker,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+def shutdown_process_pool():
+    """Stop the extraction worker processes"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+atexit.register(shutdown_process_pool)
+
+def submit_to_pool(fn, *args):
+    """Submit a call to the process pool, restarting the pool once if a worker died"""
+    try:
+        return get_process_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        shutdown_process_pool()
+        return get_process_pool().submit(fn, *args)
+
+def use_page_parallel(page_count: int) -> bool:
+    """Whether a PDF is large enough to split across workers (never from inside a worker)"""
+    return page_count >= PARALLEL_PAGE_THRESHOLD and PDF_WORKERS > 1 and not _in_worker
+
+def iter_pages_parallel(pdf_path: str, page_count: int, previous_pages: Optional[Dict[str, str]] = None,
+                        with_hash: bool = True, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the hash and text of every page, extracting page ranges in parallel on the process pool.
+    Ranges are yielded in page order as they complete; pages in previous_pages are not re-extracted.
+    """
+    previous_pages = previous_pages or {}
+    known_hashes = frozenset(previous_pages)
+    step = max(1, min(PAGES_PER_TASK, -(-page_count // PDF_WORKERS)))
+    futures = [
+        submit_to_pool(extract_page_range, str(pdf_path), start, min(start + step, page_count), known_hashes, with_hash)
+        for start in range(0, page_count, step)
+    ]
+    try:
+        for future in futures:
+            for page in future.result(timeout=timeout):
+                if page['text'] is None:
+                    page['text'] = previous_pages[page['hash']]
+                yield page
+    finally:
+        for future in futures:
+            future.cancel()
+
+def submit_extraction(pdf_path: str, previous_pages: Optional[Dict[str, str]] = None):
+    """Queue a PDF for extraction on the process pool and return its future"""
+    return submit_to_pool(extract_pdf, str(pdf_path), previous_pages)
+
+def ingest_pdf(pdf_path: str, timeout: Optional[float] = None, previous_pages: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Extract a PDF on the shared process pool and wait for the structured result"""
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    if use_page_parallel(page_count):
+        # Split a large PDF across all workers rather than giving it to one
+        return extract_pdf(pdf_path, previous_pages, parallel=True, timeout=timeout)
+    return submit_extraction(pdf_path, previous_pages).result(timeout=timeout)
+
+def load_previous_pages(json_path: str) -> Dict[str, str]:
+    """Return page hash -> text from an earlier extraction result, or {} if there is none"""
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {page['hash']: text for page, text in zip(result.get('pages', []), page_texts(result))}
+
+def write_result(result: Dict[str, Any], output_path: str):
+    """Write an extraction result to a JSON file"""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract text, sections, summary and QA pairs from a lesson PDF")
+    parser.add_argument("pdf_path", help="Path to the PDF file")
+    parser.add_argument("--output", help="Path of the JSON file to write (prints to stdout if omitted)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pdf_path):
+        print(f"Error: PDF file not found: {args.pdf_path}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        # Re-extract only the pages that changed since the existing output was written
+        previous_pages = load_previous_pages(args.output) if args.output else None
+        result = extract_pdf(args.pdf_path, previous_pages)
+    except Exception as e:
+        print(f"Error processing PDF: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        write_result(result, args.output)
+        print(f"Processed {args.pdf_path} -> {args.output} ({result['reused_pages']} of {result['page_count']} pages unchanged)")
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,206 @@
+"""
+Fallback PDFs served when a lesson's own file is missing.
+
+Rendering a PDF takes tens of milliseconds of CPU, so it never happens on a
+request path. SamplePDFStore renders each document once on a background
+thread, writes it to disk atomically and remembers the ready paths in
+memory; until a document exists, callers get None and serve something else.
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("sample_pdfs")
+
+INTRO_TEXT_PATH = os.path.join('backend', 'python', 'pdfs', 'deep_learning_intro.txt')
+
+LESSON_SAMPLE_PAGES = [
+    """
+    Introduction to Deep Learning
+
+    Deep Learning is a subset of machine learning that uses neural networks with multiple layers.
+
+    Key concepts include:
+    1. Neural Networks
+    2. Backpropagation
+    3. Activation Functions
+    4. Training and Testing
+
+    Neural networks are inspired by the human brain and consist of interconnected nodes (neurons).
+    Each connection has a weight that determines its importance.
+    """,
+    """
+    Types of Neural Networks:
+
+    1. Feedforward Neural Networks
+    2. Convolutional Neural Networks (CNNs)
+    3. Recurrent Neural Networks (RNNs)
+    4. Transformers
+
+    Applications of Deep Learning:
+
+    - Computer Vision
+    - Natural Language Processing
+    - Speech Recognition
+    - Recommendation Systems
+    """
+]
+
+class SamplePDFPending(Exception):
+    """Raised when no fallback PDF has been rendered yet"""
+
+def render_lesson_sample(path, lesson_id=None):
+    """Write the three-page deep learning sample lesson with PyMuPDF"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    try:
+        # Add a title page
+        page = doc.new_page()
+        title_text = f"Lesson {lesson_id}: Deep Learning Fundamentals" if lesson_id is not None else "Deep Learning Fundamentals"
+        page.insert_text((50, 50), title_text, fontsize=24, color=(0, 0, 0))
+        page.insert_text((50, 100), "AI School", fontsize=18, color=(0, 0, 0))
+
+        # Add content pages
+        for text in LESSON_SAMPLE_PAGES:
+            page = doc.new_page()
+            page.insert_text((50, 50), text, fontsize=12, color=(0, 0, 0))
+
+        doc.save(path)
+    finally:
+        doc.close()
+
+def render_intro_pdf(path, text_path=INTRO_TEXT_PATH):
+    """Write the introduction to deep learning from its markdown-style text file with ReportLab"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph
+
+    doc = SimpleDocTemplate(path, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = [Paragraph("Introduction to Deep Learning", styles['Title'])]
+
+    try:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        # Split content by sections
+        sections = content.split('##')
+
+        # Add introduction
+        for paragraph in sections[0].strip().split('\n\n'):
+            if paragraph.strip():
+                story.append(Paragraph(paragraph.strip(), styles['Normal']))
+
+        # Add sections
+        for section in sections[1:]:
+            if section.strip():
+                lines = section.strip().split('\n')
+                story.append(Paragraph(lines[0].strip(), styles['Heading2']))
+                for paragraph in '\n'.join(lines[1:]).strip().split('\n\n'):
+                    if paragraph.strip():
+                        story.append(Paragraph(paragraph.strip(), styles['Normal']))
+    except Exception as e:
+        logger.error(f"Error reading content file: {str(e)}")
+        # Add default content
+        story.append(Paragraph("Deep learning is a subset of machine learning that uses neural networks with multiple layers to analyze various forms of data.", styles['Normal']))
+
+    doc.build(story)
+
+class SamplePDFStore:
+    """
+    Fallback PDFs rendered at most once per path, off the caller's thread.
+
+    get() answers from memory once a path is known to exist. A missing
+    document is rendered on a single background thread to a temporary file
+    that is renamed into place, so a half-written PDF is never served.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+        self.failures = 0
+        self._ready = set()
+        self._pending = {}  # path -> future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sample-pdf")
+
+    def get(self, path, render, on_created=None):
+        """
+        Return path if the PDF exists, else start rendering it and return None
+
+        Args:
+            path: Where the PDF is kept
+            render: Called as render(temporary_path) on the background thread
+            on_created: Optional callback, called with path once the PDF was rendered
+        """
+        with self._lock:
+            if path in self._ready:
+                self.hits += 1
+                return path
+        if os.path.exists(path):
+            with self._lock:
+                self._ready.add(path)
+                self.hits += 1
+            return path
+        with self._lock:
+            self.misses += 1
+        self.ensure(path, render, on_created)
+        return None
+
+    def ensure(self, path, render, on_created=None):
+        """Render the PDF in the background unless it exists or is being rendered; returns the future or None"""
+        with self._lock:
+            if path in self._ready:
+                return None
+            future = self._pending.get(path)
+            if future is None:
+                future = self._pending[path] = self._executor.submit(self._render, path, render, on_created)
+            return future
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": len(self._ready),
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rendered": self.rendered,
+                "failures": self.failures
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def _render(self, path, render, on_created):
+        created = False
+        try:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                temporary_path = f"{path}.{os.getpid()}.tmp"
+                try:
+                    render(temporary_path)
+                    os.replace(temporary_path, path)
+                finally:
+                    if os.path.exists(temporary_path):
+                        os.remove(temporary_path)
+                created = True
+                logger.info(f"Created sample PDF at {path}")
+            with self._lock:
+                self._ready.add(path)
+                if created:
+                    self.rendered += 1
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            logger.error(f"Error creating sample PDF {path}: {str(e)}")
+        finally:
+            with self._lock:
+                del self._pending[path]
+        if created and on_created is not None:
+            on_created(path)
+
+# Shared by every server in the process
+sample_pdfs = SamplePDFStore()
@@ -0,0 +1,96 @@
+import pytest
+
+import bulk_ingest
+from bulk_ingest import IngestState, insert_batch
+
+class FakeDatabase:
+    """Lessons table shared by every connection; rows become visible on commit"""
+
+    def __init__(self):
+        self.lessons = []
+        self.pending = []
+
+    def connect(self):
+        return FakeConnection(self)
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        self.database.lessons.extend(self.database.pending)
+        self.database.pending = []
+
+    def rollback(self):
+        self.database.pending = []
+
+    def close(self):
+        pass
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        assert query.startswith("SELECT")
+        self.rows = [row for row in self.database.lessons if row['file_path'] in params]
+
+    def fetchall(self):
+        return self.rows
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+
+    def insert_lesson(cursor, json_path, result, lesson_info):
+        lesson_id = len(database.lessons) + len(database.pending) + 1
+        database.pending.append({
+            'id': lesson_id, 'file_path': json_path, 'course_id': lesson_info['courseId'],
+            'week_id': lesson_info['weekId'], 'day_id': lesson_info['dayId'], 'lesson_name': lesson_info['title']
+        })
+        return lesson_id
+
+    monkeypatch.setattr(bulk_ingest.pdf_integration, "get_connection", database.connect)
+    monkeypatch.setattr(bulk_ingest.pdf_integration, "insert_lesson", insert_lesson)
+    return database
+
+def item(pdf_path, json_path, title, course_id=1):
+    info = {'courseId': course_id, 'weekId': 2, 'dayId': 3, 'title': title}
+    return (pdf_path, info, json_path, {'title': title})
+
+def test_batch_committed_before_a_crash_is_not_inserted_again(database, tmp_path, monkeypatch):
+    batch = [item("a.pdf", "a.json", "Lesson A"), item("b.pdf", "b.json", "Lesson B")]
+
+    def crash(self, records):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(IngestState, "record", crash)
+        with pytest.raises(KeyboardInterrupt):
+            insert_batch(batch, IngestState(tmp_path / "state.jsonl"))
+    assert len(database.lessons) == 2
+
+    state = IngestState(tmp_path / "state.jsonl")
+    assert insert_batch(batch, state) == 2
+
+    assert len(database.lessons) == 2
+    assert {path: record['lessonId'] for path, record in state.done.items()} == {"a.pdf": 1, "b.pdf": 2}
+
+def test_identical_uploads_for_different_lessons_are_both_inserted(database, tmp_path):
+    state = IngestState(tmp_path / "state.jsonl")
+    insert_batch([item("a.pdf", "shared.json", "Lesson A")], state)
+
+    insert_batch([item("copy.pdf", "shared.json", "Lesson A", course_id=2)], state)
+
+    assert [lesson['course_id'] for lesson in database.lessons] == [1, 2]
+    assert IngestState(tmp_path / "state.jsonl").is_done("copy.pdf")
@@ -0,0 +1,44 @@
+import threading
+import time
+
+import pytest
+
+import chatbot
+
+def test_migrations_run_once_across_threads(monkeypatch):
+    calls = []
+
+    def slow_migrate(connection):
+        calls.append(connection)
+        time.sleep(0.05)
+
+    monkeypatch.setattr(chatbot, "migrate", slow_migrate)
+    monkeypatch.setattr(chatbot, "_schema_ready", False)
+
+    threads = [threading.Thread(target=chatbot.ensure_schema, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    chatbot.ensure_schema("later connection")
+    assert len(calls) == 1
+
+def test_failed_migration_is_retried(monkeypatch):
+    attempts = []
+
+    def failing_migrate(connection):
+        attempts.append(connection)
+        if len(attempts) == 1:
+            raise RuntimeError("database is down")
+
+    monkeypatch.setattr(chatbot, "migrate", failing_migrate)
+    monkeypatch.setattr(chatbot, "_schema_ready", False)
+
+    with pytest.raises(RuntimeError):
+        chatbot.ensure_schema("first")
+    chatbot.ensure_schema("second")
+
+    assert attempts == ["first", "second"]
+    assert chatbot._schema_ready
@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+class FakeConnection:
+    def __init__(self):
+        self.open = True
+        self.broken = False
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        if self.broken:
+            raise ConnectionError('server has gone away')
+
+    def close(self):
+        self.open = False
+        self.closed = True
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        connection = FakeConnection()
+        created.append(connection)
+        return connection
+
+    return ConnectionPool(connect, **kwargs), created
+
+def test_released_connection_is_reused():
+    pool, created = make_pool(max_size=2)
+    connection = pool.acquire()
+    pool.release(connection)
+
+    assert pool.acquire() is connection
+    assert len(created) == 1
+
+def test_waits_for_a_free_connection_then_times_out():
+    pool, _ = make_pool(max_size=1, timeout=0.05)
+    pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+def test_waiter_gets_the_released_connection():
+    pool, _ = make_pool(max_size=1, timeout=5)
+    connection = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+
+    pool.release(connection)
+    waiter.join(5)
+    assert acquired == [connection]
+
+def test_broken_connection_is_replaced():
+    pool, created = make_pool(max_size=1)
+    connection = pool.acquire()
+    connection.broken = True
+    pool.release(connection)
+
+    replacement = pool.acquire()
+    assert replacement is not connection
+    assert connection.closed
+    assert pool.stats()['broken'] == 1
+    assert len(created) == 2
+
+def test_old_connection_is_recycled():
+    pool, _ = make_pool(max_size=1, max_age=0)
+    connection = pool.acquire()
+    pool.release(connection)
+
+    assert pool.acquire() is not connection
+    assert pool.stats()['recycled'] == 1
+
+def test_discarded_connection_frees_its_slot():
+    pool, _ = make_pool(max_size=1, timeout=0.05)
+    connection = pool.acquire()
+    pool.release(connection, discard=True)
+
+    assert connection.closed
+    assert pool.acquire() is not connection
+
+def test_failed_connect_frees_its_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('refused')
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.acquire() is not None
+
+def test_close_all_closes_idle_connections():
+    pool, _ = make_pool(max_size=2)
+    connection = pool.acquire()
+    pool.release(connection)
+
+    pool.close_all()
+    assert connection.closed
+    assert pool.stats()['size'] == 0
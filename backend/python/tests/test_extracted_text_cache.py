@@ -0,0 +1,75 @@
+import os
+import sys
+
+from cache import ExtractedTextCache
+
+def test_hit_after_load(tmp_path):
+    path = tmp_path / 'lesson.txt'
+    path.write_text('first version')
+    cache = ExtractedTextCache()
+    calls = []
+
+    def loader(file_path):
+        calls.append(file_path)
+        return open(file_path).read()
+
+    assert cache.get_or_load(str(path), loader) == 'first version'
+    assert cache.get_or_load(str(path), loader) == 'first version'
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+def test_edited_file_is_a_miss(tmp_path):
+    path = tmp_path / 'lesson.txt'
+    path.write_text('first version')
+    cache = ExtractedTextCache()
+    cache.get_or_load(str(path), lambda p: open(p).read())
+
+    path.write_text('second, longer version')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert cache.get(str(path)) is None
+    assert cache.get_or_load(str(path), lambda p: open(p).read()) == 'second, longer version'
+
+def test_loader_error_is_not_cached(tmp_path):
+    path = tmp_path / 'lesson.txt'
+    path.write_text('text')
+    cache = ExtractedTextCache()
+
+    def failing(file_path):
+        raise ValueError('broken PDF')
+
+    try:
+        cache.get_or_load(str(path), failing)
+    except ValueError:
+        pass
+    assert cache.stats()['entries'] == 0
+
+def test_evicts_least_recently_used_over_max_bytes(tmp_path):
+    paths = []
+    for name in ('a', 'b', 'c'):
+        path = tmp_path / f'{name}.txt'
+        path.write_text(name)
+        paths.append(str(path))
+    text = 'x' * 1000
+    # Room for two of the three texts
+    cache = ExtractedTextCache(max_bytes=sys.getsizeof(text) + sys.getsizeof(text + 'b'))
+
+    cache.put(ExtractedTextCache.make_key(paths[0]), text)
+    cache.put(ExtractedTextCache.make_key(paths[1]), text + 'b')
+    cache.get(paths[0])  # a is now more recently used than b
+    cache.put(ExtractedTextCache.make_key(paths[2]), text + 'c')
+
+    assert cache.get(paths[0]) == text
+    assert cache.get(paths[1]) is None
+    assert cache.stats()['evictions'] == 1
+
+def test_invalidate(tmp_path):
+    path = tmp_path / 'lesson.txt'
+    path.write_text('text')
+    cache = ExtractedTextCache()
+    cache.get_or_load(str(path), lambda p: 'text')
+
+    cache.invalidate(str(path))
+    assert cache.get(str(path)) is None
+    assert cache.stats()['bytes'] == 0
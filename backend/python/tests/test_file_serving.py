@@ -0,0 +1,160 @@
+import asyncio
+import os
+
+import pytest
+
+from file_serving import (
+    FileRangeResponse, RangeNotSatisfiable, file_etag, file_not_modified, if_range_matches,
+    last_modified, parse_byte_range
+)
+
+SIZE = 1000
+
+def test_no_range_sends_the_whole_file():
+    assert parse_byte_range(None, SIZE) is None
+    assert parse_byte_range("", SIZE) is None
+
+def test_closed_range():
+    assert parse_byte_range("bytes=0-99", SIZE) == (0, 99)
+    assert parse_byte_range("bytes=500-500", SIZE) == (500, 500)
+
+def test_range_past_the_end_is_clamped():
+    assert parse_byte_range("bytes=900-5000", SIZE) == (900, 999)
+
+def test_open_ended_range():
+    assert parse_byte_range("bytes=990-", SIZE) == (990, 999)
+    assert parse_byte_range("bytes=0-", SIZE) == (0, 999)
+
+def test_suffix_range():
+    assert parse_byte_range("bytes=-100", SIZE) == (900, 999)
+    # A suffix longer than the file means the whole file
+    assert parse_byte_range("bytes=-5000", SIZE) == (0, 999)
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1100", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range(header, SIZE)
+
+def test_unsatisfiable_range_on_an_empty_file():
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range("bytes=0-", 0)
+
+@pytest.mark.parametrize("header", [
+    "bytes=0-10,20-30",
+    "items=0-10",
+    "bytes=abc-def",
+    "bytes=10",
+    "bytes=50-10",
+])
+def test_ignored_ranges(header):
+    assert parse_byte_range(header, SIZE) is None
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "lesson.pdf"
+    path.write_bytes(bytes(range(256)) * 4)
+    return path
+
+def test_if_range(pdf):
+    stat_result = os.stat(pdf)
+    etag = file_etag(stat_result)
+
+    assert if_range_matches(None, stat_result, etag)
+    assert if_range_matches(etag, stat_result, etag)
+    assert if_range_matches(last_modified(stat_result), stat_result, etag)
+    assert not if_range_matches('"stale"', stat_result, etag)
+    # If-Range needs a strong validator
+    assert not if_range_matches(f"W/{etag}", stat_result, etag)
+    assert not if_range_matches("Thu, 01 Jan 1970 00:00:00 GMT", stat_result, etag)
+
+def test_file_not_modified(pdf):
+    stat_result = os.stat(pdf)
+    etag = file_etag(stat_result)
+
+    assert file_not_modified(etag, None, stat_result, etag)
+    assert file_not_modified(f'"other", W/{etag}', None, stat_result, etag)
+    assert file_not_modified(None, last_modified(stat_result), stat_result, etag)
+    assert not file_not_modified(None, "Thu, 01 Jan 1970 00:00:00 GMT", stat_result, etag)
+    assert not file_not_modified(None, "not a date", stat_result, etag)
+    # If-None-Match takes precedence over If-Modified-Since
+    assert not file_not_modified('"other"', last_modified(stat_result), stat_result, etag)
+    assert not file_not_modified(None, None, stat_result, etag)
+
+def send_response(response, extensions=None):
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "extensions": extensions or {}}
+    asyncio.run(response(scope, receive, send))
+    headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    return messages[0]["status"], headers, messages[1:]
+
+def body_of(messages):
+    assert messages[-1].get("more_body", False) is False
+    return b"".join(message["body"] for message in messages)
+
+def test_full_response(pdf):
+    stat_result = os.stat(pdf)
+
+    status, headers, messages = send_response(FileRangeResponse(pdf, stat_result, filename="lesson_1.pdf"))
+
+    assert status == 200
+    assert headers["content-length"] == "1024"
+    assert headers["accept-ranges"] == "bytes"
+    assert headers["etag"] == file_etag(stat_result)
+    assert headers["content-disposition"] == 'attachment; filename="lesson_1.pdf"'
+    assert "content-range" not in headers
+    assert body_of(messages) == pdf.read_bytes()
+
+def test_partial_response(pdf):
+    stat_result = os.stat(pdf)
+
+    status, headers, messages = send_response(FileRangeResponse(pdf, stat_result, byte_range=(1000, 1023)))
+
+    assert status == 206
+    assert headers["content-range"] == "bytes 1000-1023/1024"
+    assert headers["content-length"] == "24"
+    assert body_of(messages) == pdf.read_bytes()[1000:]
+
+def test_range_covering_the_whole_file_is_a_full_response(pdf):
+    status, headers, _ = send_response(FileRangeResponse(pdf, os.stat(pdf), byte_range=(0, 1023)))
+
+    assert status == 200
+    assert "content-range" not in headers
+
+def test_head_response_has_headers_but_no_body(pdf):
+    status, headers, messages = send_response(FileRangeResponse(pdf, os.stat(pdf), byte_range=(0, 9), method="HEAD"))
+
+    assert status == 206
+    assert headers["content-length"] == "10"
+    assert body_of(messages) == b""
+
+def test_chunked_response(pdf, monkeypatch):
+    monkeypatch.setattr("file_serving.CHUNK_SIZE", 100)
+
+    _, _, messages = send_response(FileRangeResponse(pdf, os.stat(pdf), byte_range=(10, 519)))
+
+    assert len(messages) == 6
+    assert body_of(messages) == pdf.read_bytes()[10:520]
+
+def test_zerocopysend_is_used_when_offered(pdf):
+    _, _, messages = send_response(
+        FileRangeResponse(pdf, os.stat(pdf), byte_range=(10, 19)),
+        extensions={"http.response.zerocopysend": {}}
+    )
+
+    assert [(m["type"], m["offset"], m["count"]) for m in messages] == [("http.response.zerocopysend", 10, 10)]
+
+def test_pathsend_is_only_used_for_whole_files(pdf):
+    extensions = {"http.response.pathsend": {}}
+
+    _, _, whole = send_response(FileRangeResponse(pdf, os.stat(pdf)), extensions)
+    _, _, partial = send_response(FileRangeResponse(pdf, os.stat(pdf), byte_range=(0, 9)), extensions)
+
+    assert whole == [{"type": "http.response.pathsend", "path": str(pdf)}]
+    assert body_of(partial) == pdf.read_bytes()[:10]
@@ -0,0 +1,109 @@
+import json
+
+from ingest_manifest import IngestManifest, hash_file
+
+def write_pdf(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+def write_artifact(path, digest):
+    path.write_text(json.dumps({'content_hash': digest, 'full_text': 'text of ' + digest}), encoding='utf-8')
+    return str(path)
+
+def test_unchanged_file_reuses_its_artifact(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json')
+    pdf = write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    digest = hash_file(pdf)
+    manifest.record(pdf, digest, write_artifact(tmp_path / 'a.json', digest))
+
+    assert manifest.is_unchanged(pdf)
+    assert manifest.artifact_for(pdf) == (digest, str(tmp_path / 'a.json'))
+
+def test_identical_copy_shares_the_artifact(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json')
+    pdf = write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    digest = hash_file(pdf)
+    manifest.record(pdf, digest, write_artifact(tmp_path / 'a.json', digest))
+
+    copy = write_pdf(tmp_path / 'copy.pdf', b'%PDF content X')
+    assert manifest.artifact_for(copy) == (digest, str(tmp_path / 'a.json'))
+
+def test_edited_file_does_not_leave_a_stale_artifact(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json')
+    json_path = str(tmp_path / 'a.json')
+    pdf = write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    old_digest = hash_file(pdf)
+    manifest.record(pdf, old_digest, write_artifact(tmp_path / 'a.json', old_digest))
+
+    # a.pdf is edited in place and its new content is written over the same artifact
+    write_pdf(tmp_path / 'a.pdf', b'%PDF content Y, edited')
+    new_digest = hash_file(pdf)
+    manifest.record(pdf, new_digest, write_artifact(tmp_path / 'a.json', new_digest))
+
+    assert old_digest not in manifest.artifacts
+    assert manifest.artifact_for(pdf) == (new_digest, json_path)
+    # Another upload of the old content must be extracted again, not served the edited text
+    other = write_pdf(tmp_path / 'b.pdf', b'%PDF content X')
+    assert manifest.artifact_for(other) == (old_digest, None)
+    # So must a revert of a.pdf
+    write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    assert manifest.artifact_for(pdf) == (old_digest, None)
+
+def test_artifact_with_another_content_hash_is_not_reused(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json')
+    pdf = write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    digest = hash_file(pdf)
+    manifest.record(pdf, digest, write_artifact(tmp_path / 'a.json', 'some other hash'))
+
+    assert manifest.artifact_for(pdf) == (digest, None)
+
+def test_missing_artifact_is_not_reused(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json')
+    pdf = write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    digest = hash_file(pdf)
+    manifest.record(pdf, digest, str(tmp_path / 'missing.json'))
+
+    assert not manifest.is_unchanged(pdf)
+    assert manifest.artifact_for(pdf) == (digest, None)
+
+def test_manifest_is_reloaded_from_disk(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json')
+    pdf = write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    digest = hash_file(pdf)
+    manifest.record(pdf, digest, write_artifact(tmp_path / 'a.json', digest))
+    manifest.flush()
+
+    reloaded = IngestManifest(tmp_path / 'manifest.json')
+    assert reloaded.is_unchanged(pdf)
+    assert reloaded.artifact_for(pdf) == (digest, str(tmp_path / 'a.json'))
+
+def test_records_are_saved_in_batches(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json', save_batch_size=2)
+    pdfs = [write_pdf(tmp_path / f'{name}.pdf', name.encode()) for name in ('a', 'b', 'c')]
+    for pdf in pdfs:
+        digest = hash_file(pdf)
+        manifest.record(pdf, digest, write_artifact(tmp_path / f'{digest}.json', digest))
+        if pdf == pdfs[0]:
+            assert not (tmp_path / 'manifest.json').exists()
+
+    assert len(IngestManifest(tmp_path / 'manifest.json').files) == 2
+    manifest.flush()
+    assert len(IngestManifest(tmp_path / 'manifest.json').files) == 3
+
+def test_is_shared_only_counts_other_files(tmp_path):
+    manifest = IngestManifest(tmp_path / 'manifest.json')
+    json_path = str(tmp_path / 'a.json')
+    pdf = write_pdf(tmp_path / 'a.pdf', b'%PDF content X')
+    digest = hash_file(pdf)
+    manifest.record(pdf, digest, write_artifact(tmp_path / 'a.json', digest))
+    assert not manifest.is_shared(json_path, pdf)
+
+    copy = write_pdf(tmp_path / 'copy.pdf', b'%PDF content X')
+    manifest.record(copy, digest, json_path)
+    assert manifest.is_shared(json_path, pdf)
+
+    # Once the copy holds other content, a.json belongs to a.pdf alone again
+    write_pdf(tmp_path / 'copy.pdf', b'%PDF content Z, different')
+    other_digest = hash_file(copy)
+    manifest.record(copy, other_digest, write_artifact(tmp_path / 'copy.json', other_digest))
+    assert not manifest.is_shared(json_path, pdf)
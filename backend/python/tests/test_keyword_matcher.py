@@ -0,0 +1,48 @@
+import random
+
+from keyword_matcher import KeywordClassifier, KeywordMatcher, get_keyword_matcher
+
+def test_find_matches_substring_semantics():
+    keywords = ['he', 'she', 'his', 'hers', 'neural network', 'network']
+    matcher = KeywordMatcher(keywords)
+
+    assert matcher.find('ushers') == {'he', 'she', 'hers'}
+    assert matcher.find('a neural network') == {'neural network', 'network'}
+    assert matcher.find('') == set()
+
+def test_find_agrees_with_naive_matching():
+    rng = random.Random(7)
+    keywords = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(30)]
+    matcher = KeywordMatcher(keywords)
+    for _ in range(200):
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 20)))
+        assert matcher.find(text) == {keyword for keyword in keywords if keyword in text}
+
+def test_find_in_order():
+    matcher = KeywordMatcher(['dropout', 'cnn', 'relu'])
+
+    assert matcher.find_in_order('relu after a cnn layer') == ['cnn', 'relu']
+    assert matcher.find_in_order('nothing here') == []
+
+def test_empty_and_duplicate_keywords_are_ignored():
+    matcher = KeywordMatcher(['', 'cnn', 'cnn'])
+
+    assert matcher.keywords == ['cnn']
+
+def test_classifier_returns_labels_in_priority_order():
+    classifier = KeywordClassifier({
+        'definition': ['what is', 'define'],
+        'comparison': ['difference', 'vs'],
+        'example': ['example']
+    })
+
+    assert classifier.classify('what is the difference, with an example?') == ['definition', 'comparison', 'example']
+    assert classifier.classify('tell me more') == []
+
+def test_keyword_shared_by_two_labels():
+    classifier = KeywordClassifier({'explanation': ['explain'], 'definition': ['explain what']})
+
+    assert classifier.classify('explain what a cnn is') == ['explanation', 'definition']
+
+def test_get_keyword_matcher_compiles_once():
+    assert get_keyword_matcher(['a', 'b']) is get_keyword_matcher(['a', 'b'])
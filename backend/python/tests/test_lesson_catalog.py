@@ -0,0 +1,101 @@
+import json
+
+from lesson_catalog import CatalogVersion, LessonTreeCache, build_lesson_tree
+
+class FakeCatalogCursor:
+    """Answers the catalog queries from in-memory courses and lessons"""
+
+    def __init__(self, courses, lessons):
+        self.courses = courses
+        self.lessons = lessons
+        self.queries = []
+        self.rows = []
+
+    def execute(self, query, params=()):
+        if "CRC32" in query:
+            self.queries.append("version")
+            self.rows = [{"courses": repr(self.courses), "lessons": repr(self.lessons)}]
+        elif "FROM courses" in query:
+            self.queries.append("courses")
+            self.rows = [{"id": course_id, "name": name} for course_id, name in self.courses]
+        else:
+            self.queries.append("lessons")
+            self.rows = list(self.lessons)
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+def lesson(lesson_id, course_id, week_id, day_id):
+    return {
+        "id": lesson_id, "lesson_name": f"Lesson {lesson_id}", "course_id": course_id,
+        "week_id": week_id, "week_name": f"Week {week_id}",
+        "day_id": day_id, "day_name": f"Day {day_id}"
+    }
+
+def make_cursor():
+    return FakeCatalogCursor(
+        [(1, "Deep Learning"), (2, "Empty Course")],
+        [lesson(1, 1, 1, 1), lesson(2, 1, 1, 1), lesson(3, 1, 1, 2), lesson(4, 1, 2, 1), lesson(5, 9, 1, 1)]
+    )
+
+def test_build_lesson_tree():
+    tree = build_lesson_tree(make_cursor())
+
+    assert [course["name"] for course in tree] == ["Deep Learning", "Empty Course"]
+    weeks = tree[0]["weeks"]
+    assert [week["id"] for week in weeks] == [1, 2]
+    assert [day["id"] for day in weeks[0]["days"]] == [1, 2]
+    assert [entry["id"] for entry in weeks[0]["days"][0]["lessons"]] == [1, 2]
+    # Lessons of unknown courses are left out
+    assert tree[1]["weeks"] == []
+
+def test_catalog_version_is_read_once_per_interval():
+    cursor = make_cursor()
+    catalog = CatalogVersion(check_interval=60)
+
+    assert catalog.fresh() is None
+    version = catalog.get(cursor)
+
+    assert catalog.get(cursor) == catalog.fresh() == version
+    assert cursor.queries == ["version"]
+
+    catalog.invalidate()
+    assert catalog.fresh() is None
+    assert catalog.get(cursor) == version
+    assert cursor.queries == ["version", "version"]
+
+def test_tree_is_rebuilt_only_when_the_catalog_changes():
+    cursor = make_cursor()
+    cache = LessonTreeCache(CatalogVersion(check_interval=0))
+
+    etag, body = cache.get(cursor)
+    assert json.loads(body)["data"] == build_lesson_tree(make_cursor())
+    assert cache.get(cursor) == (etag, body)
+    assert cache.rebuilds == 1
+
+    cursor.lessons.append(lesson(6, 2, 1, 1))
+    new_etag, new_body = cache.get(cursor)
+
+    assert new_etag != etag
+    assert json.loads(new_body)["data"][1]["weeks"][0]["days"][0]["lessons"] == [{"id": 6, "lesson_name": "Lesson 6"}]
+    assert cache.rebuilds == 2
+
+def test_fresh_tree_is_served_from_memory():
+    cursor = make_cursor()
+    cache = LessonTreeCache(CatalogVersion(check_interval=60))
+
+    assert cache.fresh() is None
+    expected = cache.get(cursor)
+    queries = len(cursor.queries)
+
+    assert cache.fresh() == expected
+    assert len(cursor.queries) == queries
+
+def test_same_catalog_gives_the_same_etag_in_every_process():
+    first = LessonTreeCache(CatalogVersion()).get(make_cursor())
+    second = LessonTreeCache(CatalogVersion()).get(make_cursor())
+
+    assert first == second
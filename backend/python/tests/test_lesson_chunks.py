@@ -0,0 +1,39 @@
+from lesson_index import LessonChunks, estimate_tokens, get_lesson_chunks
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+def test_chunks_overlap():
+    chunks = LessonChunks(words('w', 10), chunk_words=4, overlap_words=2)
+
+    assert chunks.chunks == ['w0 w1 w2 w3', 'w2 w3 w4 w5', 'w4 w5 w6 w7', 'w6 w7 w8 w9']
+
+def test_select_returns_relevant_chunks_in_lesson_order():
+    text = " ".join([words('intro', 20), "backpropagation gradient " * 5, words('filler', 40), "dropout " * 10])
+    chunks = LessonChunks(text, chunk_words=20, overlap_words=0)
+
+    selected = chunks.select(['dropout', 'backpropagation'], token_budget=10_000)
+    assert len(selected) == 2
+    assert 'backpropagation' in selected[0] and 'dropout' in selected[1]
+
+def test_select_respects_the_token_budget():
+    chunks = LessonChunks("dropout " * 100, chunk_words=10, overlap_words=0)
+    budget = 3 * estimate_tokens(chunks.chunks[0])
+
+    assert len(chunks.select(['dropout'], budget)) == 3
+
+def test_select_falls_back_to_the_opening_chunks():
+    chunks = LessonChunks(words('w', 30), chunk_words=10, overlap_words=0)
+
+    assert chunks.select(['zebra'], estimate_tokens(chunks.chunks[0])) == [chunks.chunks[0]]
+
+def test_select_always_returns_one_chunk():
+    chunks = LessonChunks(words('w', 30), chunk_words=30, overlap_words=0)
+
+    assert chunks.select(['w1'], token_budget=1) == [chunks.chunks[0]]
+
+def test_chunks_are_built_once_per_text():
+    text = words('cached', 50)
+
+    assert get_lesson_chunks(text, 10, 2) is get_lesson_chunks(text, 10, 2)
+    assert get_lesson_chunks(text, 10, 2) is not get_lesson_chunks(text, 20, 2)
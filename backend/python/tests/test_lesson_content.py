@@ -0,0 +1,55 @@
+import hashlib
+import json
+
+from lesson_content import load_file_content, make_summary, pack_content, read_content, save_lesson_content, unpack_content
+
+SECTIONS = [{'title': 'Introduction', 'content': 'Neural networks learn.\n'}]
+QA_PAIRS = [{'question': 'What is a neuron?', 'answer': 'A unit that sums weighted inputs.'}]
+
+class RecordingCursor:
+    def __init__(self):
+        self.params = None
+
+    def execute(self, query, params=()):
+        self.params = params
+
+def test_pack_round_trip():
+    text = "Réseaux de neurones – 深度学习 " * 50
+
+    body = pack_content(text, SECTIONS, QA_PAIRS)
+
+    assert isinstance(body, bytes) and len(body) < len(text.encode('utf-8'))
+    assert unpack_content(body) == {'text': text, 'sections': SECTIONS, 'qa_pairs': QA_PAIRS}
+
+def test_read_content_takes_the_summary_from_its_column():
+    row = {'content_summary': 'About networks', 'content_body': pack_content("text", SECTIONS)}
+
+    assert read_content(row) == {'text': 'text', 'sections': SECTIONS, 'qa_pairs': [], 'summary': 'About networks'}
+
+def test_read_content_without_stored_content():
+    assert read_content(None) is None
+    assert read_content({'content_summary': None, 'content_body': None}) is None
+
+def test_save_lesson_content_defaults_the_summary():
+    cursor = RecordingCursor()
+    text = "x" * 600
+
+    save_lesson_content(cursor, 7, text)
+
+    lesson_id, content_hash, summary, body, text_length = cursor.params
+    assert (lesson_id, text_length) == (7, 600)
+    assert content_hash == hashlib.sha256(text.encode('utf-8')).hexdigest()
+    assert summary == make_summary(text) == "x" * 500 + "..."
+    assert unpack_content(body)['text'] == text
+
+def test_load_file_content_from_a_processed_artifact(tmp_path):
+    path = tmp_path / "lesson.json"
+    path.write_text(json.dumps({'full_text': 'Text', 'summary': 'Sum', 'sections': SECTIONS, 'qa_pairs': QA_PAIRS}))
+
+    assert load_file_content(str(path)) == {'text': 'Text', 'summary': 'Sum', 'sections': SECTIONS, 'qa_pairs': QA_PAIRS}
+
+def test_load_file_content_from_a_text_file(tmp_path):
+    path = tmp_path / "lesson.txt"
+    path.write_text("Plain lesson text", encoding='utf-8')
+
+    assert load_file_content(str(path)) == {'text': 'Plain lesson text', 'summary': 'Plain lesson text', 'sections': [], 'qa_pairs': []}
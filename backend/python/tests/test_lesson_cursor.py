@@ -0,0 +1,30 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from main import decode_lesson_cursor, encode_lesson_cursor
+
+def encode(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+def test_cursor_round_trip():
+    cursor = encode_lesson_cursor({"course_id": 2, "week_id": 3, "id": 41, "lesson_name": "Ignored"})
+
+    assert decode_lesson_cursor(cursor) == (2, 3, 41)
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode(5),
+    encode(None),
+    encode({"course_id": 1}),
+    encode([1, 2]),
+    encode([1, 2, "3"]),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_invalid_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_lesson_cursor(cursor)
+
+    assert error.value.status_code == 400
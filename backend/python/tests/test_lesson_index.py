@@ -0,0 +1,57 @@
+from lesson_index import BM25Index, LessonIndex, normalize_token, tokenize
+
+LESSON = (
+    "Deep learning uses neural networks with many layers. "
+    "Backpropagation computes the gradient of the loss for every weight. "
+    "Gradient descent updates the weights to reduce the loss. "
+    "Dropout randomly disables neurons during training. "
+    "Ok."
+)
+
+def test_tokenize_normalizes_plurals():
+    assert tokenize("Neural Networks, and weights!") == ['neural', 'network', 'and', 'weight']
+    assert normalize_token('class') == 'class'
+
+def test_bm25_ranks_documents_with_rarer_terms_higher():
+    index = BM25Index(enumerate(["the cat sat", "the dog sat", "the cat and the dog"]))
+
+    best = index.top(['dog'], 3)
+    assert [doc_id for doc_id, _ in best] == [1, 2]
+    assert index.score(['the']) and not index.score(['zebra'])
+
+def test_bm25_ties_keep_document_order():
+    index = BM25Index(enumerate(["alpha beta", "alpha beta", "alpha beta"]))
+
+    assert [doc_id for doc_id, _ in index.top(['alpha'], 2)] == [0, 1]
+
+def test_top_sentences_for_question_terms():
+    index = LessonIndex(LESSON)
+
+    assert index.top_sentences(['backpropagation'], k=1) == [
+        "Backpropagation computes the gradient of the loss for every weight."
+    ]
+    # Short sentences are never returned
+    assert "Ok." not in index.top_sentences(['ok'], k=5)
+
+def test_falls_back_to_topic_sentences_without_matching_terms():
+    index = LessonIndex(LESSON, topics=['dropout', 'neural networks'])
+
+    assert index.top_sentences(['zebra'], k=2) == [
+        "Deep learning uses neural networks with many layers.",
+        "Dropout randomly disables neurons during training.",
+    ]
+
+def test_topics_listed_more_than_once_weigh_more():
+    index = LessonIndex(LESSON, topics=['dropout', 'neural networks', 'dropout'])
+
+    assert index.top_sentences(['zebra'], k=2) == [
+        "Dropout randomly disables neurons during training.",
+        "Deep learning uses neural networks with many layers.",
+    ]
+
+def test_index_from_existing_sentence_split():
+    sentences = ["Gradient descent updates the weights.", "Dropout disables neurons."]
+    index = LessonIndex(sentences=sentences)
+
+    assert index.sentences is sentences
+    assert index.top_sentences(['dropout'], k=1) == ["Dropout disables neurons."]
@@ -0,0 +1,104 @@
+import os
+
+import fitz
+import pytest
+
+import main
+from lesson_content import pack_content
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        if "FROM lessons l" in query:
+            self.database.queries.append("catalog")
+            self.row = self.database.catalog_row
+        else:
+            self.database.queries.append("content")
+            self.row = self.database.content_row
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+class FakeDatabase:
+    def __init__(self, catalog_row, content_row=None):
+        self.catalog_row = catalog_row
+        self.content_row = content_row
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+def catalog_row(lesson_id, file_path=None, content_hash=None):
+    return {
+        "id": lesson_id, "lesson_name": "Neural Networks", "file_path": file_path,
+        "course_name": "Deep Learning", "week_name": "Week 1", "day_name": "Monday",
+        "content_hash": content_hash
+    }
+
+@pytest.fixture
+def database(monkeypatch):
+    databases = []
+
+    def use(database):
+        databases.append(database)
+        return database
+
+    monkeypatch.setattr(main, "get_db_connection", lambda: databases[-1])
+    monkeypatch.setattr(main, "release_db_connection", lambda connection: None)
+    return use
+
+def test_stored_content_is_only_fetched_on_a_cache_miss(database):
+    db = database(FakeDatabase(
+        catalog_row(9101, content_hash="hash-9101"),
+        {"content_summary": "About networks", "content_body": pack_content("Stored lesson text")}
+    ))
+
+    first = main.get_lesson_info("9101")
+    second = main.get_lesson_info("9101")
+
+    assert first["content"] == second["content"] == "Stored lesson text"
+    assert db.queries == ["catalog", "content", "catalog"]
+
+def test_changed_content_hash_reads_the_new_body(database):
+    db = database(FakeDatabase(
+        catalog_row(9102, content_hash="hash-a"),
+        {"content_summary": "", "content_body": pack_content("First version")}
+    ))
+    assert main.get_lesson_info("9102")["content"] == "First version"
+
+    db.catalog_row = catalog_row(9102, content_hash="hash-b")
+    db.content_row = {"content_summary": "", "content_body": pack_content("Second version")}
+
+    assert main.get_lesson_info("9102")["content"] == "Second version"
+
+def write_pdf(path, text, mtime):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 72), text)
+    doc.save(path)
+    doc.close()
+    os.utime(path, (mtime, mtime))
+
+def test_lesson_without_stored_content_follows_edits_of_its_file(database, tmp_path):
+    path = str(tmp_path / "lesson.pdf")
+    write_pdf(path, "Original lesson text", 1_000_000)
+    db = database(FakeDatabase(catalog_row(9103, file_path=path)))
+
+    assert "Original lesson text" in main.get_lesson_info("9103")["content"]
+
+    write_pdf(path, "Edited lesson text", 2_000_000)
+
+    assert "Edited lesson text" in main.get_lesson_info("9103")["content"]
+    # Text read from a file is not stored, so nothing but the catalog is queried
+    assert db.queries == ["catalog", "catalog"]
@@ -0,0 +1,148 @@
+import json
+
+import lesson_index
+import lesson_profile
+from lesson_index import LessonIndex
+from lesson_profile import PROFILE_VERSION, LessonProfile, content_hash, get_lesson_profile
+
+TEXT = "Deep Learning uses neural networks. Backpropagation computes gradients. Dropout reduces overfitting."
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        self.database.queries.append(query.split()[0].upper())
+        if query.lstrip().upper().startswith("SELECT"):
+            profile = self.database.profiles.get(params[0])
+            self.row = {"profile": profile} if profile else None
+        else:
+            lesson_id, _, profile = params
+            self.database.profiles[lesson_id] = profile
+
+    def fetchone(self):
+        return self.row
+
+class FakeDatabase:
+    def __init__(self):
+        self.profiles = {}
+        self.queries = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+class ImmediateExecutor:
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        fn(*args)
+
+def test_build_finds_topics_and_sentences():
+    profile = LessonProfile.build(TEXT)
+
+    assert profile.content_hash == content_hash(TEXT)
+    assert 'neural networks' in profile.topics and 'dropout' in profile.topics
+    assert len(profile.sentences) == 3
+    assert profile.topic_matcher.find('what is dropout?') == {'dropout'}
+    assert profile.index.top_sentences(['gradients'], k=1) == ["Backpropagation computes gradients."]
+
+def test_json_round_trip():
+    profile = LessonProfile.build(TEXT)
+    loaded = LessonProfile.from_json(profile.to_json())
+
+    assert (loaded.content_hash, loaded.topics, loaded.sentences) == (profile.content_hash, profile.topics, profile.sentences)
+    assert loaded.term_stats == profile.term_stats
+
+def test_term_stats_hold_the_frequencies_of_each_sentence():
+    profile = LessonProfile.build(TEXT + " Ok. Dropout, dropout everywhere.")
+
+    assert profile.term_stats[1] == {'backpropagation': 1, 'compute': 1, 'gradient': 1}
+    assert profile.term_stats[3] == {}  # too short to be an answer
+    assert profile.term_stats[4] == {'dropout': 2, 'everywhere': 1}
+
+def test_stored_profile_is_indexed_without_tokenizing_again(monkeypatch):
+    stored = LessonProfile.build(TEXT).to_json()
+
+    def fail(text):
+        raise AssertionError("tokenized a stored profile")
+
+    monkeypatch.setattr(lesson_index, "term_frequencies", fail)
+    index = LessonProfile.from_json(stored).index
+
+    monkeypatch.undo()
+    expected = LessonIndex(TEXT)
+    for terms in (['gradients'], ['dropout', 'overfitting'], ['neural', 'network']):
+        assert index.top_sentences(terms, k=2) == expected.top_sentences(terms, k=2)
+
+def test_rebuild_tokenizes_only_new_sentences(monkeypatch):
+    previous = LessonProfile.build(TEXT)
+    tokenized = []
+    frequencies = lesson_profile.term_frequencies
+
+    def counting(sentence):
+        tokenized.append(sentence)
+        return frequencies(sentence)
+
+    monkeypatch.setattr(lesson_profile, "term_frequencies", counting)
+    edited = TEXT + " Batch normalization rescales the activations."
+    profile = LessonProfile.build(edited, previous=previous)
+
+    assert tokenized == ["Batch normalization rescales the activations."]
+    monkeypatch.undo()
+    assert profile.term_stats == LessonProfile.build(edited).term_stats
+
+def test_profile_from_another_version_is_ignored():
+    data = json.loads(LessonProfile.build(TEXT).to_json())
+    data['version'] = PROFILE_VERSION - 1
+
+    assert LessonProfile.from_json(json.dumps(data)) is None
+
+def test_missing_profile_is_built_and_stored_in_the_background():
+    database = FakeDatabase()
+    executor = ImmediateExecutor()
+    text = TEXT + " Missing profile."
+
+    profile = get_lesson_profile(text, 1, lambda: database, executor=executor)
+
+    assert executor.submitted == 1
+    assert LessonProfile.from_json(database.profiles[1]).content_hash == profile.content_hash
+
+def test_stored_profile_is_read_without_writing():
+    database = FakeDatabase()
+    text = TEXT + " Stored profile."
+    database.profiles[2] = LessonProfile.build(text).to_json()
+    executor = ImmediateExecutor()
+
+    get_lesson_profile(text, 2, lambda: database, executor=executor)
+
+    assert database.queries == ['SELECT']
+    assert executor.submitted == 0 and database.commits == 0
+
+def test_lessons_with_the_same_text_get_their_own_profiles():
+    database = FakeDatabase()
+    executor = ImmediateExecutor()
+    text = TEXT + " Shared text."
+
+    first = get_lesson_profile(text, 3, lambda: database, executor=executor)
+    second = get_lesson_profile(text, 4, lambda: database, executor=executor)
+
+    assert set(database.profiles) == {3, 4}
+    assert first.content_hash == second.content_hash
+    # Each lesson's profile is loaded once per process
+    assert get_lesson_profile(text, 3, lambda: database, executor=executor) is first
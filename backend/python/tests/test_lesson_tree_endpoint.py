@@ -0,0 +1,42 @@
+import pymysql
+from fastapi.testclient import TestClient
+
+import main
+from lesson_catalog import TREE_LESSONS_QUERY
+
+class FailingCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        raise pymysql.err.OperationalError(1054, "Unknown column 'd.name' in 'field list'")
+
+class FailingConnection:
+    def cursor(self):
+        return FailingCursor()
+
+def test_days_are_named_by_day_name():
+    assert "d.day_name" in TREE_LESSONS_QUERY
+    assert "d.day_name" in main.LESSON_CATALOG_QUERY
+
+def test_query_error_is_a_json_503(monkeypatch):
+    monkeypatch.setattr(main, "get_db_connection", lambda: FailingConnection())
+    monkeypatch.setattr(main, "release_db_connection", lambda connection: None)
+
+    response = TestClient(main.app).get("/api/lessons/tree")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "error"
+    assert "Unknown column" in response.json()["message"]
+    assert response.headers["cache-control"] == "no-store"
+
+def test_missing_database_is_a_json_503(monkeypatch):
+    monkeypatch.setattr(main, "get_db_connection", lambda: None)
+
+    response = TestClient(main.app).get("/api/lessons/tree")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "error", "message": "Database connection failed"}
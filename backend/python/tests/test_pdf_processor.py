@@ -0,0 +1,139 @@
+import json
+
+import fitz
+import pytest
+
+from pdf_processor import (
+    SUMMARY_LENGTH, LessonTextBuilder, extract_page_range, extract_pdf, extract_qa_pairs,
+    is_heading, iter_page_texts, load_previous_pages, page_hash, page_texts, write_result
+)
+
+LESSON = """Neural Networks
+A network is made of layers of neurons.
+What is a neuron?
+A neuron sums weighted inputs and applies an activation.
+## Training
+Training adjusts the weights with backpropagation.
+"""
+
+@pytest.mark.parametrize("line", ["Neural Networks", "## Training", "2.1 Activation Functions", "OVERVIEW"])
+def test_headings(line):
+    assert is_heading(line)
+
+@pytest.mark.parametrize("line", ["", "Neural networks are layered.", "a lowercase line", "Networks, Layers,", "What is a neuron?"])
+def test_not_headings(line):
+    assert not is_heading(line)
+
+def test_sections_and_qa_pairs():
+    builder = LessonTextBuilder().feed_all([LESSON])
+
+    assert [section['title'] for section in builder.sections] == ['Neural Networks', 'Training']
+    assert builder.sections[1]['content'].strip() == "Training adjusts the weights with backpropagation."
+    assert builder.qa_pairs == extract_qa_pairs(LESSON)
+    assert builder.qa_pairs[0]['question'] == "What is a neuron?"
+    assert builder.first_line == "Neural Networks"
+
+def test_lines_split_across_chunks_are_joined():
+    whole = LessonTextBuilder().feed_all([LESSON])
+    split = LessonTextBuilder().feed_all([LESSON[:50], LESSON[50:90], LESSON[90:]])
+
+    assert split.sections == whole.sections
+    assert split.qa_pairs == whole.qa_pairs
+    assert split.text == LESSON
+
+def test_text_before_the_first_heading_is_the_introduction():
+    builder = LessonTextBuilder().feed_all(["Some opening words.\n", LESSON])
+
+    assert builder.sections[0] == {'title': 'Introduction', 'content': "Some opening words.\n"}
+
+def test_summary_is_truncated():
+    short = LessonTextBuilder().feed_all(["Short text."])
+    long = LessonTextBuilder().feed_all(["x" * 300, "y" * 300])
+
+    assert short.summary == "Short text."
+    assert long.summary == ("x" * 300 + "y" * 300)[:SUMMARY_LENGTH] + "..."
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "lesson.pdf"
+    doc = fitz.open()
+    for text in ["Neural Networks\nLayers of neurons.", "Training\nBackpropagation updates weights.", "Summary\nThat is all."]:
+        doc.new_page().insert_text((50, 72), text)
+    doc.save(path)
+    doc.close()
+    return path
+
+def test_extract_pdf(pdf_path):
+    result = extract_pdf(str(pdf_path), parallel=False)
+    texts = list(iter_page_texts(str(pdf_path), parallel=False))
+
+    assert result['page_count'] == 3
+    assert result['reused_pages'] == 0
+    assert result['title'] == "Neural Networks"
+    assert result['full_text'] == "".join(texts)
+    assert [section['title'] for section in result['sections']] == ['Neural Networks', 'Training', 'Summary']
+    # Page texts are not kept a second time, only where they end in the full text
+    assert [set(page) for page in result['pages']] == [{'hash', 'length'}] * 3
+    assert page_texts(result) == texts
+
+def test_unchanged_pages_are_reused(pdf_path):
+    first = extract_pdf(str(pdf_path), parallel=False)
+    texts = page_texts(first)
+    previous_pages = {page['hash']: "cached " + text for page, text in zip(first['pages'][:2], texts)}
+
+    second = extract_pdf(str(pdf_path), previous_pages=previous_pages, parallel=False)
+
+    assert second['reused_pages'] == 2
+    assert page_texts(second) == ["cached " + texts[0], "cached " + texts[1], texts[2]]
+
+def write_form_page(path, text):
+    source = fitz.open()
+    source.new_page().insert_text((72, 72), text)
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.show_pdf_page(page.rect, source, 0)
+        doc.save(str(path))
+    return path
+
+def test_edits_inside_a_form_xobject_change_the_page_hash(tmp_path):
+    old = write_form_page(tmp_path / "old.pdf", "Old form text")
+    new = write_form_page(tmp_path / "new.pdf", "New form text")
+    with fitz.open(str(old)) as old_doc, fitz.open(str(new)) as new_doc:
+        assert old_doc[0].read_contents() == new_doc[0].read_contents()
+        assert page_hash(old_doc[0]) != page_hash(new_doc[0])
+
+    previous = extract_pdf(str(old), parallel=False)
+    previous_pages = dict(zip((page['hash'] for page in previous['pages']), page_texts(previous)))
+    result = extract_pdf(str(new), previous_pages=previous_pages, parallel=False)
+
+    assert result['reused_pages'] == 0
+    assert "New form text" in result['full_text']
+
+def test_page_hash_is_stable_across_opens(tmp_path):
+    path = write_form_page(tmp_path / "lesson.pdf", "Same text")
+    with fitz.open(str(path)) as first, fitz.open(str(path)) as second:
+        assert page_hash(first[0]) == page_hash(second[0], {})
+
+def test_previous_pages_are_loaded_from_a_written_result(pdf_path, tmp_path):
+    result = extract_pdf(str(pdf_path), parallel=False)
+    output = tmp_path / "lesson.json"
+    write_result(result, str(output))
+
+    assert load_previous_pages(str(output)) == {page['hash']: text for page, text in zip(result['pages'], page_texts(result))}
+    assert load_previous_pages(str(tmp_path / "missing.json")) == {}
+
+def test_previous_pages_from_an_artifact_with_page_texts(tmp_path):
+    output = tmp_path / "old.json"
+    output.write_text(json.dumps({'full_text': "AB", 'pages': [{'hash': 'a', 'text': "A"}, {'hash': 'b', 'text': "B"}]}))
+
+    assert load_previous_pages(str(output)) == {'a': "A", 'b': "B"}
+
+def test_extract_page_range_leaves_known_pages_to_the_caller(pdf_path):
+    result = extract_pdf(str(pdf_path), parallel=False)
+    hashes = [page['hash'] for page in result['pages']]
+    texts = page_texts(result)
+
+    extracted = extract_page_range(str(pdf_path), 1, 3, known_hashes={hashes[1]})
+
+    assert extracted == [{'hash': hashes[1], 'text': None}, {'hash': hashes[2], 'text': texts[2]}]
+    assert extract_page_range(str(pdf_path), 0, 1, with_hash=False) == [{'hash': None, 'text': texts[0]}]
@@ -0,0 +1,39 @@
+import time
+
+from cache import ResponseCache
+
+def test_get_returns_stored_value():
+    cache = ResponseCache()
+    cache.put('key', 'answer')
+
+    assert cache.get('key') == 'answer'
+    assert cache.get('other') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl=0.01)
+    cache.put('key', 'answer')
+    time.sleep(0.02)
+
+    assert cache.get('key') is None
+    assert cache.stats()['expirations'] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_clear():
+    cache = ResponseCache()
+    cache.put('key', 'answer')
+    cache.clear()
+
+    assert cache.get('key') is None
@@ -0,0 +1,88 @@
+import os
+import threading
+
+import fitz
+import pytest
+
+from sample_pdfs import SamplePDFStore, render_lesson_sample
+
+@pytest.fixture
+def store():
+    store = SamplePDFStore()
+    yield store
+    store.shutdown()
+
+def write_pdf(path):
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4 sample")
+
+def test_missing_pdf_is_rendered_in_the_background(tmp_path, store):
+    path = str(tmp_path / "sample.pdf")
+    created = []
+
+    assert store.get(path, write_pdf, on_created=created.append) is None
+    store.ensure(path, write_pdf).result()
+
+    assert store.get(path, write_pdf) == path
+    assert created == [path]
+    assert os.listdir(tmp_path) == ["sample.pdf"]
+    assert store.stats() == {"ready": 1, "pending": 0, "hits": 1, "misses": 1, "rendered": 1, "failures": 0}
+
+def test_existing_pdf_is_a_hit_without_rendering(tmp_path, store):
+    path = str(tmp_path / "sample.pdf")
+    write_pdf(path)
+
+    def fail(temporary_path):
+        raise AssertionError("rendered an existing PDF")
+
+    assert store.get(path, fail) == path
+    assert store.ensure(path, fail) is None
+    assert store.stats()["rendered"] == 0
+
+def test_concurrent_requests_render_once(tmp_path, store):
+    path = str(tmp_path / "sample.pdf")
+    release = threading.Event()
+    calls = []
+
+    def slow_render(temporary_path):
+        calls.append(temporary_path)
+        release.wait(5)
+        write_pdf(temporary_path)
+
+    futures = {store.ensure(path, slow_render) for _ in range(5)}
+    assert all(store.get(path, slow_render) is None for _ in range(3))
+    release.set()
+    futures.pop().result()
+
+    assert len(futures) == 0
+    assert len(calls) == 1
+    assert store.get(path, slow_render) == path
+
+def test_failed_render_leaves_nothing_behind_and_can_be_retried(tmp_path, store):
+    path = str(tmp_path / "sample.pdf")
+
+    def broken(temporary_path):
+        with open(temporary_path, 'wb') as f:
+            f.write(b"half a PDF")
+        raise RuntimeError("renderer crashed")
+
+    store.ensure(path, broken).result()
+
+    assert os.listdir(tmp_path) == []
+    assert store.stats()["failures"] == 1
+
+    # The next request retries the render
+    assert store.get(path, write_pdf) is None
+    future = store.ensure(path, write_pdf)
+    if future is not None:
+        future.result()
+    assert store.get(path, write_pdf) == path
+
+def test_render_lesson_sample(tmp_path):
+    path = str(tmp_path / "lesson.pdf")
+
+    render_lesson_sample(path, lesson_id=3)
+
+    with fitz.open(path) as doc:
+        assert len(doc) == 3
+        assert "Lesson 3: Deep Learning Fundamentals" in doc[0].get_text()
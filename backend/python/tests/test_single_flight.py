@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from cache import SingleFlight
+
+def test_concurrent_calls_share_one_upstream_call():
+    calls = []
+
+    async def upstream(publish):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'answer'
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do('key', upstream) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ['answer'] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced': 4}
+
+def test_different_keys_are_not_coalesced():
+    calls = []
+
+    async def upstream(publish):
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(flight.do('a', upstream), flight.do('b', upstream))
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+def test_late_subscriber_receives_every_fragment():
+    async def upstream(publish):
+        publish('Hello')
+        await asyncio.sleep(0.01)
+        publish(', world')
+        return 'Hello, world'
+
+    async def run():
+        flight = SingleFlight()
+        early, late = [], []
+
+        async def collect(into):
+            async def on_delta(delta):
+                into.append(delta)
+            return await flight.do('key', upstream, on_delta=on_delta)
+
+        first = asyncio.ensure_future(collect(early))
+        await asyncio.sleep(0.005)  # join after the first fragment was published
+        second = asyncio.ensure_future(collect(late))
+        await asyncio.gather(first, second)
+        return early, late
+
+    early, late = asyncio.run(run())
+    assert early == ['Hello', ', world']
+    assert late == ['Hello', ', world']
+
+def test_error_reaches_every_waiter_and_the_key_is_released():
+    calls = []
+
+    async def failing(publish):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('upstream failed')
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(flight.do('key', failing), flight.do('key', failing), return_exceptions=True)
+        # A later call starts a new upstream call
+        again = await asyncio.gather(flight.do('key', failing), return_exceptions=True)
+        return results + again
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 2
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def upstream(publish):
+        await asyncio.sleep(0.02)
+        return 'answer'
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do('key', upstream))
+        second = asyncio.ensure_future(flight.do('key', upstream))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == ('answer', True)
@@ -0,0 +1,56 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+
+LESSON = (
+    "Deep Learning uses neural networks with many layers. "
+    "Backpropagation computes the gradient of the loss for every weight. "
+    "Gradient descent updates the weights to reduce the loss. "
+    "Dropout randomly disables neurons during training."
+)
+
+def lesson_info(lesson_id):
+    return {"id": lesson_id, "title": "Neural Networks", "content": LESSON}
+
+def ask(monkeypatch, message):
+    monkeypatch.setattr(main, "get_lesson_info", lesson_info)
+    monkeypatch.setattr(main, "get_db_connection", lambda: None)
+    with TestClient(main.app).websocket_connect("/ws") as websocket:
+        websocket.receive_text()  # welcome
+        websocket.send_text(message)
+        return json.loads(websocket.receive_text())
+
+def test_definition_questions_quote_the_best_sentences():
+    answer = main.fallback_answer("What is backpropagation?", LESSON)
+
+    assert answer.startswith("Based on the lesson content, I can provide this definition:")
+    assert "1. Backpropagation computes the gradient of the loss for every weight." in answer
+
+def test_questions_about_other_topics_are_declined():
+    assert main.fallback_answer("Who won the football world cup?", LESSON) == main.OFF_TOPIC_RESPONSE
+
+def test_missing_lesson_file():
+    assert "could not be found" in main.fallback_answer("What is dropout?", "No content available for lesson 7")
+
+def test_websocket_answers_from_the_lesson_without_an_api_client(monkeypatch):
+    monkeypatch.setattr(main, "client", None)
+
+    response = ask(monkeypatch, "1|How do we compute the gradient in deep learning?")
+
+    assert response["response"].startswith("The lesson describes this process as follows:")
+    assert "Backpropagation computes the gradient" in response["response"]
+
+def test_websocket_falls_back_when_the_api_fails(monkeypatch):
+    async def failing_answer(*args, **kwargs):
+        raise RuntimeError("Grok API unavailable")
+
+    monkeypatch.setattr(main, "client", object())
+    monkeypatch.setattr(main, "get_grok_answer", failing_answer)
+
+    response = ask(monkeypatch, json.dumps({"lessonId": 1, "question": "Why use dropout in deep learning?", "stream": True}))
+
+    assert response["type"] == "done"
+    assert response["response"].startswith("According to the lesson material, here's why:")
+    assert "Dropout randomly disables neurons during training." in response["response"]